@@ -7,7 +7,8 @@
 
 import sys
 import itertools
-import os
+import bisect
+from array import array
 import pkgutil
 import ctypes.wintypes
 import threading
@@ -28,6 +29,9 @@ import brailleTables
 from collections import namedtuple
 import re
 import scriptHandler
+import lruCache
+import brailleWriteScheduler
+import latencyTracing
 
 roleLabels = {
 	# Translators: Displayed in braille for an object which is a
@@ -319,6 +323,47 @@ def getDisplayList(excludeNegativeChecks=True):
 		displayList.append(lastDisplay)
 	return displayList
 
+#: The maximum number of translations kept in L{translationCache}.
+TRANSLATION_CACHE_SIZE = 256
+#: Caches the results of liblouis translation for L{Region.update},
+#: keyed by (table, text, typeforms, mode, cursor position).
+#: Regions are updated whenever the cursor moves or an object changes,
+#: even if their text is unchanged, so this avoids translating the same text repeatedly.
+#: The cache's C{hits} and C{misses} can be used to determine its effectiveness.
+#: @type: L{lruCache.LRUCache}
+translationCache = lruCache.LRUCache(TRANSLATION_CACHE_SIZE)
+
+#: The time in ms the display must be idle before the reading units adjacent to the cursor are prefetched.
+#: @see: L{TextInfoRegion.prefetch}
+PREFETCH_DELAY = 200
+
+def _translate(table, text, typeform, mode, cursorPos):
+	"""Translate text into braille using liblouis, using L{translationCache} where possible.
+	The arguments are as for C{louis.translate}, except that C{table} is a single table file name.
+	@return: The braille, the braille to raw position map, the raw to braille position map and the braille cursor position.
+		The position maps are arrays of ints which are shared with other callers and must not be modified.
+	@rtype: tuple
+	"""
+	if mode & louis.compbrlAtCursor or cursorPos >= len(text):
+		# The cursor position affects the translation or the braille cursor position returned by liblouis.
+		keyCursorPos = cursorPos
+	else:
+		# Regions only use the braille cursor position returned by liblouis when the cursor is beyond the end of the text.
+		# Thus, as far as the region is concerned, the cursor position makes no difference to the result.
+		keyCursorPos = None
+	key = (table, text, typeform, mode, keyCursorPos)
+	try:
+		return translationCache[key]
+	except KeyError:
+		pass
+	with brailleTables.louisLock:
+		braille, brailleToRawPos, rawToBraillePos, brailleCursorPos = louis.translate(brailleTables.getTableList(table),
+			text, typeform=typeform, mode=mode, cursorPos=cursorPos)
+	# Many translations are cached, so keep the position maps compact.
+	result = translationCache[key] = (braille, array("i", brailleToRawPos), array("i", rawToBraillePos),
+		brailleCursorPos)
+	return result
+
 class Region(object):
 	"""A region of braille to be displayed.
 	Each portion of braille to be displayed is represented by a region.
@@ -346,12 +391,14 @@ class Region(object):
 		#: C{None} if no typeform info.
 		#: @type: [int, ...]
 		self.rawTextTypeforms = None
-		#: A list mapping positions in L{rawText} to positions in L{brailleCells}.
-		#: @type: [int, ...]
-		self.rawToBraillePos = []
-		#: A list mapping positions in L{brailleCells} to positions in L{rawText}.
-		#: @type: [int, ...]
-		self.brailleToRawPos = []
+		#: A sequence mapping positions in L{rawText} to positions in L{brailleCells}.
+		#: L{update} sets this to an array of ints shared with L{translationCache}, so it must not be modified.
+		#: @type: array
+		self.rawToBraillePos = array("i")
+		#: A sequence mapping positions in L{brailleCells} to positions in L{rawText}.
+		#: L{update} sets this to an array of ints shared with L{translationCache}, so it must not be modified.
+		#: @type: array
+		self.brailleToRawPos = array("i")
 		#: The position of the cursor in L{brailleCells}, C{None} if the cursor is not in this region.
 		#: @type: int
 		self.brailleCursorPos = None
@@ -378,16 +425,16 @@ class Region(object):
 		@postcondition: L{brailleCells}, L{brailleCursorPos}, L{brailleSelectionStart} and L{brailleSelectionEnd} are updated and ready for rendering.
 		"""
 		mode = louis.dotsIO | louis.pass1Only
-		if config.conf["braille"]["expandAtCursor"] and self.cursorPos is not None:
+		if config.conf.getValue("braille.expandAtCursor") and self.cursorPos is not None:
 			mode |= louis.compbrlAtCursor
 		text=unicode(self.rawText).replace('\0','')
-		braille, self.brailleToRawPos, self.rawToBraillePos, brailleCursorPos = louis.translate(
-			[os.path.join(brailleTables.TABLES_DIR, config.conf["braille"]["translationTable"]),
-				"braille-patterns.cti"],
+		braille, self.brailleToRawPos, self.rawToBraillePos, brailleCursorPos = _translate(
+			config.conf.getValue("braille.translationTable"),
 			text,
 			# liblouis mutates typeform if it is a list.
-			typeform=tuple(self.rawTextTypeforms) if isinstance(self.rawTextTypeforms, list) else self.rawTextTypeforms,
-			mode=mode, cursorPos=self.cursorPos or 0)
+			# A tuple is also needed to look up the translation in the cache.
+			tuple(self.rawTextTypeforms) if isinstance(self.rawTextTypeforms, list) else self.rawTextTypeforms,
+			mode, self.cursorPos or 0)
 		# liblouis gives us back a character string of cells, so convert it to a list of ints.
 		# For some reason, the highest bit is set, so only grab the lower 8 bits.
 		self.brailleCells = [ord(cell) & 255 for cell in braille]
@@ -535,6 +582,37 @@ def getBrailleTextForProperties(**propertyValues):
 		textList.append(cellCoordsText)
 	return TEXT_SEPARATOR.join([x for x in textList if x])
 
+#: The maximum number of field texts kept in L{fieldBrailleCache}.
+FIELD_BRAILLE_CACHE_SIZE = 512
+#: Caches the results of L{getBrailleTextForProperties} for fields, keyed by the properties.
+#: Documents (particularly web documents) contain many fields with the same properties; e.g. lists, links and headings.
+#: The properties include everything from the formatting configuration which affects the text,
+#: so the configuration doesn't need to be part of the key.
+#: The cache's C{hits} and C{misses} are logged at level IO when a L{TextInfoRegion} is updated.
+#: @type: L{lruCache.LRUCache}
+fieldBrailleCache = lruCache.LRUCache(FIELD_BRAILLE_CACHE_SIZE)
+
+def _makeHashable(value):
+	if isinstance(value, (set, frozenset)):
+		return frozenset(value)
+	if isinstance(value, dict):
+		return tuple(sorted(value.iteritems()))
+	return value
+
+def getCachedBrailleTextForProperties(**propertyValues):
+	"""Get the braille text for properties as L{getBrailleTextForProperties} does, using L{fieldBrailleCache} where possible.
+	"""
+	key = tuple(sorted((name, _makeHashable(value)) for name, value in propertyValues.iteritems()))
+	try:
+		return fieldBrailleCache[key]
+	except KeyError:
+		pass
+	except TypeError:
+		# A property value can't be hashed, so this can't be cached.
+		return getBrailleTextForProperties(**propertyValues)
+	text = fieldBrailleCache[key] = getBrailleTextForProperties(**propertyValues)
+	return text
+
 class NVDAObjectRegion(Region):
 	"""A region to provide a braille representation of an NVDAObject.
 	This region will update based on the current state of the associated NVDAObject.
@@ -614,9 +692,9 @@ def getControlFieldBraille(info, field, ancestors, reportStart, formatConfig):
 		text = []
 		# The only item we report for these fields is clickable, if present.
 		if controlTypes.STATE_CLICKABLE in states:
-			text.append(getBrailleTextForProperties(states={controlTypes.STATE_CLICKABLE}))
+			text.append(getCachedBrailleTextForProperties(states={controlTypes.STATE_CLICKABLE}))
 		if current:
-			text.append(getBrailleTextForProperties(current=current))
+			text.append(getCachedBrailleTextForProperties(current=current))
 		return TEXT_SEPARATOR.join(text) if len(text) != 0 else None
 
 	elif role in (controlTypes.ROLE_TABLECELL, controlTypes.ROLE_TABLECOLUMNHEADER, controlTypes.ROLE_TABLEROWHEADER) and field.get("table-id"):
@@ -632,7 +710,7 @@ def getControlFieldBraille(info, field, ancestors, reportStart, formatConfig):
 		}
 		if reportTableHeaders:
 			props["columnHeaderText"] = field.get("table-columnheadertext")
-		return getBrailleTextForProperties(**props)
+		return getCachedBrailleTextForProperties(**props)
 
 	elif reportStart:
 		props = {
@@ -647,7 +725,7 @@ def getControlFieldBraille(info, field, ancestors, reportStart, formatConfig):
 		level = field.get("level")
 		if level:
 			props["positionInfo"] = {"level": level}
-		text = getBrailleTextForProperties(**props)
+		text = getCachedBrailleTextForProperties(**props)
 		content = field.get("content")
 		if content:
 			if text:
@@ -669,7 +747,7 @@ def getControlFieldBraille(info, field, ancestors, reportStart, formatConfig):
 		# Translators: Displayed in braille at the end of a control field such as a list or table.
 		# %s is replaced with the control's role.
 		return (_("%s end") %
-			getBrailleTextForProperties(role=role))
+			getCachedBrailleTextForProperties(role=role))
 
 def getFormatFieldBraille(field, fieldCache, isAtStart, formatConfig):
 	"""Generates the braille text for the given format field.
@@ -851,7 +929,7 @@ class TextInfoRegion(Region):
 		info.obj._brailleFormatFieldAttributesCache = formatFieldAttributesCache
 
 	def _getReadingUnit(self):
-		return textInfos.UNIT_PARAGRAPH if config.conf["braille"]["readByParagraph"] else textInfos.UNIT_LINE
+		return textInfos.UNIT_PARAGRAPH if config.conf.getValue("braille.readByParagraph") else textInfos.UNIT_LINE
 
 	def update(self):
 		formatConfig = config.conf["documentFormatting"]
@@ -963,6 +1041,8 @@ class TextInfoRegion(Region):
 			self.brailleCursorPos = self._brailleInputStart + brailleInput.handler.untranslatedCursorPos
 		else:
 			self._brailleInputIndStart = None
+		if log.isEnabledFor(log.IO):
+			log.io("Field braille cache: %d hits, %d misses" % (fieldBrailleCache.hits, fieldBrailleCache.misses))
 
 	def routeTo(self, braillePos):
 		if self._brailleInputIndStart is not None and self._brailleInputIndStart <= braillePos < self._brailleInputIndEnd:
@@ -1037,6 +1117,73 @@ class TextInfoRegion(Region):
 		dest.collapse()
 		self._setCursor(dest)
 
+	def prefetch(self):
+		"""Prepare the reading units before and after the current reading unit.
+		Their translations are placed in L{translationCache},
+		so moving to them with L{nextLine} or L{previousLine} doesn't have to wait for liblouis.
+		The text with fields is still fetched when the region is updated,
+		since the content might change in the meantime.
+		Pages are not turned.
+		Nothing is prefetched while the user is entering braille,
+		since the untranslated braille is only shown at the cursor.
+		@precondition: L{update} has been called.
+		"""
+		# Import late to avoid circular import.
+		import brailleInput
+		if brailleInput.handler.untranslatedBraille:
+			return
+		# The adjacent units must be rendered exactly as this region would render them.
+		prefetchCls = _getPrefetchRegionClass(type(self))
+		obj = self._readingInfo.obj
+		# Prefetching must not affect which format changes are reported when the region is really updated.
+		formatFieldAttributesCache = dict(getattr(obj, "_brailleFormatFieldAttributesCache", {}))
+		try:
+			# Position the cursor the same way as nextLine and previousLine do.
+			dest = self._readingInfo.copy()
+			if dest.move(self._getReadingUnit(), 1):
+				dest.collapse()
+				prefetchCls(self.obj, dest).update()
+			dest = self._readingInfo.copy()
+			dest.collapse()
+			if dest.move(textInfos.UNIT_CHARACTER, -1):
+				dest.collapse()
+				prefetchCls(self.obj, dest).update()
+		finally:
+			obj._brailleFormatFieldAttributesCache = formatFieldAttributesCache
+
+class _PrefetchRegionMixin(object):
+	"""Renders the reading unit at a given position without moving the cursor.
+	This is mixed into the class of the region being prefetched for,
+	so that the reading unit is rendered in exactly the same way.
+	Used by L{TextInfoRegion.prefetch}.
+	"""
+
+	def __init__(self, obj, position):
+		super(_PrefetchRegionMixin, self).__init__(obj)
+		self._position = position
+		# This only affects where the region is positioned on the display, so don't bother determining it.
+		self.focusToHardLeft = True
+
+	def _getSelection(self):
+		return self._position.copy()
+
+#: Maps L{TextInfoRegion} subclasses to the classes used to prefetch for them.
+#: @type: {type: type}
+_prefetchRegionClasses = {}
+
+def _getPrefetchRegionClass(cls):
+	"""Get the class used to prefetch reading units for a L{TextInfoRegion} subclass.
+	@param cls: The class of the region being prefetched for.
+	@type cls: type
+	@rtype: type
+	"""
+	try:
+		return _prefetchRegionClasses[cls]
+	except KeyError:
+		pass
+	prefetchCls = _prefetchRegionClasses[cls] = type("_Prefetch%s" % cls.__name__, (_PrefetchRegionMixin, cls), {})
+	return prefetchCls
+
 class CursorManagerRegion(TextInfoRegion):
 
 	def _isMultiline(self):
@@ -1082,6 +1229,28 @@ class BrailleBuffer(baseObject.AutoPropertyObject):
 		#: The position in L{brailleCells} where the display window starts (inclusive).
 		#: @type: int
 		self.windowStartPos = 0
+		self._clearRegionIndex()
+
+	def _clearRegionIndex(self):
+		#: The visible regions as of the last L{update}.
+		#: @type: [L{Region}, ...]
+		self._regions = []
+		#: Copies of the braille cells and the raw text of each region in L{_regions} as of the last L{update},
+		#: used to determine which regions have changed.
+		#: The cells are copied because regions may modify their cells in place.
+		#: @type: [([int, ...], basestring), ...]
+		self._regionContents = []
+		#: The start of each region in L{_regions} in L{brailleCells},
+		#: followed by the length of L{brailleCells}.
+		#: This allows regions to be looked up by position using a binary search.
+		#: @type: [int, ...]
+		self._regionStarts = [0]
+		#: The start of each region in L{_regions} in L{rawText},
+		#: followed by the length of L{rawText}.
+		#: @type: [int, ...]
+		self._regionRawStarts = [0]
+		self._rawToBraillePos = None
+		self._brailleToRawPos = None
 
 	def clear(self):
 		"""Clear the entire buffer.
@@ -1093,6 +1262,7 @@ class BrailleBuffer(baseObject.AutoPropertyObject):
 		self.brailleCursorPos = None
 		self.brailleCells = []
 		self.windowStartPos = 0
+		self._clearRegionIndex()
 
 	def _get_visibleRegions(self):
 		if not self.regions:
@@ -1104,44 +1274,53 @@ class BrailleBuffer(baseObject.AutoPropertyObject):
 			yield region
 
 	def _get_regionsWithPositions(self):
-		start = 0
-		for region in self.visibleRegions:
-			end = start + len(region.brailleCells)
-			yield RegionWithPositions(region, start, end)
-			start = end
+		"""The visible regions with their positions in L{brailleCells} as of the last L{update}.
+		"""
+		starts = self._regionStarts
+		for index, region in enumerate(self._regions):
+			yield RegionWithPositions(region, starts[index], starts[index + 1])
 
-	_cache_rawToBraillePos=True
 	def _get_rawToBraillePos(self):
-		"""@return: a list mapping positions in L{rawText} to positions in L{brailleCells} for the entire buffer.
-		@rtype: [int, ...]
+		"""@return: an array mapping positions in L{rawText} to positions in L{brailleCells} for the entire buffer.
+		@rtype: array
 		"""
-		rawToBraillePos = []
-		for region, regionStart, regionEnd in self.regionsWithPositions:
-			rawToBraillePos.extend(p+regionStart for p in region.rawToBraillePos)
-		return rawToBraillePos
+		if self._rawToBraillePos is None:
+			rawToBraillePos = self._rawToBraillePos = array("i")
+			for region, regionStart in itertools.izip(self._regions, self._regionStarts):
+				rawToBraillePos.extend(p+regionStart for p in region.rawToBraillePos)
+		return self._rawToBraillePos
 
-	_cache_brailleToRawPos=True
 	def _get_brailleToRawPos(self):
-		"""@return: a list mapping positions in L{brailleCells} to positions in L{rawText} for the entire buffer.
-		@rtype: [int, ...]
+		"""@return: an array mapping positions in L{brailleCells} to positions in L{rawText} for the entire buffer.
+		@rtype: array
 		"""
-		brailleToRawPos = []
-		start = 0
-		for region in self.visibleRegions:
-			brailleToRawPos.extend(p+start for p in region.brailleToRawPos)
-			start+=len(region.rawText)
-		return brailleToRawPos
+		if self._brailleToRawPos is None:
+			brailleToRawPos = self._brailleToRawPos = array("i")
+			for region, rawStart in itertools.izip(self._regions, self._regionRawStarts):
+				brailleToRawPos.extend(p+rawStart for p in region.brailleToRawPos)
+		return self._brailleToRawPos
+
+	def _getRegionIndex(self, bufferPos):
+		"""Get the index in L{_regions} of the region containing a position in L{brailleCells}.
+		@raise LookupError: If the position is not in any region.
+		"""
+		starts = self._regionStarts
+		if not 0 <= bufferPos < starts[-1]:
+			raise LookupError("No such position")
+		# If there are empty regions at this position, they share its start,
+		# so take the last region starting at or before this position.
+		return bisect.bisect_right(starts, bufferPos) - 1
 
 	def bufferPosToRegionPos(self, bufferPos):
-		for region, start, end in self.regionsWithPositions:
-			if end > bufferPos:
-				return region, bufferPos - start
-		raise LookupError("No such position")
+		index = self._getRegionIndex(bufferPos)
+		return self._regions[index], bufferPos - self._regionStarts[index]
 
 	def regionPosToBufferPos(self, region, pos, allowNearest=False):
-		for testRegion, start, end in self.regionsWithPositions:
+		starts = self._regionStarts
+		for index, testRegion in enumerate(self._regions):
 			if region == testRegion:
-				if pos < end - start:
+				start = starts[index]
+				if pos < starts[index + 1] - start:
 					# The requested position is still valid within the region.
 					return start + pos
 				elif allowNearest:
@@ -1151,11 +1330,15 @@ class BrailleBuffer(baseObject.AutoPropertyObject):
 				break
 		if allowNearest:
 			# Resort to the start of the last region.
-			return start
+			return starts[-2] if len(starts) > 1 else 0
 		raise LookupError("No such position")
 
+	def _bufferPosToRawPos(self, bufferPos):
+		index = self._getRegionIndex(bufferPos)
+		return self._regionRawStarts[index] + self._regions[index].brailleToRawPos[bufferPos - self._regionStarts[index]]
+
 	def bufferPositionsToRawText(self, startPos, endPos):
-		return self.rawText[self.brailleToRawPos[startPos]:self.brailleToRawPos[endPos-1]+1]
+		return self.rawText[self._bufferPosToRawPos(startPos):self._bufferPosToRawPos(endPos-1)+1]
 
 	def bufferPosToWindowPos(self, bufferPos):
 		if not (self.windowStartPos <= bufferPos < self.windowEndPos):
@@ -1167,7 +1350,7 @@ class BrailleBuffer(baseObject.AutoPropertyObject):
 		cellsLen = len(self.brailleCells)
 		if endPos >= cellsLen:
 			return cellsLen
-		if not config.conf["braille"]["wordWrap"]:
+		if not config.conf.getValue("braille.wordWrap"):
 			return endPos
 		try:
 			# Try not to split words across windows.
@@ -1205,7 +1388,7 @@ class BrailleBuffer(baseObject.AutoPropertyObject):
 		if startPos <= restrictPos:
 			self.windowStartPos = restrictPos
 			return
-		if not config.conf["braille"]["wordWrap"]:
+		if not config.conf.getValue("braille.wordWrap"):
 			self.windowStartPos = startPos
 			return
 		try:
@@ -1281,24 +1464,52 @@ class BrailleBuffer(baseObject.AutoPropertyObject):
 			self.windowEndPos = end
 
 	def update(self):
-		self.rawText = ""
-		self.brailleCells = []
-		self.cursorPos = None
-		start = 0
-		if log.isEnabledFor(log.IO):
-			logRegions = []
-		for region in self.visibleRegions:
-			rawText = region.rawText
-			if log.isEnabledFor(log.IO):
-				logRegions.append(rawText)
+		"""Update the buffer to reflect changes to its regions.
+		This must be called after regions are added, removed or updated.
+		Only regions from the first region which has changed are copied into the buffer;
+		e.g. updating the focus region doesn't copy the regions for its ancestors again.
+		"""
+		regions = list(self.visibleRegions)
+		starts = self._regionStarts
+		rawStarts = self._regionRawStarts
+		# Find the first region which has changed.
+		firstChanged = 0
+		for region, oldRegion, (oldCells, oldRawText) in itertools.izip(regions, self._regions, self._regionContents):
+			# Compare the contents rather than the objects,
+			# since a region may have modified its cells in place.
+			if region is not oldRegion or region.rawText != oldRawText or region.brailleCells != oldCells:
+				break
+			firstChanged += 1
+		# Keep the unchanged regions and remove the rest.
+		del starts[firstChanged + 1:]
+		del rawStarts[firstChanged + 1:]
+		del self._regionContents[firstChanged:]
+		del self.brailleCells[starts[-1]:]
+		changedRawText = [self.rawText[:rawStarts[-1]]]
+		start = starts[-1]
+		rawStart = rawStarts[-1]
+		# Splice in the changed regions.
+		for region in regions[firstChanged:]:
 			cells = region.brailleCells
-			self.rawText+=rawText
+			rawText = region.rawText
+			self._regionContents.append((list(cells), rawText))
 			self.brailleCells.extend(cells)
-			if region.brailleCursorPos is not None:
-				self.cursorPos = start + region.brailleCursorPos
+			changedRawText.append(rawText)
 			start += len(cells)
+			rawStart += len(rawText)
+			starts.append(start)
+			rawStarts.append(rawStart)
+		self.rawText = "".join(changedRawText)
+		self._regions = regions
+		self._rawToBraillePos = self._brailleToRawPos = None
+		self.cursorPos = None
+		for index in xrange(len(regions) - 1, -1, -1):
+			region = regions[index]
+			if region.brailleCursorPos is not None:
+				self.cursorPos = starts[index] + region.brailleCursorPos
+				break
 		if log.isEnabledFor(log.IO):
-			log.io("Braille regions text: %r" % logRegions)
+			log.io("Braille regions text: %r" % [region.rawText for region in regions])
 
 	def updateDisplay(self):
 		if self is self.handler.buffer:
@@ -1489,6 +1700,13 @@ class BrailleHandler(baseObject.AutoPropertyObject):
 		self._cursorBlinkUp = True
 		self._cells = []
 		self._cursorBlinkTimer = None
+		#: Writes cells to the current display.
+		#: @type: L{brailleWriteScheduler.WriteScheduler}
+		self._writeScheduler = None
+		self._prefetchTimer = None
+		#: The reading unit last prefetched, used to avoid prefetching it again.
+		#: @type: L{textInfos.TextInfo}
+		self._prefetchedReadingInfo = None
 		config.configProfileSwitched.register(self.handleConfigProfileSwitch)
 
 	def terminate(self):
@@ -1498,7 +1716,11 @@ class BrailleHandler(baseObject.AutoPropertyObject):
 		if self._cursorBlinkTimer:
 			self._cursorBlinkTimer.Stop()
 			self._cursorBlinkTimer = None
+		if self._prefetchTimer:
+			self._prefetchTimer.Stop()
+			self._prefetchTimer = None
 		config.configProfileSwitched.unregister(self.handleConfigProfileSwitch)
+		self._stopWriteScheduler()
 		if self.display:
 			self.display.terminate()
 			self.display = None
@@ -1517,7 +1739,24 @@ class BrailleHandler(baseObject.AutoPropertyObject):
 		else:
 			self.handleGainFocus(api.getFocusObject())
 
+	def _stopWriteScheduler(self):
+		if self._writeScheduler:
+			self._writeScheduler.stop()
+			self._writeScheduler = None
+
+	def _startWriteScheduler(self):
+		display = self.display
+		self._writeScheduler = brailleWriteScheduler.WriteScheduler(display.name, display.display,
+			writeRange=display.displayRange, onError=self._handleBackgroundWriteError,
+			minInterval=display.minWriteInterval)
+
+	def _handleBackgroundWriteError(self):
+		log.error("Error displaying cells. Disabling display", exc_info=True)
+		wx.CallAfter(self.setDisplayByName, "noBraille", isFallback=True)
+
 	def setDisplayByName(self, name, isFallback=False):
+		# Writes for the old display must not happen while it is being terminated or replaced.
+		self._stopWriteScheduler()
 		if not name:
 			self.display = None
 			self.displaySize = 0
@@ -1550,6 +1789,7 @@ class BrailleHandler(baseObject.AutoPropertyObject):
 					except:
 						log.error("Error terminating previous display driver", exc_info=True)
 				self.display = newDisplay
+			self._startWriteScheduler()
 			self.displaySize = newDisplay.numCells
 			self.enabled = bool(self.displaySize)
 			if not isFallback:
@@ -1565,12 +1805,12 @@ class BrailleHandler(baseObject.AutoPropertyObject):
 		if self._cursorBlinkTimer:
 			self._cursorBlinkTimer.Stop()
 			self._cursorBlinkTimer = None
-		self._cursorBlinkUp = showCursor = config.conf["braille"]["showCursor"]
+		self._cursorBlinkUp = showCursor = config.conf.getValue("braille.showCursor")
 		self._displayWithCursor()
 		if self._cursorPos is None or not showCursor:
 			return
-		cursorShouldBlink = config.conf["braille"]["cursorBlink"]
-		blinkRate = config.conf["braille"]["cursorBlinkRate"]
+		cursorShouldBlink = config.conf.getValue("braille.cursorBlink")
+		blinkRate = config.conf.getValue("braille.cursorBlinkRate")
 		if cursorShouldBlink and blinkRate:
 			self._cursorBlinkTimer = wx.PyTimer(self._blink)
 			self._cursorBlinkTimer.Start(blinkRate)
@@ -1578,31 +1818,32 @@ class BrailleHandler(baseObject.AutoPropertyObject):
 	def _writeCells(self, cells):
 		if not self.display.isThreadSafe:
 			try:
-				self.display.display(cells)
+				self._writeScheduler.write(cells)
 			except:
 				log.error("Error displaying cells. Disabling display", exc_info=True)
 				self.setDisplayByName("noBraille", isFallback=True)
 			return
-		with _BgThread.queuedWriteLock:
-			alreadyQueued = _BgThread.queuedWrite
-			_BgThread.queuedWrite = cells
-		# If a write was already queued, we don't need to queue another;
-		# we just replace the data.
-		# This means that if multiple writes occur while an earlier write is still in progress,
-		# we skip all but the last.
-		if not alreadyQueued:
-			# Queue a call to the background thread.
-			_BgThread.queueApc(_BgThread.executor)
+		# The scheduler writes in the background.
+		# If multiple writes occur while an earlier write is still in progress,
+		# all but the last are skipped.
+		# Queued cells must not be modified until they are written,
+		# so don't queue the handler's own cells.
+		if cells is self._cells:
+			cells = list(cells)
+		self._writeScheduler.queue(cells)
 
 	def _displayWithCursor(self):
 		if not self._cells:
 			return
-		cells = list(self._cells)
 		if self._cursorPos is not None and self._cursorBlinkUp:
+			cells = list(self._cells)
 			if self.tether == self.TETHER_FOCUS:
-				cells[self._cursorPos] |= config.conf["braille"]["cursorShapeFocus"]
+				cells[self._cursorPos] |= config.conf.getValue("braille.cursorShapeFocus")
 			else:
-				cells[self._cursorPos] |= config.conf["braille"]["cursorShapeReview"]
+				cells[self._cursorPos] |= config.conf.getValue("braille.cursorShapeReview")
+		else:
+			# Only copy the cells when the cursor needs to be added.
+			cells = self._cells
 		self._writeCells(cells)
 
 	def _blink(self):
@@ -1615,9 +1856,44 @@ class BrailleHandler(baseObject.AutoPropertyObject):
 			log.io("Braille window dots: %s" % formatCellsForLog(cells))
 		# cells might not be the full length of the display.
 		# Therefore, pad it with spaces to fill the display.
-		self._cells = cells + [0] * (self.displaySize - len(cells))
+		# The window cells are a new list, so pad them in place rather than making another copy.
+		cells.extend(itertools.repeat(0, self.displaySize - len(cells)))
+		self._cells = cells
 		self._cursorPos = self.buffer.cursorWindowPos
 		self._updateDisplay()
+		latencyTracing.mark(latencyTracing.HOP_BRAILLE)
+		self._schedulePrefetch()
+
+	def _getPrefetchRegion(self):
+		if self.buffer is not self.mainBuffer or not self.mainBuffer.regions:
+			return None
+		region = self.mainBuffer.regions[-1]
+		if not isinstance(region, TextInfoRegion) or region.pendingCaretUpdate:
+			return None
+		readingInfo = getattr(region, "_readingInfo", None)
+		if not readingInfo or readingInfo is self._prefetchedReadingInfo:
+			return None
+		return region
+
+	def _schedulePrefetch(self):
+		"""Prefetch the reading units adjacent to the cursor once the display has been idle for L{PREFETCH_DELAY}.
+		"""
+		if not self._getPrefetchRegion():
+			return
+		if self._prefetchTimer:
+			self._prefetchTimer.Restart(PREFETCH_DELAY)
+		else:
+			self._prefetchTimer = wx.CallLater(PREFETCH_DELAY, self._prefetch)
+
+	def _prefetch(self):
+		region = self._getPrefetchRegion()
+		if not region:
+			return
+		self._prefetchedReadingInfo = region._readingInfo
+		try:
+			region.prefetch()
+		except:
+			log.debugWarning("Error prefetching adjacent reading units", exc_info=True)
 
 	def scrollForward(self):
 		self.buffer.scrollForward()
@@ -1811,24 +2087,30 @@ class BrailleHandler(baseObject.AutoPropertyObject):
 			# We're reviewing a different object.
 			self._doNewObject(getFocusRegions(reviewPos.obj, review=True))
 
-	def handleConfigProfileSwitch(self):
+	def handleConfigProfileSwitch(self, changedKeys=None):
+		if changedKeys is None or "braille.translationTable" in changedKeys:
+			# The translation table changed, so the cached translations are no longer useful.
+			translationCache.clear()
+		if changedKeys is None or "braille.translationTable" in changedKeys or "braille.inputTable" in changedKeys:
+			_warmUpTables()
+		# This is checked even if the display setting didn't change,
+		# since the display might not have loaded previously.
 		display = config.conf["braille"]["display"]
 		if display != self.display.name:
 			self.setDisplayByName(display)
 
 class _BgThread:
-	"""A singleton background thread used for background writes and raw braille display I/O.
+	"""A singleton background thread used for raw braille display I/O.
+	Writes are handled by L{brailleWriteScheduler}.
 	"""
 
 	thread = None
 	exit = False
-	queuedWrite = None
 
 	@classmethod
 	def start(cls):
 		if cls.thread:
 			return
-		cls.queuedWriteLock = threading.Lock()
 		thread = cls.thread = threading.Thread(target=cls.func)
 		thread.daemon = True
 		thread.start()
@@ -1853,19 +2135,8 @@ class _BgThread:
 
 	@winKernel.PAPCFUNC
 	def executor(param):
-		if _BgThread.exit:
-			# func will see this and exit.
-			return
-		with _BgThread.queuedWriteLock:
-			data = _BgThread.queuedWrite
-			_BgThread.queuedWrite = None
-		if not data:
-			return
-		try:
-			handler.display.display(data)
-		except:
-			log.error("Error displaying cells. Disabling display", exc_info=True)
-			handler.setDisplayByName("noBraille", isFallback=True)
+		# This just wakes up the thread so that func can check whether it should exit.
+		pass
 
 	@classmethod
 	def func(cls):
@@ -1883,6 +2154,8 @@ def initialize():
 	newTableName = brailleTables.RENAMED_TABLES.get(oldTableName)
 	if newTableName:
 		config.conf["braille"]["translationTable"] = newTableName
+	brailleTables.loadMetadataIndex()
+	_warmUpTables()
 	handler = BrailleHandler()
 	handler.setDisplayByName(config.conf["braille"]["display"])
 
@@ -1903,6 +2176,12 @@ def terminate():
 	global handler
 	handler.terminate()
 	handler = None
+	brailleTables.saveMetadataIndex()
+
+def _warmUpTables():
+	"""Compile the configured output and input tables in the background.
+	"""
+	brailleTables.warmUp((config.conf["braille"]["translationTable"], config.conf["braille"]["inputTable"]))
 
 class BrailleDisplayDriver(baseObject.AutoPropertyObject):
 	"""Abstract base braille display driver.
@@ -1932,6 +2211,12 @@ class BrailleDisplayDriver(baseObject.AutoPropertyObject):
 	#: This is also required to use the L{hwIo} module.
 	#: @type: bool
 	isThreadSafe = False
+	#: The minimum time in seconds between writes to the display.
+	#: Displays which are overwhelmed by rapid updates can set this;
+	#: writes which occur during this time are coalesced.
+	#: This only applies to thread-safe drivers, as other drivers are written synchronously.
+	#: @type: float
+	minWriteInterval = 0
 
 	@classmethod
 	def check(cls):
@@ -1971,6 +2256,19 @@ class BrailleDisplayDriver(baseObject.AutoPropertyObject):
 		@type cells: [int, ...]
 		"""
 
+	def displayRange(self, start, cells):
+		"""Display a range of braille cells, leaving the other cells on the display unchanged.
+		Drivers for displays whose protocols can address a range of cells should implement this
+		so that less data is sent when only a few cells change; e.g. when the cursor blinks.
+		If this is not implemented, L{display} is used to update all cells instead.
+		@param start: The position of the first cell to display.
+		@type start: int
+		@param cells: The braille cells to display.
+		@type cells: [int, ...]
+		@raise NotImplementedError: If this driver does not support displaying a range of cells.
+		"""
+		raise NotImplementedError
+
 	#: Automatic port constant to be used by braille displays that support the "automatic" port
 	#: @type: Tupple
 	# Translators: String representing the automatic port selection for braille displays.
@@ -85,6 +85,10 @@ class BrailleDisplayDriver(braille.BrailleDisplayDriver):
 		cells="".join([chr(x) for x in cells])
 		AlvaLib.AlvaSendBraille(0, cells, 0, len(cells))
 
+	def displayRange(self, start, cells):
+		cells="".join([chr(x) for x in cells])
+		AlvaLib.AlvaSendBraille(0, cells, start, len(cells))
+
 	def _keyCallback(self, dev, key, userData):
 		group = (key >> 8) & 0x7F
 		number = key & 0xFF
@@ -196,6 +196,10 @@ class BrailleDisplayDriver(braille.BrailleDisplayDriver,ScriptableObject):
 		cells="".join([chr(x) for x in cells])
 		fbWrite(self.fbHandle,0,len(cells),cells)
 
+	def displayRange(self, start, cells):
+		cells="".join([chr(x) for x in cells])
+		fbWrite(self.fbHandle,start,len(cells),cells)
+
 	def _configureDisplay(self):
 		# See what display we are connected to
 		displayName= firmwareVersion=""
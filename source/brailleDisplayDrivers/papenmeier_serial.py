@@ -176,6 +176,11 @@ class BrailleDisplayDriver(braille.BrailleDisplayDriver, ScriptableObject):
 				self._dev.write(brl_out(self._offsetHorizontal, cells))
 			except:
 				self._dev = None
+
+	def displayRange(self, start, cells):
+		"""write a range of cells to braille display"""
+		if(self._dev!=None):
+			self._dev.write(brl_out(self._offsetHorizontal + start, cells))
 		
 	def executeGesture(self,gesture):
 		"""execute a gesture"""
@@ -5,7 +5,6 @@
 #See the file COPYING for more details.
 #Copyright (C) 2012-2016 NV Access Limited, Rui Batista
 
-import os.path
 import time
 import louis
 import brailleTables
@@ -17,6 +16,7 @@ import inputCore
 import speech
 import keyboardHandler
 import api
+import lruCache
 
 """Framework for handling braille input from the user.
 All braille input is represented by a {BrailleInputGesture}.
@@ -37,6 +37,33 @@ UNICODE_BRAILLE_START = 0x2800
 #: @type: unicode
 UNICODE_BRAILLE_PROTECTED = u"⣿" # All dots down
 
+#: The maximum number of back-translations kept in L{backTranslationCache}.
+BACK_TRANSLATION_CACHE_SIZE = 256
+#: Caches the results of liblouis back-translation, keyed by (table file name, cells, mode).
+#: The buffered cells are translated every time a cell is entered or erased,
+#: and the same words are typed frequently, so the same cells are often translated repeatedly.
+#: @type: L{lruCache.LRUCache}
+backTranslationCache = lruCache.LRUCache(BACK_TRANSLATION_CACHE_SIZE)
+
+def _backTranslate(tableFileName, cells, mode):
+	"""Back-translate braille cells into text using liblouis, using L{backTranslationCache} where possible.
+	@param tableFileName: The file name of the input table.
+	@type tableFileName: str
+	@param cells: The braille cells, without L{LOUIS_DOTS_IO_START}.
+	@type cells: [int, ...]
+	@param mode: The liblouis translation mode.
+	@type mode: int
+	@rtype: unicode
+	"""
+	key = (tableFileName, tuple(cells), mode)
+	text = backTranslationCache.get(key)
+	if text is None:
+		data = u"".join([unichr(cell | LOUIS_DOTS_IO_START) for cell in cells])
+		with brailleTables.louisLock:
+			text = backTranslationCache[key] = louis.backTranslate(brailleTables.getTableList(tableFileName),
+				data, mode=mode)[0]
+	return text
+
 #: The singleton BrailleInputHandler instance.
 #: @type: L{BrailleInputHandler}
 handler = None
@@ -116,11 +143,8 @@ class BrailleInputHandler(object):
 			self.bufferText = u""
 		oldTextLen = len(self.bufferText)
 		pos = self.untranslatedStart + self.untranslatedCursorPos
-		data = u"".join([unichr(cell | LOUIS_DOTS_IO_START) for cell in self.bufferBraille[:pos]])
-		self.bufferText = louis.backTranslate(
-			[os.path.join(brailleTables.TABLES_DIR, self._table.fileName),
-			"braille-patterns.cti"],
-			data, mode=louis.dotsIO | louis.noUndefinedDots)[0]
+		self.bufferText = _backTranslate(self._table.fileName, self.bufferBraille[:pos],
+			louis.dotsIO | louis.noUndefinedDots)
 		newText = self.bufferText[oldTextLen:]
 		if newText:
 			# New text was generated by the cells just entered.
@@ -154,14 +178,9 @@ class BrailleInputHandler(object):
 		@return: The previous translated text.
 		@rtype: unicode
 		"""
-		cells = self.bufferBraille[:pos + 1]
-		data = u"".join([unichr(cell | LOUIS_DOTS_IO_START) for cell in cells])
 		oldText = self.bufferText
-		text = louis.backTranslate(
-			[os.path.join(brailleTables.TABLES_DIR, self._table.fileName),
-			"braille-patterns.cti"],
-			data, mode=louis.dotsIO | louis.noUndefinedDots | louis.partialTrans)[0]
-		self.bufferText = text
+		self.bufferText = _backTranslate(self._table.fileName, self.bufferBraille[:pos + 1],
+			louis.dotsIO | louis.noUndefinedDots | louis.partialTrans)
 		return oldText
 
 	def _reportContractedCell(self, pos):
@@ -5,9 +5,19 @@
 #Copyright (C) 2008-2017 NV Access Limited, Joseph Lee
 
 """Manages information about available braille translation tables.
+Tables can be compiled in the background before they are first used; see L{warmUp}.
 """
 
+import os
+import re
 import collections
+import threading
+import time
+import marshal
+import louis
+import globalVars
+from logHandler import log
+from fileUtils import FaultTolerantFile
 
 #: The directory in which liblouis braille tables are located.
 TABLES_DIR = r"louis\tables"
@@ -60,6 +70,190 @@ def listTables():
 	tables.sort(key=lambda table: table.displayName)
 	return tables
 
+#: liblouis is not thread-safe and tables may be compiled on a background thread by L{warmUp}.
+#: Therefore, this lock must be held while calling liblouis.
+#: @type: threading.Lock
+louisLock = threading.Lock()
+
+def getTableList(fileName):
+	"""Get the list of tables to pass to liblouis to translate using a table.
+	@param fileName: The file name of the table.
+	@type fileName: basestring
+	@rtype: list
+	"""
+	return [os.path.join(TABLES_DIR, fileName), "braille-patterns.cti"]
+
+#: Metadata about a braille table file.
+#: This has the following attributes:
+#: * fileName: The file name of the table.
+#: * size: The total size in bytes of the table and all of the tables it includes.
+#: * mtime: The modification time of the table file.
+#: * includes: The file names of the tables included by this table, directly or indirectly, in the order they are included.
+#: * includeMtimes: The modification times of the included tables in the same order as includes, C{None} for tables which don't exist.
+#: * compileTime: The time in seconds liblouis took to compile the table the last time it was warmed up, C{None} if unknown.
+TableMetadata = collections.namedtuple("TableMetadata", ("fileName", "size", "mtime", "includes", "includeMtimes", "compileTime"))
+
+#: Maps table file names to L{TableMetadata} objects.
+#: This is saved so that compile times are known from previous runs; see L{saveMetadataIndex}.
+_metadata = {}
+#: Metadata is updated by L{warmUp} on a background thread,
+#: so this lock must be held while accessing L{_metadata}.
+#: @type: threading.Lock
+_metadataLock = threading.Lock()
+#: The tables which have been compiled by liblouis in this process.
+_compiledTables = set()
+
+_INCLUDE_RE = re.compile(r"^[ \t]*include[ \t]+(\S+)", re.MULTILINE)
+
+def _getIncludes(fileName, includes, mtimes):
+	"""Add the tables included by a table, directly or indirectly, to a list.
+	The modification time of each included table is added to another list,
+	or C{None} if the table doesn't exist.
+	@return: The total size of the included tables.
+	@rtype: int
+	"""
+	size = 0
+	try:
+		with open(os.path.join(TABLES_DIR, fileName), "rb") as f:
+			text = f.read()
+	except IOError:
+		return size
+	for include in _INCLUDE_RE.findall(text):
+		if include in includes:
+			continue
+		includes.append(include)
+		try:
+			stat = os.stat(os.path.join(TABLES_DIR, include))
+		except OSError:
+			mtimes.append(None)
+			continue
+		mtimes.append(stat.st_mtime)
+		size += stat.st_size + _getIncludes(include, includes, mtimes)
+	return size
+
+def _getMtimes(fileNames):
+	mtimes = []
+	for fileName in fileNames:
+		try:
+			mtimes.append(os.path.getmtime(os.path.join(TABLES_DIR, fileName)))
+		except OSError:
+			mtimes.append(None)
+	return tuple(mtimes)
+
+def getTableMetadata(fileName):
+	"""Get metadata about a table file.
+	The table and the tables it includes are only read if the table or any of the tables it includes
+	have changed since its metadata was last determined.
+	@param fileName: The file name of the table.
+	@type fileName: basestring
+	@rtype: L{TableMetadata}
+	@raise EnvironmentError: If the table file can't be accessed.
+	"""
+	stat = os.stat(os.path.join(TABLES_DIR, fileName))
+	with _metadataLock:
+		metadata = _metadata.get(fileName)
+	if metadata and metadata.mtime == stat.st_mtime and _getMtimes(metadata.includes) == metadata.includeMtimes:
+		return metadata
+	includes = []
+	includeMtimes = []
+	size = stat.st_size + _getIncludes(fileName, includes, includeMtimes)
+	metadata = TableMetadata(fileName, size, stat.st_mtime, tuple(includes), tuple(includeMtimes), None)
+	with _metadataLock:
+		_metadata[fileName] = metadata
+	return metadata
+
+def compileTable(fileName):
+	"""Have liblouis compile a table so that it is ready to be used for translation.
+	This does nothing if the table has already been compiled.
+	The time taken is logged and recorded in the table's metadata.
+	@param fileName: The file name of the table.
+	@type fileName: basestring
+	@raise RuntimeError: If the table is invalid.
+	"""
+	if fileName in _compiledTables:
+		return
+	with louisLock:
+		# Don't count time spent waiting for the lock; e.g. behind translations on the main thread.
+		startTime = time.time()
+		louis.checkTable(getTableList(fileName))
+		compileTime = time.time() - startTime
+	_compiledTables.add(fileName)
+	try:
+		metadata = getTableMetadata(fileName)._replace(compileTime=compileTime)
+	except EnvironmentError:
+		log.debugWarning("Couldn't get metadata for table %s" % fileName, exc_info=True)
+		return
+	with _metadataLock:
+		_metadata[fileName] = metadata
+	log.info("Compiled braille table %s in %.0f ms (%d bytes, %d included tables)" % (
+		fileName, compileTime * 1000, metadata.size, len(metadata.includes)))
+
+def _warmUp(fileNames):
+	for fileName in fileNames:
+		try:
+			compileTable(fileName)
+		except:
+			log.error("Error compiling braille table %s" % fileName, exc_info=True)
+
+def warmUp(fileNames):
+	"""Compile tables on a background thread so that they are ready before they are first used.
+	Otherwise, liblouis compiles a table when it is first used for translation,
+	which can noticeably delay the first braille output after startup or switching tables.
+	Tables which have already been compiled are skipped.
+	@param fileNames: The file names of the tables to compile.
+	@type fileNames: iterable of basestring
+	@return: The thread which is compiling the tables, C{None} if there are no tables to compile.
+	@rtype: threading.Thread
+	"""
+	fileNames = [fileName for fileName in fileNames if fileName not in _compiledTables]
+	if not fileNames:
+		return None
+	thread = threading.Thread(target=_warmUp, args=(fileNames,), name="brailleTables.warmUp")
+	thread.daemon = True
+	thread.start()
+	return thread
+
+#: The version of the format of the saved metadata index.
+#: This must be incremented whenever L{TableMetadata} changes.
+METADATA_INDEX_VERSION = 2
+
+def _getMetadataIndexFileName():
+	return os.path.join(globalVars.appArgs.configPath, u"cache", u"brailleTables.dat")
+
+def loadMetadataIndex():
+	"""Load table metadata saved by L{saveMetadataIndex}.
+	"""
+	try:
+		with open(_getMetadataIndexFileName(), "rb") as f:
+			version, entries = marshal.load(f)
+	except (IOError, EOFError, ValueError, TypeError):
+		return
+	if version != METADATA_INDEX_VERSION:
+		return
+	with _metadataLock:
+		for entry in entries:
+			metadata = TableMetadata(*entry)
+			_metadata.setdefault(metadata.fileName, metadata)
+
+def saveMetadataIndex():
+	"""Save the table metadata so that compile times are known in later runs.
+	Nothing is saved if running securely or from the launcher.
+	"""
+	if globalVars.appArgs.secure or globalVars.appArgs.launcher:
+		return
+	fileName = _getMetadataIndexFileName()
+	# Tables might be being compiled in the background, so copy the metadata while holding the lock.
+	with _metadataLock:
+		entries = [tuple(metadata) for metadata in _metadata.itervalues()]
+	try:
+		dirName = os.path.dirname(fileName)
+		if not os.path.isdir(dirName):
+			os.makedirs(dirName)
+		with FaultTolerantFile(fileName) as f:
+			marshal.dump((METADATA_INDEX_VERSION, entries), f)
+	except (IOError, OSError, ValueError):
+		log.debugWarning("Error saving braille table metadata", exc_info=True)
+
 #: Maps old table names to new table names for tables renamed in newer versions of liblouis.
 RENAMED_TABLES = {
 	"ar-fa.utb" : "fa-ir-g1.utb",
@@ -0,0 +1,245 @@
+#brailleWriteScheduler.py
+#A part of NonVisual Desktop Access (NVDA)
+#Copyright (C) 2017 NV Access Limited
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+
+"""Scheduling of writes to braille displays.
+Writing cells to a display can be slow, particularly for serial displays.
+Rather than blocking the main thread, cells for thread-safe display drivers are written by a background thread.
+Writes are coalesced; i.e. if several writes are queued while an earlier write is still in progress,
+only the most recent cells are written.
+Writes of cells which are the same as the cells last written are skipped,
+and drivers can specify a minimum interval between writes.
+If the driver supports it, only the range of cells which changed is written.
+Statistics for each driver are recorded in L{stats}.
+This module only uses portable threading primitives so that it can be tested on any platform.
+See the L{WriteScheduler} class.
+"""
+
+import threading
+import time
+from logHandler import log
+
+class WriteStats(object):
+	"""Statistics for writes to a braille display driver.
+	"""
+
+	def __init__(self):
+		#: The number of writes to the display.
+		#: @type: int
+		self.writes = 0
+		#: The number of cells written to the display.
+		#: @type: int
+		self.cellsWritten = 0
+		#: The number of writes which only wrote the range of cells which changed.
+		#: @type: int
+		self.rangeWrites = 0
+		#: The number of writes skipped because the cells were the same as those last written.
+		#: @type: int
+		self.unchangedSkipped = 0
+		#: The number of queued writes which were replaced by a later write before they were written.
+		#: @type: int
+		self.coalesced = 0
+		#: The time of the first and most recent writes.
+		#: @type: float
+		self.firstWriteTime = self.lastWriteTime = None
+
+	def _get_writesPerSecond(self):
+		if self.writes < 2 or self.lastWriteTime <= self.firstWriteTime:
+			return 0.0
+		return (self.writes - 1) / (self.lastWriteTime - self.firstWriteTime)
+	#: The average number of writes per second between the first and most recent writes.
+	#: @type: float
+	writesPerSecond = property(_get_writesPerSecond)
+
+	def __repr__(self):
+		return ("<WriteStats: {writes} writes ({rate:.1f}/s), {ranges} range writes, {cells} cells, "
+			"{unchanged} unchanged skipped, {coalesced} coalesced>").format(
+			writes=self.writes, rate=self.writesPerSecond, ranges=self.rangeWrites, cells=self.cellsWritten,
+			unchanged=self.unchangedSkipped, coalesced=self.coalesced)
+
+#: Write statistics for each display driver, keyed by driver name.
+#: These persist when a driver is reloaded.
+#: @type: dict
+stats = {}
+
+_timer = time.time
+
+def getChangedRange(oldCells, newCells):
+	"""Get the range of cells which differ between two sequences of cells of the same length.
+	@return: The start and end (exclusive) of the changed range,
+		C{None} if the cells are the same.
+	@rtype: tuple
+	"""
+	length = len(newCells)
+	start = 0
+	while start < length and oldCells[start] == newCells[start]:
+		start += 1
+	if start == length:
+		return None
+	end = length
+	while oldCells[end - 1] == newCells[end - 1]:
+		end -= 1
+	return start, end
+
+class WriteScheduler(object):
+	"""Writes cells to a braille display, either immediately or on a background thread.
+	Use L{write} for drivers which must be called from the main thread
+	and L{queue} for thread-safe drivers.
+	"""
+
+	def __init__(self, name, write, writeRange=None, onError=None, minInterval=0):
+		"""
+		@param name: The name of the display driver, used to record statistics in L{stats}.
+		@type name: str
+		@param write: A callable which writes a list of cells to the display;
+			usually the driver's C{display} method.
+		@type write: callable
+		@param writeRange: A callable which writes a range of cells to the display,
+			taking the start position and the list of cells to write;
+			usually the driver's C{displayRange} method.
+			If this raises C{NotImplementedError}, it is not used again and all cells are written instead.
+		@type writeRange: callable
+		@param onError: A callable to call (with no arguments) if an error occurs writing on the background thread.
+			It is called from within an exception handler on the background thread.
+		@type onError: callable
+		@param minInterval: The minimum time in seconds between writes on the background thread.
+			Writes queued during this time are coalesced.
+		@type minInterval: float
+		"""
+		self.name = name
+		self._write = write
+		self._writeRange = writeRange
+		self._onError = onError
+		self.minInterval = minInterval
+		try:
+			self.stats = stats[name]
+		except KeyError:
+			self.stats = stats[name] = WriteStats()
+		self._lastCells = None
+		self._lastWriteTime = None
+		self._condition = threading.Condition()
+		#: The cells waiting to be written by the background thread, C{None} if there are none.
+		self._queued = None
+		self._isWriting = False
+		self._exit = False
+		self._thread = None
+
+	def write(self, cells):
+		"""Write cells to the display immediately.
+		Writes of cells which are the same as the cells last written are skipped.
+		If only some cells changed since the last write, only the changed range is written if possible.
+		Exceptions raised by the driver are propagated to the caller.
+		@param cells: The cells to write.
+		@type cells: [int, ...]
+		"""
+		lastCells = self._lastCells
+		if cells == lastCells:
+			self.stats.unchangedSkipped += 1
+			return
+		# Make sure the cells can't be considered unchanged if the write fails.
+		self._lastCells = None
+		stats = self.stats
+		if self._writeRange and lastCells is not None and len(lastCells) == len(cells):
+			start, end = getChangedRange(lastCells, cells)
+		else:
+			start, end = 0, len(cells)
+		if end - start < len(cells):
+			try:
+				self._writeRange(start, cells[start:end])
+				stats.rangeWrites += 1
+			except NotImplementedError:
+				self._writeRange = None
+				start, end = 0, len(cells)
+		if end - start == len(cells):
+			self._write(cells)
+		self._lastCells = cells
+		now = self._lastWriteTime = _timer()
+		stats.writes += 1
+		stats.cellsWritten += end - start
+		if stats.firstWriteTime is None:
+			stats.firstWriteTime = now
+		stats.lastWriteTime = now
+
+	def queue(self, cells):
+		"""Queue cells to be written by the background thread.
+		If cells are already waiting to be written, they are replaced.
+		The background thread is started if it isn't already running.
+		@param cells: The cells to write.
+			These must not be modified after they are queued.
+		@type cells: [int, ...]
+		"""
+		with self._condition:
+			if self._exit:
+				return
+			if self._queued is not None:
+				self.stats.coalesced += 1
+			self._queued = cells
+			if not self._thread:
+				self._thread = threading.Thread(target=self._run, name="brailleWriteScheduler.%s" % self.name)
+				self._thread.daemon = True
+				self._thread.start()
+			self._condition.notify_all()
+
+	def flush(self, timeout=None):
+		"""Wait until all queued cells have been written.
+		@param timeout: The maximum time to wait in seconds, C{None} to wait indefinitely.
+		@type timeout: float
+		@return: C{True} if all cells were written, C{False} if the timeout elapsed.
+		@rtype: bool
+		"""
+		endTime = _timer() + timeout if timeout is not None else None
+		with self._condition:
+			while (self._queued is not None or self._isWriting) and not self._exit:
+				if endTime is None:
+					self._condition.wait()
+					continue
+				remaining = endTime - _timer()
+				if remaining <= 0:
+					return False
+				self._condition.wait(remaining)
+		return True
+
+	def stop(self):
+		"""Stop the background thread.
+		Any cells which haven't been written yet are discarded.
+		This waits for a write in progress to complete unless it is called from the background thread itself.
+		"""
+		with self._condition:
+			self._exit = True
+			self._queued = None
+			thread = self._thread
+			self._condition.notify_all()
+		if thread and thread is not threading.current_thread():
+			thread.join()
+
+	def _run(self):
+		condition = self._condition
+		while True:
+			with condition:
+				while self._queued is None and not self._exit:
+					condition.wait()
+				if self._exit:
+					return
+				if self._lastWriteTime is not None and self.minInterval:
+					delay = self._lastWriteTime + self.minInterval - _timer()
+					if delay > 0:
+						# Wait until writing is allowed.
+						# Writes queued in the meantime replace the queued cells.
+						condition.wait(delay)
+						continue
+				cells = self._queued
+				self._queued = None
+				self._isWriting = True
+			try:
+				self.write(cells)
+			except:
+				if self._onError:
+					self._onError()
+				else:
+					log.error("Error writing to braille display %s" % self.name, exc_info=True)
+			finally:
+				with condition:
+					self._isWriting = False
+					condition.notify_all()
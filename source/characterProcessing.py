@@ -9,8 +9,88 @@ import os
 import codecs
 import collections
 import re
+import marshal
+import hashlib
 from logHandler import log
 import globalVars
+from lruCache import LRUCache
+from regexpUtils import makeTriePattern, getStartCharacters
+from fileUtils import FaultTolerantFile
+
+def _getCacheFileName(name):
+	return os.path.join(globalVars.appArgs.configPath, u"cache", name)
+
+def _loadCachedData(name):
+	"""Load data previously saved with L{_saveCachedData}.
+	@param name: The name of the cache file.
+	@type name: unicode
+	@return: The cached data or C{None} if it couldn't be loaded.
+	"""
+	try:
+		with open(_getCacheFileName(name), "rb") as f:
+			return marshal.load(f)
+	except (IOError, EOFError, ValueError, TypeError):
+		return None
+
+def _saveCachedData(name, data):
+	"""Save data which is expensive to compute so that it can be loaded later with L{_loadCachedData}.
+	Nothing is saved if running securely or from the launcher.
+	@param name: The name of the cache file.
+	@type name: unicode
+	@param data: The data to save.
+		This must only contain types supported by the marshal module.
+	"""
+	if globalVars.appArgs.secure or globalVars.appArgs.launcher:
+		return
+	fileName = _getCacheFileName(name)
+	try:
+		dirName = os.path.dirname(fileName)
+		if not os.path.isdir(dirName):
+			os.makedirs(dirName)
+		with FaultTolerantFile(fileName) as f:
+			marshal.dump(data, f)
+	except (IOError, OSError, ValueError):
+		log.debugWarning("Error saving cache file %s" % fileName, exc_info=True)
+
+#: The version of the format of the cache files written by L{_parseFileCached}.
+#: This must be incremented whenever the format of these files changes.
+PARSED_FILE_CACHE_VERSION = 2
+
+def _parseFileCached(fileName, parse, parseVersion, *args):
+	"""Parse a file, using the data cached from a previous parse if the file hasn't changed.
+	The cached data is only used if the contents of the file, the parser version and the arguments are the same.
+	The contents are compared using a digest rather than the size and modification time,
+	since an edit may not change either of these; e.g. within the resolution of the file system's timestamps.
+	@param fileName: The name of the file to parse.
+	@type fileName: basestring
+	@param parse: A function which parses the file.
+		It is called with C{fileName} and C{args} and must return data supported by the marshal module.
+	@type parse: callable
+	@param parseVersion: The version of the parser.
+		This must be changed whenever a change to C{parse} changes the data it returns for a file.
+	@type parseVersion: int
+	@param args: Additional arguments for C{parse} which affect the parsed data.
+	@return: The parsed data.
+	@raise IOError: If the file cannot be read.
+	"""
+	try:
+		with open(fileName, "rb") as f:
+			digest = hashlib.md5(f.read()).hexdigest()
+	except IOError:
+		# Let parse raise the appropriate error.
+		return parse(fileName, *args)
+	path = os.path.abspath(fileName)
+	if isinstance(path, unicode):
+		path = path.encode("utf-8")
+	cacheName = u"parsed-%s.dat" % hashlib.md5(path).hexdigest()
+	cacheKey = (PARSED_FILE_CACHE_VERSION, marshal.version, parseVersion, path, digest, args)
+	cached = _loadCachedData(cacheName)
+	# The cache file might contain anything if it was corrupted.
+	if isinstance(cached, tuple) and len(cached) == 2 and cached[0] == cacheKey:
+		return cached[1]
+	data = parse(fileName, *args)
+	_saveCachedData(cacheName, (cacheKey, data))
+	return data
 
 class LocaleDataMap(object):
 	"""Allows access to locale-specific data objects, dynamically loading them if needed on request"""
@@ -55,9 +135,14 @@ class LocaleDataMap(object):
 		@type locale: str
 		"""
 		try:
-			del self._dataMap[locale]
+			data = self._dataMap.pop(locale)
 		except KeyError:
-			pass
+			return
+		# Other code might still hold a reference to the old data object.
+		# Make sure it doesn't keep returning results cached from the old data.
+		clearCache = getattr(data, "clearCache", None)
+		if clearCache:
+			clearCache()
 
 class CharacterDescriptions(object):
 	"""
@@ -65,15 +150,27 @@ class CharacterDescriptions(object):
 	The data is loaded from a file from the requested locale.
 	"""
 
+	#: The version of L{_parse}, used to invalidate cached data when the parser changes.
+	#: @type: int
+	PARSE_VERSION = 1
+
 	def __init__(self,locale):
 		"""
 		@param locale: The characterDescriptions.dic file will be found by using this locale.
 		@type locale: string
 		"""
-		self._entries = {}
 		fileName=os.path.join('locale',locale,'characterDescriptions.dic')
 		if not os.path.isfile(fileName): 
 			raise LookupError(fileName)
+		self._entries = _parseFileCached(fileName, self._parse, self.PARSE_VERSION)
+		#: The length of the longest sequence of characters which has a description.
+		#: @type: int
+		self.maxCharacterLength = max(len(key) for key in self._entries) if self._entries else 0
+		log.debug("Loaded %d entries." % len(self._entries))
+
+	@staticmethod
+	def _parse(fileName):
+		entries = {}
 		f = codecs.open(fileName,"r","utf_8_sig",errors="replace")
 		for line in f:
 			if line.isspace() or line.startswith('#'):
@@ -82,11 +179,11 @@ class CharacterDescriptions(object):
 			temp=line.split("\t")
 			if len(temp) > 1:
 				key=temp.pop(0)
-				self._entries[key] = temp
+				entries[key] = temp
 			else:
 				log.warning("can't parse line '%s'" % line)
-		log.debug("Loaded %d entries." % len(self._entries))
 		f.close()
+		return entries
 
 	def getCharacterDescription(self, character):
 		"""
@@ -116,6 +213,26 @@ def getCharacterDescription(locale,character):
 	if not desc and not locale.startswith('en'):
 		desc=getCharacterDescription('en',character)
 	return desc
+
+def getMaxDescribedCharacterLength(locale):
+	"""
+	Finds the length of the longest sequence of characters which L{getCharacterDescription} might find a description for in the given locale.
+	Longer sequences never have a description, so callers searching text for described sequences need not look them up.
+	@param locale: the locale (language[_COUNTRY]) in question.
+	@type locale: string
+	@rtype: int
+	"""
+	try:
+		l=_charDescLocaleDataMap.fetchLocaleData(locale)
+	except LookupError:
+		if not locale.startswith('en'):
+			return getMaxDescribedCharacterLength('en')
+		raise LookupError("en")
+	maxLength=l.maxCharacterLength
+	if not locale.startswith('en'):
+		# getCharacterDescription falls back to English.
+		maxLength=max(maxLength,getMaxDescribedCharacterLength('en'))
+	return maxLength
  
 # Speech symbol levels
 SYMLVL_NONE = 0
@@ -180,6 +297,10 @@ class SpeechSymbols(object):
 	This is all handled by L{SpeechSymbolProcessor}.
 	"""
 
+	#: The version of L{_parse}, used to invalidate cached data when the parser changes.
+	#: @type: int
+	PARSE_VERSION = 1
+
 	def __init__(self):
 		"""Constructor.
 		"""
@@ -196,6 +317,21 @@ class SpeechSymbols(object):
 		@raise IOError: If the file cannot be read.
 		"""
 		self.fileName = fileName
+		# Parsing is slow, so the parsed data is cached.
+		complexSymbols, symbols = _parseFileCached(fileName, self._parse, self.PARSE_VERSION, allowComplexSymbols)
+		self.complexSymbols.update(complexSymbols)
+		for fields in symbols:
+			self.symbols[fields[0]] = SpeechSymbol(*fields)
+
+	@classmethod
+	def _parse(cls, fileName, allowComplexSymbols):
+		"""Parse symbol information from a file.
+		@return: The complex symbols as (identifier, pattern) tuples
+			and the symbols as tuples of the L{SpeechSymbol} fields in order.
+		@rtype: tuple of (list, list)
+		@raise IOError: If the file cannot be read.
+		"""
+		parsed = cls()
 		with codecs.open(fileName, "r", "utf_8_sig", errors="replace") as f:
 			handler = None
 			for line in f:
@@ -205,9 +341,9 @@ class SpeechSymbols(object):
 				line = line.rstrip("\r\n")
 				try:
 					if line == "complexSymbols:" and allowComplexSymbols:
-						handler = self._loadComplexSymbol
+						handler = parsed._loadComplexSymbol
 					elif line == "symbols:":
-						handler = self._loadSymbol
+						handler = parsed._loadSymbol
 					elif handler:
 						# This is a line within a section, so handle it according to which section we're in.
 						handler(line)
@@ -216,6 +352,8 @@ class SpeechSymbols(object):
 				except ValueError:
 					log.warning(u"Invalid line in file {file}: {line}".format(
 						file=fileName, line=line))
+		return (parsed.complexSymbols.items(),
+			[tuple(getattr(symbol, field) for field in SpeechSymbol.__slots__) for symbol in parsed.symbols.itervalues()])
 
 	def _loadComplexSymbol(self, line):
 		try:
@@ -367,6 +505,11 @@ def _getSpeechSymbolsForLocale(locale):
 		pass
 	return builtin, user
 
+#: The number of times speech symbol information has changed for any locale.
+#: Code which caches the result of L{processSpeechSymbols} can compare this to detect when its cache is stale.
+#: @type: int
+symbolsChangeCount = 0
+
 class SpeechSymbolProcessor(object):
 	"""
 	Handles processing of symbol pronunciation for a locale.
@@ -375,6 +518,9 @@ class SpeechSymbolProcessor(object):
 
 	#: Caches symbol data for locales.
 	localeSymbols = LocaleDataMap(_getSpeechSymbolsForLocale)
+	#: The maximum number of processed texts to cache; see L{processText}.
+	#: @type: int
+	PROCESSED_TEXT_CACHE_SIZE = 1000
 
 	def __init__(self, locale):
 		"""Constructor.
@@ -382,6 +528,9 @@ class SpeechSymbolProcessor(object):
 		@type locale: str
 		"""
 		self.locale = locale
+		#: Caches the results of L{processText}, keyed by (level, text).
+		#: @type: L{LRUCache}
+		self.processedTextCache = LRUCache(self.PROCESSED_TEXT_CACHE_SIZE)
 
 		# We need to merge symbol data from several sources.
 		sources = self.sources = []
@@ -398,6 +547,14 @@ class SpeechSymbolProcessor(object):
 			sources.append(enBaseSymbols)
 			self.builtinSources.append(enBaseSymbols)
 
+		self._build()
+
+	def _build(self):
+		"""Compute the symbol information from all sources and compile the regular expression used by L{processText}.
+		@raise LookupError: If the regular expression could not be compiled.
+		"""
+		sources = self.sources
+
 		# The computed symbol information from all sources.
 		symbols = self.computedSymbols = collections.OrderedDict()
 		# An indexable list of complex symbols for use in building/executing the regexp.
@@ -460,10 +617,18 @@ class SpeechSymbolProcessor(object):
 			if symbol.displayName is None:
 				symbol.displayName = symbol.identifier
 
+		#: The characters which can start a symbol or repeated characters; see L{hasSymbols}.
+		#: C{None} if this can't be determined for some complex symbol.
+		#: @type: frozenset
+		self.symbolStartCharacters = frozenset(characters).union(symbol[0] for symbol in multiChars)
+		for symbol in complexSymbolsList:
+			startChars = getStartCharacters(symbol.pattern)
+			if startChars is None:
+				self.symbolStartCharacters = None
+				break
+			self.symbolStartCharacters |= startChars
 		# Make characters into a regexp character set.
 		characters = "[%s]" % re.escape("".join(characters))
-		# The simple symbols must be ordered longest first so that the longer symbols will match.
-		multiChars.sort(key=lambda identifier: len(identifier), reverse=True)
 
 		# Build the regexp.
 		patterns = [
@@ -480,17 +645,81 @@ class SpeechSymbolProcessor(object):
 		# Simple symbols.
 		# These are all handled in one named group.
 		# Because the symbols are just text, we know which symbol matched just by looking at the matched text.
+		# The multiple character symbols are matched using a trie so that the longest symbol matches
+		# without trying every symbol at every position, which gets slow as users add symbols.
 		patterns.append(ur"(?P<simple>{multiChars}|{singleChars})".format(
-			multiChars="|".join(re.escape(identifier) for identifier in multiChars),
+			multiChars=makeTriePattern(multiChars),
 			singleChars=characters
 		))
 		pattern = "|".join(patterns)
 		try:
 			self._regexp = re.compile(pattern, re.UNICODE)
 		except re.error as e:
-			log.error("Invalid complex symbol regular expression in locale %s: %s" % (locale, e))
+			log.error("Invalid complex symbol regular expression in locale %s: %s" % (self.locale, e))
 			raise LookupError
 
+	def _computeSymbol(self, identifier):
+		"""Compute the information for a single symbol from all sources.
+		This produces the same result as L{_build} for this symbol.
+		@param identifier: The identifier of the symbol.
+		@type identifier: unicode
+		@return: The computed symbol or C{None} if the symbol isn't defined or has no replacement.
+		@rtype: L{SpeechSymbol}
+		"""
+		symbol = SpeechSymbol(identifier)
+		defined = False
+		for source in self.sources:
+			pattern = source.complexSymbols.get(identifier)
+			if pattern is not None:
+				symbol.pattern = pattern
+				defined = True
+				break
+		for source in self.sources:
+			sourceSymbol = source.symbols.get(identifier)
+			if not sourceSymbol:
+				continue
+			defined = True
+			if symbol.replacement is None:
+				symbol.replacement = sourceSymbol.replacement
+			if symbol.level is None:
+				symbol.level = sourceSymbol.level
+			if symbol.preserve is None:
+				symbol.preserve = sourceSymbol.preserve
+			if symbol.displayName is None:
+				symbol.displayName = sourceSymbol.displayName
+		if not defined or symbol.replacement is None:
+			return None
+		if symbol.level is None:
+			symbol.level = SYMLVL_ALL
+		if symbol.preserve is None:
+			symbol.preserve = SYMPRES_NEVER
+		if symbol.displayName is None:
+			symbol.displayName = symbol.identifier
+		return symbol
+
+	def _applyChange(self, identifier):
+		"""Apply a change to the source information for a symbol.
+		If only the replacement, level, preserve mode or display name changed,
+		the computed symbol is updated in place.
+		Otherwise, the text matched by the regular expression changes,
+		so everything is rebuilt.
+		@param identifier: The identifier of the symbol which changed.
+		@type identifier: unicode
+		"""
+		self.clearCache()
+		oldSymbol = self.computedSymbols.get(identifier)
+		newSymbol = self._computeSymbol(identifier)
+		if not oldSymbol and not newSymbol:
+			return
+		if not oldSymbol or not newSymbol or oldSymbol.pattern != newSymbol.pattern:
+			self._build()
+			return
+		oldSymbol.replacement = newSymbol.replacement
+		oldSymbol.level = newSymbol.level
+		oldSymbol.preserve = newSymbol.preserve
+		oldSymbol.displayName = newSymbol.displayName
+
+
 	def _regexpRepl(self, m):
 		group = m.lastgroup
 
@@ -526,13 +755,50 @@ class SpeechSymbolProcessor(object):
 				return suffix
 
 	def processText(self, text, level):
+		# The same text is often processed many times; e.g. control type labels, state names and repeated list items.
+		# The result depends only on the level and the text, so we can cache it.
+		key = (level, text)
+		try:
+			return self.processedTextCache[key]
+		except KeyError:
+			pass
 		self._level = level
-		return self._regexp.sub(self._regexpRepl, text)
+		processed = self._regexp.sub(self._regexpRepl, text)
+		self.processedTextCache[key] = processed
+		return processed
+
+	def hasSymbols(self, text):
+		"""Determine whether the given text contains any symbols.
+		If not, L{processText} will return the text unchanged
+		except for the removal of repeated spaces at the end.
+		This only checks whether the text contains a character which can start a symbol,
+		so it might return C{True} even though L{processText} won't change the text.
+		@param text: The text in question.
+		@type text: basestring
+		@rtype: bool
+		"""
+		startChars = self.symbolStartCharacters
+		if startChars is None:
+			# Searching the text would take as long as processing it, which is cached.
+			return True
+		if not startChars.isdisjoint(text):
+			return True
+		# Repeated spaces at the end are removed.
+		# As in the regular expression, a single line feed can follow them.
+		return text.endswith("  ") or text.endswith("  \n")
+
+	def clearCache(self):
+		"""Clear any cached processed text.
+		This must be called whenever a change to the symbol information might change the result of L{processText}.
+		"""
+		global symbolsChangeCount
+		self.processedTextCache.clear()
+		symbolsChangeCount += 1
 
 	def updateSymbol(self, newSymbol):
 		"""Update information for a symbol if it has changed.
-		If there is a change, the changed information will be added to the user's symbol data.
-		These changes do not take effect until the symbol processor is reinitialised.
+		If there is a change, the changed information will be added to the user's symbol data
+		and will take effect immediately.
 		@param newSymbol: The symbol to update.
 		@type newSymbol: L{SpeechSymbol}
 		@return: Whether there was a change.
@@ -572,19 +838,21 @@ class SpeechSymbolProcessor(object):
 
 		# Do this in case the symbol wasn't in userSymbols before.
 		self.userSymbols.symbols[identifier] = userSymbol
+		self._applyChange(identifier)
 		return True
 
 	def deleteSymbol(self, symbol):
 		"""Delete a user defined symbol.
 		If the symbol does not exist, this method simply does nothing.
-		These changes do not take effect until the symbol processor is reinitialised.
+		The change takes effect immediately.
 		@param symbol: The symbol to delete.
 		@type symbol: L{SpeechSymbol}
 		"""
 		try:
 			del self.userSymbols.symbols[symbol.identifier]
 		except KeyError:
-			pass
+			return
+		self._applyChange(symbol.identifier)
 
 	def isBuiltin(self, symbolIdentifier):
 		"""Determine whether a symbol is built in.
@@ -614,6 +882,22 @@ def processSpeechSymbols(locale, text, level):
 		raise
 	return ss.processText(text, level)
 
+def hasSpeechSymbols(locale, text):
+	"""Determine whether L{processSpeechSymbols} could change the given text.
+	@param locale: The locale of the text.
+	@type locale: str
+	@param text: The text in question.
+	@type text: str
+	@rtype: bool
+	"""
+	try:
+		ss = _localeSpeechSymbolProcessors.fetchLocaleData(locale)
+	except LookupError:
+		if not locale.startswith("en_"):
+			return hasSpeechSymbols("en", text)
+		raise
+	return ss.hasSymbols(text)
+
 def processSpeechSymbol(locale, symbol):
 	"""Process a single symbol according to desired pronunciation.
 	@param locale: The locale of the symbol.
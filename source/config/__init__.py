@@ -16,10 +16,10 @@ import sys
 from cStringIO import StringIO
 import itertools
 import contextlib
-from copy import deepcopy
+import threading
 from collections import OrderedDict
 from configobj import ConfigObj, ConfigObjError
-from validate import Validator
+from validate import Validator, ValidateError
 from logHandler import log, levelNames
 from logging import DEBUG
 import shlobj
@@ -29,6 +29,7 @@ from fileUtils import FaultTolerantFile
 import winKernel
 import extensionPoints
 import profileUpgrader
+import profileWriter
 from .configSpec import confspec
 
 #: The active configuration, C{None} if it has not yet been loaded.
@@ -38,9 +39,17 @@ conf = None
 #: Notifies when the configuration profile is switched.
 #: This allows components to apply changes required by the new configuration.
 #: For example, braille switches braille displays if necessary.
-#: Handlers are called with no arguments.
+#: Handlers can optionally accept a C{changedKeys} keyword argument.
+#: This is a frozenset of the dotted paths (as accepted by L{ConfigManager.getValue})
+#: of the settings whose values changed,
+#: or C{None} if it isn't known which settings changed; e.g. when the configuration is reset.
+#: Handlers can use this to skip work which isn't needed.
 configProfileSwitched = extensionPoints.Action()
 
+#: The time in seconds to wait for further saves before writing configuration files in the background.
+#: @see: L{ConfigManager.save}
+SAVE_DELAY = 0.5
+
 def initialize():
 	global conf
 	conf = ConfigManager()
@@ -55,6 +64,8 @@ def saveOnExit():
 			conf.save()
 		except:
 			pass
+	# Files might still be being written by an earlier save.
+	conf.waitForSave()
 
 def isInstalledCopy():
 	"""Checks to see if this running copy of NVDA is installed on the system"""
@@ -303,6 +314,13 @@ class ConfigManager(object):
 		self.spec = confspec
 		#: All loaded profiles by name.
 		self._profileCache = {}
+		#: Parsed profiles and the modification time and size of their files when they were parsed, by file name.
+		#: This allows profiles to be reused if they are loaded again and their files haven't changed.
+		#: This must only be accessed while L{_loadProfileLock} is held.
+		#: @type: dict
+		self._parsedProfiles = {}
+		#: Held while loading a profile so that profiles being preloaded on a background thread aren't loaded twice.
+		self._loadProfileLock = threading.Lock()
 		#: The active profiles.
 		self.profiles = []
 		#: Whether profile triggers are enabled (read-only).
@@ -310,6 +328,12 @@ class ConfigManager(object):
 		self.profileTriggersEnabled = True
 		self.validator = Validator()
 		self.rootSection = None
+		#: The active profiles when the profile switch was last handled.
+		self._activeProfiles = []
+		#: A flattened snapshot of the configuration; see L{getSnapshot}.
+		#: Settings are added as they are read by L{getValue}.
+		#: @type: L{ConfigSnapshot}
+		self._snapshot = ConfigSnapshot()
 		self._shouldHandleProfileSwitch = True
 		self._pendingHandleProfileSwitch = False
 		self._suspendedTriggers = None
@@ -323,19 +347,82 @@ class ConfigManager(object):
 		self.triggersToProfiles = None
 		self._loadProfileTriggers()
 		#: The names of all profiles that have been modified since they were last saved.
+		#: This must only be accessed while L{_dirtyProfilesLock} is held,
+		#: as profiles which couldn't be written are marked dirty again on the background thread.
 		self._dirtyProfiles = set()
+		self._dirtyProfilesLock = threading.Lock()
+		self._writer = profileWriter.ProfileWriter(self._writeQueuedProfile, delay=SAVE_DELAY)
+		self._preloadProfiles()
 
 	def _handleProfileSwitch(self):
 		if not self._shouldHandleProfileSwitch:
 			self._pendingHandleProfileSwitch = True
 			return
 		init = self.rootSection is None
-		# Reset the cache.
-		self.rootSection = AggregatedSection(self, (), self.spec, self.profiles)
+		oldProfiles = self._activeProfiles
+		self._activeProfiles = list(self.profiles)
+		changedProfiles = None if init else self._getChangedProfiles(oldProfiles, self._activeProfiles)
+		if changedProfiles is None:
+			# Reset the cache.
+			self.rootSection = AggregatedSection(self, (), self.spec, list(self._activeProfiles))
+			self._invalidateSnapshot()
+			changedKeys = None
+		else:
+			# Only the settings in the profiles which were activated or deactivated can have changed.
+			# Keep everything else in the cache.
+			paths = set()
+			for profile in changedProfiles:
+				self._getSettingPaths(profile, (), paths)
+			oldValues = dict((path, self._getSectionValue(path)) for path in paths)
+			self.rootSection._handleProfileSwitch(list(self._activeProfiles), changedProfiles)
+			self._invalidateSnapshot(paths)
+			changedKeys = frozenset(".".join(path) for path in paths
+				if self._getSectionValue(path) != oldValues[path])
 		if init:
 			# We're still initialising, so don't notify anyone about this change.
 			return
-		configProfileSwitched.notify()
+		configProfileSwitched.notify(changedKeys=changedKeys)
+
+	def _getChangedProfiles(self, oldProfiles, newProfiles):
+		"""Get the profiles which were activated or deactivated.
+		@return: The changed profiles,
+			C{None} if the order of the profiles which remain active changed.
+		@rtype: list
+		"""
+		oldIds = set(id(profile) for profile in oldProfiles)
+		newIds = set(id(profile) for profile in newProfiles)
+		remaining = [profile for profile in oldProfiles if id(profile) in newIds]
+		if any(old is not new for old, new in itertools.izip(remaining,
+			(profile for profile in newProfiles if id(profile) in oldIds))
+		):
+			return None
+		return ([profile for profile in oldProfiles if id(profile) not in newIds]
+			+ [profile for profile in newProfiles if id(profile) not in oldIds])
+
+	def _getSettingPaths(self, section, path, paths):
+		for key, val in section.iteritems():
+			if not path and key in self.BASE_ONLY_SECTIONS:
+				continue
+			if isinstance(val, dict):
+				self._getSettingPaths(val, path + (key,), paths)
+			else:
+				paths.add(path + (key,))
+
+	def _getSectionValue(self, path):
+		"""Get the value of a setting by looking up its sections.
+		@param path: The names of the sections and the setting.
+		@type path: tuple
+		@return: The value, C{KeyError} if there is no such setting or C{ValidateError} if it is invalid.
+		"""
+		val = self.rootSection
+		try:
+			for key in path:
+				val = val[key]
+		except KeyError:
+			return KeyError
+		except ValidateError:
+			return ValidateError
+		return val
 
 	def _initBaseConf(self, factoryDefaults=False):
 		fn = os.path.join(globalVars.appArgs.configPath, "nvda.ini")
@@ -371,13 +458,13 @@ class ConfigManager(object):
 		profile = ConfigObj(fn, indent_type="\t", encoding="UTF-8", file_error=fileError)
 		# Python converts \r\n to \n when reading files in Windows, so ConfigObj can't determine the true line ending.
 		profile.newlines = "\r\n"
-		profileCopy = deepcopy(profile)
 		try:
 			writeProfileFunc = self._writeProfileToFile if self._shouldWriteProfile else None
 			profileUpgrader.upgrade(profile, self.validator, writeProfileFunc)
 		except Exception as e:
+			# The profile might have been partially upgraded, so log the file as it was loaded.
 			# Log at level info to ensure that the profile is logged.
-			log.info(u"Config before schema update:\n%s" % profileCopy, exc_info=False)
+			log.info(u"Config before schema update:\n%s" % _readConfigFile(fn), exc_info=False)
 			raise e
 		# since profile settings are not yet imported we have to "peek" to see
 		# if debug level logging is enabled.
@@ -405,6 +492,85 @@ class ConfigManager(object):
 	def __setitem__(self, key, val):
 		self.rootSection[key] = val
 
+	def _invalidateSnapshot(self, paths=None):
+		"""Remove settings from the snapshot after they change.
+		@param paths: The paths of the changed settings as tuples of keys,
+			C{None} to remove all settings.
+		@type paths: iterable
+		"""
+		snapshot = self._snapshot
+		# Replace rather than modify the snapshot so that snapshots returned by getSnapshot remain consistent.
+		# This must be done even if the snapshot is empty,
+		# since getValue might be about to add a value it looked up before the change.
+		newSnapshot = self._snapshot = ConfigSnapshot()
+		if paths is None:
+			return
+		newSnapshot._update(snapshot)
+		for path in paths:
+			newSnapshot._pop(".".join(path), None)
+
+	def _flattenSection(self, section, prefix, snapshot):
+		for key in section.iterkeys():
+			if key == "__many__" or (not prefix and key in self.BASE_ONLY_SECTIONS):
+				continue
+			try:
+				val = section[key]
+			except KeyError:
+				# This could happen if the item is in the spec but there's no default.
+				continue
+			except ValidateError:
+				# Leave this out so that the error is raised when the setting is read.
+				log.debugWarning("Invalid value for %s%s" % (prefix, key), exc_info=True)
+				continue
+			if isinstance(val, AggregatedSection):
+				self._flattenSection(val, prefix + key + ".", snapshot)
+			else:
+				snapshot._set(prefix + key, val)
+
+	def getSnapshot(self):
+		"""Get a flattened snapshot of the configuration.
+		This maps the dotted path of every setting (e.g. C{"braille.expandAtCursor"}) to its validated value.
+		A new snapshot is started whenever the profile is switched or a setting is changed.
+		Building a complete snapshot requires validating every setting,
+		so code which only reads particular settings should use L{getValue} instead.
+		Settings in L{BASE_ONLY_SECTIONS} are not included,
+		since they can be changed directly in the base configuration without invalidating the snapshot.
+		@rtype: L{ConfigSnapshot}
+		"""
+		snapshot = self._snapshot
+		if not snapshot.isComplete:
+			self._flattenSection(self.rootSection, "", snapshot)
+			snapshot.isComplete = True
+		return snapshot
+
+	def getValue(self, path):
+		"""Get the value of a setting given its dotted path.
+		This should be used instead of looking up sections in code which reads settings frequently.
+		For example, C{conf.getValue("braille.expandAtCursor")} returns the same value as
+		C{conf["braille"]["expandAtCursor"]}.
+		The first read of a setting after a profile switch looks up its sections as usual
+		and adds the value to the snapshot (see L{getSnapshot}),
+		so subsequent reads only need a single dict lookup.
+		@param path: The names of the sections and the setting separated by dots.
+		@type path: str
+		@return: The value of the setting.
+		@raise KeyError: If there is no such setting.
+		"""
+		# Get the snapshot first, since it might be replaced while the sections are looked up;
+		# e.g. if the profile is switched by another thread.
+		snapshot = self._snapshot
+		try:
+			return snapshot[path]
+		except KeyError:
+			pass
+		keys = path.split(".")
+		val = self
+		for key in keys:
+			val = val[key]
+		if keys[0] not in self.BASE_ONLY_SECTIONS and not isinstance(val, (AggregatedSection, dict)):
+			snapshot._set(path, val)
+		return val
+
 	def listProfiles(self):
 		for name in os.listdir(os.path.join(globalVars.appArgs.configPath, "profiles")):
 			name, ext = os.path.splitext(name)
@@ -423,13 +589,70 @@ class ConfigManager(object):
 
 		# Load the profile.
 		fn = self._getProfileFn(name)
-		profile = self._loadConfig(fn, fileError = True) # file must exist.
+		with self._dirtyProfilesLock:
+			# A profile which was modified after it was parsed must be loaded from the file again.
+			reuse = name not in self._dirtyProfiles
+		with self._loadProfileLock:
+			profile = self._loadProfile(fn, reuse=reuse)
+		with self._dirtyProfilesLock:
+			self._dirtyProfiles.discard(name)
 		profile.name = name
 		profile.manual = False
 		profile.triggered = False
 		self._profileCache[name] = profile
 		return profile
 
+	def _loadProfile(self, fn, reuse=True):
+		"""Load a profile, reusing the previously parsed profile if its file hasn't changed.
+		L{_loadProfileLock} must be held.
+		@param fn: The file name of the profile.
+		@type fn: basestring
+		@param reuse: Whether to reuse a previously parsed profile.
+		@type reuse: bool
+		@rtype: ConfigObj
+		"""
+		try:
+			fileKey = _getFileKey(fn)
+		except OSError:
+			# The file doesn't exist, so let ConfigObj raise an appropriate error.
+			fileKey = None
+		if reuse and fileKey:
+			cachedKey, profile = self._parsedProfiles.get(fn, (None, None))
+			if cachedKey == fileKey:
+				return profile
+		profile = self._loadConfig(fn, fileError = True) # file must exist.
+		# The profile might have been written when it was upgraded.
+		self._parsedProfiles[fn] = (_getFileKey(fn), profile)
+		return profile
+
+	def _preloadProfiles(self, names=None):
+		"""Load profiles on a background thread so they are ready before they are first activated.
+		Otherwise, a profile is loaded when its trigger first applies; e.g. when switching applications.
+		@param names: The names of the profiles to load,
+			C{None} to load all profiles associated with triggers.
+		@type names: iterable of basestring
+		@return: The thread loading the profiles, C{None} if there are no profiles to load.
+		@rtype: threading.Thread
+		"""
+		if names is None:
+			names = set(self.triggersToProfiles.itervalues())
+		fileNames = [self._getProfileFn(name) for name in names if name not in self._profileCache]
+		if not fileNames:
+			return None
+		thread = threading.Thread(target=self._preloadProfilesThread, args=(fileNames,), name="config.preloadProfiles")
+		thread.daemon = True
+		thread.start()
+		return thread
+
+	def _preloadProfilesThread(self, fileNames):
+		for fn in fileNames:
+			try:
+				with self._loadProfileLock:
+					self._loadProfile(fn)
+			except:
+				# The error will be reported if the profile is activated.
+				log.debugWarning("Error preloading profile %s" % fn, exc_info=True)
+
 	def getProfile(self, name):
 		"""Get a profile given its name.
 		This is useful for checking whether a profile has been manually activated or triggered.
@@ -463,40 +686,100 @@ class ConfigManager(object):
 		if len(self.profiles) == 1:
 			# There's nothing other than the base config, which is always saved anyway.
 			return
-		self._dirtyProfiles.add(self.profiles[-1].name)
+		with self._dirtyProfilesLock:
+			self._dirtyProfiles.add(self.profiles[-1].name)
 
 	def _writeProfileToFile(self, filename, profile):
 		with FaultTolerantFile(filename) as f:
 			profile.write(f)
 
-	def save(self):
+	def save(self, wait=True, onComplete=None):
 		"""Save all modified profiles and the base configuration to disk.
+		The configuration is serialised immediately, but the files are written on a background thread.
+		Each file is written to a temporary file which then replaces the original.
+		If C{wait} is C{False}, the files are written after L{SAVE_DELAY},
+		so saving several times in quick succession only writes the files once.
+		@param wait: Whether to wait until the files have been written.
+			If C{False}, errors writing the files are logged and passed to C{onComplete}.
+		@type wait: bool
+		@param onComplete: A callable to call on the background thread once the files have been written.
+			It is passed the first exception raised while writing, or C{None} if there were no errors.
+		@type onComplete: callable
+		@raise Exception: If C{wait} is C{True} and there was an error writing the files.
 		"""
 		if not self._shouldWriteProfile:
 			log.info("Not writing profile, either --secure or --launcher args present")
+			if onComplete:
+				onComplete(None)
 			return
+		with self._dirtyProfilesLock:
+			names = list(self._dirtyProfiles)
 		try:
-			self._writeProfileToFile(self.profiles[0].filename, self.profiles[0])
-			log.info("Base configuration saved")
-			for name in self._dirtyProfiles:
-				self._writeProfileToFile(self._profileCache[name].filename, self._profileCache[name])
-				log.info("Saved configuration profile %s" % name)
-			self._dirtyProfiles.clear()
+			files = [(profile.filename, (_serialiseProfile(profile), profile))
+				for profile in [self.profiles[0]] + [self._profileCache[name] for name in names]]
 		except Exception as e:
-			log.warning("Error saving configuration; probably read only file system")
+			log.warning("Error saving configuration")
 			log.debugWarning("", exc_info=True)
 			raise e
+		with self._dirtyProfilesLock:
+			# Don't just clear the set, as a previous save which failed meanwhile
+			# might have marked other profiles dirty again.
+			self._dirtyProfiles.difference_update(names)
+		errors = []
+		def complete(error):
+			if error:
+				# Make sure the profiles are saved next time.
+				with self._dirtyProfilesLock:
+					self._dirtyProfiles.update(names)
+			errors.append(error)
+			if onComplete:
+				onComplete(error)
+		self._writer.queue(files, onComplete=complete, immediate=wait)
+		if not wait:
+			return
+		self._writer.flush()
+		if errors[0]:
+			log.warning("Error saving configuration; probably read only file system")
+			raise errors[0]
+
+	def waitForSave(self, timeout=None):
+		"""Wait until configuration files being saved in the background have been written.
+		This should be called before exiting.
+		@param timeout: The maximum time to wait in seconds, C{None} to wait indefinitely.
+		@type timeout: float
+		@return: C{True} if all files were written, C{False} if the timeout elapsed.
+		@rtype: bool
+		"""
+		return self._writer.flush(timeout)
+
+	def _writeQueuedProfile(self, fileName, data):
+		"""Write a profile serialised by L{save}.
+		This is called on a background thread.
+		"""
+		serialised, profile = data
+		with FaultTolerantFile(fileName) as f:
+			f.write(serialised)
+		log.info(u"Saved configuration file %s" % fileName)
+		with self._loadProfileLock:
+			cachedKey, parsed = self._parsedProfiles.get(fileName, (None, None))
+			if parsed is profile:
+				# The file now matches the profile, so it can be reused if it is loaded again.
+				# If the profile is modified after it was serialised, it will be marked dirty and not reused.
+				self._parsedProfiles[fileName] = (_getFileKey(fileName), profile)
 
 	def reset(self, factoryDefaults=False):
 		"""Reset the configuration to saved settings or factory defaults.
 		@param factoryDefaults: C{True} to reset to factory defaults, C{False} to reset to saved configuration.
 		@type factoryDefaults: bool
 		"""
+		# Otherwise, a pending save could overwrite the files after they have been read.
+		self.waitForSave()
 		self.profiles = []
 		self._profileCache.clear()
 		# Signal that we're initialising.
 		self.rootSection = None
 		self._initBaseConf(factoryDefaults=factoryDefaults)
+		self._preloadProfiles()
 
 	def createProfile(self, name):
 		"""Create a profile.
@@ -520,6 +803,8 @@ class ConfigManager(object):
 		"""
 		if globalVars.appArgs.secure:
 			return
+		# Otherwise, a pending save could recreate the file after it has been deleted.
+		self.waitForSave()
 		fn = self._getProfileFn(name)
 		if not os.path.isfile(fn):
 			raise LookupError("No such profile: %s" % name)
@@ -528,6 +813,8 @@ class ConfigManager(object):
 			del self._profileCache[name]
 		except KeyError:
 			pass
+		with self._loadProfileLock:
+			self._parsedProfiles.pop(fn, None)
 		# Remove any triggers associated with this profile.
 		allTriggers = self.triggersToProfiles
 		# You can't delete from a dict while iterating through it.
@@ -567,6 +854,8 @@ class ConfigManager(object):
 			return
 		if newName == oldName:
 			return
+		# Otherwise, a pending save could recreate the old file after it has been renamed.
+		self.waitForSave()
 		oldFn = self._getProfileFn(oldName)
 		newFn = self._getProfileFn(newName)
 		if not os.path.isfile(oldFn):
@@ -577,6 +866,8 @@ class ConfigManager(object):
 			raise ValueError("A profile with the same name already exists: %s" % newName)
 
 		os.rename(oldFn, newFn)
+		with self._loadProfileLock:
+			self._parsedProfiles.pop(oldFn, None)
 		# Update any associated triggers.
 		allTriggers = self.triggersToProfiles
 		saveTrigs = False
@@ -593,12 +884,13 @@ class ConfigManager(object):
 			return
 		profile.name = newName
 		self._profileCache[newName] = profile
-		try:
-			self._dirtyProfiles.remove(oldName)
-		except KeyError:
-			# The profile wasn't dirty.
-			return
-		self._dirtyProfiles.add(newName)
+		with self._dirtyProfilesLock:
+			try:
+				self._dirtyProfiles.remove(oldName)
+			except KeyError:
+				# The profile wasn't dirty.
+				return
+			self._dirtyProfiles.add(newName)
 
 	def _triggerProfileEnter(self, trigger):
 		"""Called by L{ProfileTrigger.enter}}}.
@@ -755,6 +1047,50 @@ class ConfigManager(object):
 			spec = spec[nextKey]
 		return conf.validator._parse_with_caching(spec)[2][validationParameter]
 
+def _getFileKey(fn):
+	"""Get a key which changes whenever a file is modified.
+	@raise OSError: If the file doesn't exist.
+	"""
+	stat = os.stat(fn)
+	return stat.st_mtime, stat.st_size
+
+def _serialiseProfile(profile):
+	f = StringIO()
+	profile.write(f)
+	return f.getvalue()
+
+def _readConfigFile(fn):
+	"""Read the text of a configuration file for logging.
+	"""
+	if not fn:
+		return u""
+	try:
+		with open(fn, "rb") as f:
+			return f.read().decode("UTF-8", "replace")
+	except EnvironmentError:
+		return u""
+
+class ConfigSnapshot(dict):
+	"""A read-only, flattened snapshot of the configuration.
+	This is a dict mapping the dotted paths of settings to their values.
+	Values must not be modified.
+	@see: L{ConfigManager.getSnapshot}
+	"""
+
+	def __init__(self):
+		super(ConfigSnapshot, self).__init__()
+		#: Whether all settings have been added to this snapshot.
+		#: @type: bool
+		self.isComplete = False
+
+	def _readOnly(self, *args, **kwargs):
+		raise TypeError("ConfigSnapshot is read-only")
+	__setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readOnly
+
+	_set = dict.__setitem__
+	_update = dict.update
+	_pop = dict.pop
+
 class AggregatedSection(object):
 	"""A view of a section of configuration which aggregates settings from all active profiles.
 	"""
@@ -860,13 +1196,16 @@ class AggregatedSection(object):
 		self._cache[key] = val
 		return val
 
-	def iteritems(self):
+	def iterkeys(self):
+		"""Iterate through the keys in this section in all profiles and the spec.
+		Getting a key from the spec might still raise C{KeyError} if it has no default.
+		"""
 		keys = set()
 		# Start with the cached items.
 		for key, val in self._cache.iteritems():
 			keys.add(key)
 			if val is not KeyError:
-				yield key, val
+				yield key
 		# Walk through the profiles and spec looking for items not yet cached.
 		for profile in itertools.chain(reversed(self.profiles), (self._spec,)):
 			if not profile:
@@ -875,12 +1214,16 @@ class AggregatedSection(object):
 				if key in keys:
 					continue
 				keys.add(key)
-				# Use __getitem__ so caching, AggregatedSections, etc. are handled.
-				try:
-					yield key, self[key]
-				except KeyError:
-					# This could happen if the item is in the spec but there's no default.
-					pass
+				yield key
+
+	def iteritems(self):
+		for key in self.iterkeys():
+			# Use __getitem__ so caching, AggregatedSections, etc. are handled.
+			try:
+				yield key, self[key]
+			except KeyError:
+				# This could happen if the item is in the spec but there's no default.
+				pass
 
 	def copy(self):
 		return dict(self.iteritems())
@@ -909,6 +1252,7 @@ class AggregatedSection(object):
 				del self._cache[key]
 			# If an AggregatedSection isn't already cached,
 			# An appropriate AggregatedSection will be created the next time this section is fetched.
+			self.manager._invalidateSnapshot()
 			return
 
 		if spec:
@@ -930,6 +1274,33 @@ class AggregatedSection(object):
 		self._getUpdateSection()[key] = val
 		self.manager._markWriteProfileDirty()
 		self._cache[key] = val
+		self.manager._invalidateSnapshot((self.path + (key,),))
+
+	def _handleProfileSwitch(self, profiles, changedProfiles):
+		"""Update this section after profiles are activated or deactivated.
+		Cached settings and sections which aren't in any of the changed profiles are kept.
+		@param profiles: This section in each of the active profiles,
+			C{None} for profiles which don't contain it.
+		@type profiles: list
+		@param changedProfiles: This section in each of the profiles which were activated or deactivated,
+			excluding those which don't contain it.
+		@type changedProfiles: list
+		"""
+		self.profiles = profiles
+		for key, val in self._cache.items():
+			changed = [profile[key] for profile in changedProfiles if key in profile]
+			if not isinstance(val, AggregatedSection):
+				if changed:
+					del self._cache[key]
+				continue
+			if not all(isinstance(sect, dict) for sect in changed):
+				del self._cache[key]
+				continue
+			subProfiles = []
+			for profile in profiles:
+				sect = profile.get(key) if profile is not None else None
+				subProfiles.append(sect if isinstance(sect, dict) else None)
+			val._handleProfileSwitch(subProfiles, changed)
 
 	def _getUpdateSection(self):
 		profile = self.profiles[-1]
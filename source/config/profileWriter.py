@@ -0,0 +1,136 @@
+#config/profileWriter.py
+#A part of NonVisual Desktop Access (NVDA)
+#Copyright (C) 2017 NV Access Limited
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+
+"""Writing of configuration files on a background thread.
+Writing files can be slow; e.g. on network drives used for roaming profiles.
+Configuration is serialised on the main thread so that it is consistent,
+but the files are written by a background thread so that this doesn't block the main thread.
+See the L{ProfileWriter} class.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from logHandler import log
+
+_timer = time.time
+
+class ProfileWriter(object):
+	"""Writes queued files on a background thread.
+	Files queued within L{delay} of each other are written together.
+	If a file is queued again before it is written, only the most recently queued data is written.
+	"""
+
+	def __init__(self, write, delay=0):
+		"""
+		@param write: A callable which writes a file, taking the file name and the data queued for it.
+		@type write: callable
+		@param delay: The time in seconds to wait for further files to be queued before writing.
+		@type delay: float
+		"""
+		self._write = write
+		self.delay = delay
+		self._condition = threading.Condition()
+		#: The data waiting to be written, keyed by file name.
+		self._pending = OrderedDict()
+		#: Callables to call once the pending files have been written.
+		self._callbacks = []
+		#: The time at which the pending files should be written.
+		self._dueTime = None
+		#: Whether the pending files should be written without waiting for further files.
+		self._immediate = False
+		self._isWriting = False
+		self._thread = None
+		#: The number of queued files which were replaced by more recently queued data before they were written.
+		#: @type: int
+		self.coalesced = 0
+
+	def queue(self, files, onComplete=None, immediate=False):
+		"""Queue files to be written.
+		@param files: The file names and the data to write to them.
+		@type files: iterable of (basestring, object)
+		@param onComplete: A callable to call on the background thread once the files have been written.
+			It is passed the first exception raised while writing, or C{None} if there were no errors.
+		@type onComplete: callable
+		@param immediate: Whether to write the files without waiting for further files to be queued.
+		@type immediate: bool
+		"""
+		with self._condition:
+			for fileName, data in files:
+				if fileName in self._pending:
+					self.coalesced += 1
+				self._pending[fileName] = data
+			if onComplete:
+				self._callbacks.append(onComplete)
+			if immediate:
+				self._immediate = True
+			# Queuing more files delays writing unless files are already waiting to be written immediately.
+			self._dueTime = _timer() if self._immediate else _timer() + self.delay
+			if not self._thread:
+				self._thread = threading.Thread(target=self._run, name="config.profileWriter")
+				self._thread.daemon = True
+				self._thread.start()
+			self._condition.notify_all()
+
+	def flush(self, timeout=None):
+		"""Write all queued files immediately and wait until they have been written.
+		@param timeout: The maximum time to wait in seconds, C{None} to wait indefinitely.
+		@type timeout: float
+		@return: C{True} if all files were written, C{False} if the timeout elapsed.
+		@rtype: bool
+		"""
+		endTime = _timer() + timeout if timeout is not None else None
+		with self._condition:
+			if self._pending:
+				self._immediate = True
+				self._dueTime = _timer()
+				self._condition.notify_all()
+			while self._pending or self._isWriting:
+				if endTime is None:
+					self._condition.wait()
+					continue
+				remaining = endTime - _timer()
+				if remaining <= 0:
+					return False
+				self._condition.wait(remaining)
+		return True
+
+	def _run(self):
+		condition = self._condition
+		while True:
+			with condition:
+				while not self._pending:
+					condition.wait()
+				delay = self._dueTime - _timer()
+				if delay > 0:
+					# Wait in case more files are queued.
+					condition.wait(delay)
+					continue
+				pending = self._pending
+				callbacks = self._callbacks
+				self._pending = OrderedDict()
+				self._callbacks = []
+				self._dueTime = None
+				self._immediate = False
+				self._isWriting = True
+			error = None
+			try:
+				for fileName, data in pending.iteritems():
+					try:
+						self._write(fileName, data)
+					except Exception as e:
+						log.warning("Error writing configuration file %s" % fileName, exc_info=True)
+						if error is None:
+							error = e
+				for callback in callbacks:
+					try:
+						callback(error)
+					except:
+						log.exception("Error in configuration write callback")
+			finally:
+				with condition:
+					self._isWriting = False
+					condition.notify_all()
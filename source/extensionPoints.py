@@ -78,6 +78,12 @@ class HandlerRegistrar(object):
 		#: This is an OrderedDict where the keys are unique identifiers (as returned by _getHandlerKey)
 		#: and the values are weak references.
 		self._handlers = collections.OrderedDict()
+		#: The weak references to the registered handlers and the keyword arguments each supports,
+		#: in the order the handlers were registered.
+		#: This is built from L{_handlers} when the handlers are next called
+		#: and is C{None} if it must be rebuilt because a handler was registered or unregistered.
+		#: @type: tuple of (weakref, frozenset)
+		self._calls = None
 
 	def register(self, handler):
 		if hasattr(handler, "__self__"):
@@ -87,7 +93,15 @@ class HandlerRegistrar(object):
 		key = _getHandlerKey(handler)
 		# Store the key on the weakref so we can remove the handler when it dies.
 		weak.handlerKey = key
+		# Inspecting the handler is slow, so do this once now rather than each time it is called.
+		try:
+			weak.supportedKwargs = _getSupportedKwargs(handler)
+		except TypeError:
+			# The handler can't be inspected; e.g. it is a callable instance.
+			# It will be inspected (and the error logged) when it is called.
+			weak.supportedKwargs = _UNINSPECTABLE
 		self._handlers[key] = weak
+		self._calls = None
 
 	def unregister(self, handler):
 		if isinstance(handler, (AnnotatableWeakref, BoundMethodWeakref)):
@@ -98,42 +112,78 @@ class HandlerRegistrar(object):
 			del self._handlers[key]
 		except KeyError:
 			return False
+		# This is also called when a handler dies.
+		self._calls = None
 		return True
 
+	def _getCalls(self):
+		"""Get the weak references to the registered handlers and the keyword arguments each supports.
+		The result is cached until a handler is registered or unregistered.
+		Because it is a tuple, it is safe to iterate even if a handler dies or is unregistered meanwhile;
+		the weak reference to such a handler will just return C{None}.
+		@rtype: tuple of (weakref, frozenset)
+		"""
+		calls = self._calls
+		if calls is None:
+			calls = self._calls = tuple((weak, weak.supportedKwargs) for weak in self._handlers.itervalues())
+		return calls
+
 	@property
 	def handlers(self):
 		"""Generator of registered handler functions.
 		This should be used when you want to call the handlers.
 		"""
-		for weak in self._handlers.values():
+		for weak, supportedKwargs in self._getCalls():
 			handler = weak()
 			if not handler:
 				continue # Died.
 			yield handler
 
-def callWithSupportedKwargs(func, *args, **kwargs):
-	"""Call a function with only the keyword arguments it supports.
-	For example, if myFunc is defined as:
-		def myFunc(a=None, b=None):
-	and you call:
-		callWithSupportedKwargs(myFunc, a=1, b=2, c=3)
-	Instead of raising a TypeError, myFunc will simply be called like this:
-		myFunc(a=1, b=2)
+#: Used for L{HandlerRegistrar._calls} when a handler can't be inspected when it is registered.
+_UNINSPECTABLE = object()
+
+def _getSupportedKwargs(func):
+	"""Get the keyword arguments supported by a function.
+	@param func: The function to inspect.
+	@type func: callable
+	@return: The names of the supported keyword arguments
+		or C{None} if the function has a catch-all for keyword arguments (**kwargs).
+	@rtype: frozenset
+	@raise TypeError: If the function can't be inspected.
 	"""
 	spec = inspect.getargspec(func)
 	if spec.keywords:
 		# func has a catch-all for kwargs (**kwargs).
-		return func(*args, **kwargs)
+		return None
 	# spec.defaults lists all arguments with defaults (keyword arguments).
 	numKwargs = len(spec.defaults) if spec.defaults else 0
 	# spec.args lists all arguments, first positional, then keyword.
 	firstKwarg = len(spec.args) - numKwargs
-	supportedKwargs = set(spec.args[firstKwarg:])
-	for kwarg in kwargs.keys():
-		if kwarg not in supportedKwargs:
-			del kwargs[kwarg]
+	return frozenset(spec.args[firstKwarg:])
+
+def _callWithKwargs(func, supportedKwargs, args, kwargs):
+	"""Call a function with only the keyword arguments it supports,
+	given the supported keyword arguments as returned by L{_getSupportedKwargs}.
+	"""
+	if supportedKwargs is _UNINSPECTABLE:
+		return callWithSupportedKwargs(func, *args, **kwargs)
+	if supportedKwargs is not None and kwargs:
+		kwargs = {kwarg: val for kwarg, val in kwargs.iteritems() if kwarg in supportedKwargs}
 	return func(*args, **kwargs)
 
+def callWithSupportedKwargs(func, *args, **kwargs):
+	"""Call a function with only the keyword arguments it supports.
+	For example, if myFunc is defined as:
+		def myFunc(a=None, b=None):
+	and you call:
+		callWithSupportedKwargs(myFunc, a=1, b=2, c=3)
+	Instead of raising a TypeError, myFunc will simply be called like this:
+		myFunc(a=1, b=2)
+	This inspects the function each time it is called.
+	Registered handlers are inspected once when they are registered instead.
+	"""
+	return _callWithKwargs(func, _getSupportedKwargs(func), args, kwargs)
+
 class Action(HandlerRegistrar):
 	"""Allows interested parties to register to be notified when some action occurs.
 	For example, this might be used to notify that the configuration profile has been switched.
@@ -158,9 +208,12 @@ class Action(HandlerRegistrar):
 		"""Notify all registered handlers that the action has occurred.
 		@param kwargs: Arguments to pass to the handlers.
 		"""
-		for handler in self.handlers:
+		for weak, supportedKwargs in self._getCalls():
+			handler = weak()
+			if not handler:
+				continue # Died.
 			try:
-				callWithSupportedKwargs(handler, **kwargs)
+				_callWithKwargs(handler, supportedKwargs, (), kwargs)
 			except:
 				log.exception("Error running handler %r for %r" % (handler, self))
 
@@ -195,9 +248,12 @@ class Filter(HandlerRegistrar):
 		@param kwargs: Arguments to pass to the handlers.
 		@return: The filtered value.
 		"""
-		for handler in self.handlers:
+		for weak, supportedKwargs in self._getCalls():
+			handler = weak()
+			if not handler:
+				continue # Died.
 			try:
-				value = callWithSupportedKwargs(handler, value, **kwargs)
+				value = _callWithKwargs(handler, supportedKwargs, (value,), kwargs)
 			except:
 				log.exception("Error running handler %r for %r" % (handler, self))
 		return value
@@ -239,9 +295,12 @@ class Decider(HandlerRegistrar):
 		@return: The decision.
 		@rtype: bool
 		"""
-		for handler in self.handlers:
+		for weak, supportedKwargs in self._getCalls():
+			handler = weak()
+			if not handler:
+				continue # Died.
 			try:
-				decision = callWithSupportedKwargs(handler, **kwargs)
+				decision = _callWithKwargs(handler, supportedKwargs, (), kwargs)
 			except:
 				log.exception("Error running handler %r for %r" % (handler, self))
 				continue
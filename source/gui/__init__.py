@@ -168,13 +168,21 @@ class MainFrame(wx.Frame):
 			# Translators: Reported when current configuration cannot be saved while NVDA is running in secure mode such as in Windows login screen.
 			queueHandler.queueFunction(queueHandler.eventQueue,ui.message,_("Cannot save configuration - NVDA in secure mode"))
 			return
-		try:
-			config.conf.save()
+		def reportError():
+			# Translators: Message shown when current configuration cannot be saved such as when running NVDA from a CD.
+			messageBox(_("Could not save configuration - probably read only file system"),_("Error"),wx.OK | wx.ICON_ERROR)
+		def onSaved(error):
+			# This is called on a background thread once the configuration has been written.
+			if error:
+				wx.CallAfter(reportError)
+				return
 			# Translators: Reported when current configuration has been saved.
 			queueHandler.queueFunction(queueHandler.eventQueue,ui.message,_("Configuration saved"))
+		try:
+			# Don't block while the files are written.
+			config.conf.save(wait=False, onComplete=onSaved)
 		except:
-			# Translators: Message shown when current configuration cannot be saved such as when running NVDA from a CD.
-			messageBox(_("Could not save configuration - probably read only file system"),_("Error"),wx.OK | wx.ICON_ERROR)
+			reportError()
 
 	def _popupSettingsDialog(self, dialog, *args, **kwargs):
 		if isInMessageBox:
@@ -1964,7 +1964,6 @@ class SpeechSymbolsDialog(SettingsDialog):
 			self.symbolProcessor.userSymbols.save()
 		except IOError as e:
 			log.error("Error saving user symbols info: %s" % e)
-		characterProcessing._localeSpeechSymbolProcessors.invalidateLocaleData(self.symbolProcessor.locale)
 		super(SpeechSymbolsDialog, self).onOk(evt)
 
 class InputGesturesDialog(SettingsDialog):
@@ -30,6 +30,7 @@ import globalVars
 import languageHandler
 import controlTypes
 import keyLabels
+import latencyTracing
 
 #: Script category for emulated keyboard keys.
 # Translators: The name of a category of NVDA commands.
@@ -56,6 +57,10 @@ class InputGesture(baseObject.AutoPropertyObject):
 	#: @type: bool
 	wasInSayAll=False
 
+	#: The latency trace for this gesture if latency tracing is enabled.
+	#: @type: L{latencyTracing.Trace}
+	latencyTrace=None
+
 	#: Indicates that while in Input Help Mode, this gesture should be handled as if Input Help mode was currently off.
 	#: @type: bool
 	bypassInputHelp=False
@@ -409,6 +414,8 @@ class InputManager(baseObject.AutoPropertyObject):
 		@type gesture: L{InputGesture}
 		@raise NoInputGestureAction: If there is no action to perform.
 		"""
+		if not gesture.isModifier:
+			latencyTracing.startTrace(gesture)
 		if watchdog.isAttemptingRecovery:
 			# The core is dead, so don't try to perform an action.
 			# This lets gestures pass through unhindered where possible,
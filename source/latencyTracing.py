@@ -0,0 +1,224 @@
+#latencyTracing.py
+#A part of NonVisual Desktop Access (NVDA)
+#Copyright (C) 2017 NV Access Limited
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+
+"""Optional tracing of the latency between input from the user and the resulting speech.
+When tracing is enabled, each input gesture is stamped when L{inputCore.InputManager.executeGesture} receives it.
+As the gesture is handled, each hop (queueing and executing the script, speaking and passing speech to the synthesizer)
+is recorded in the gesture's L{Trace}.
+Speech and braille output are attributed to the most recent gesture until its output is complete;
+i.e. until speech has been passed to the synthesizer or, if speech is off, until the braille display has been updated.
+The most recent traces are kept in a ring buffer which can be dumped as JSON or in Chrome trace format.
+For example, from the Python console:
+>>> import latencyTracing
+>>> latencyTracing.enable()
+>>> # Press some keys...
+>>> print latencyTracing.dumpJson()
+>>> latencyTracing.saveChromeTrace(r"c:\\trace.json")
+The Chrome trace can be viewed by opening chrome://tracing in Google Chrome.
+"""
+
+import time
+import json
+import collections
+import itertools
+
+#: Hop names.
+HOP_GESTURE = "gesture"
+HOP_QUEUE_SCRIPT = "queueScript"
+HOP_EXECUTE_SCRIPT = "executeScript"
+HOP_SCRIPT_DONE = "scriptDone"
+HOP_SPEAK = "speak"
+HOP_SYNTH_SPEAK = "synthSpeak"
+HOP_SYNTH_SPEAK_DONE = "synthSpeakDone"
+HOP_BRAILLE = "braille"
+
+#: Hops which complete the output for a gesture, ending the active trace; see L{mark}.
+END_HOPS = frozenset((HOP_SYNTH_SPEAK_DONE,))
+#: Hops which complete the output for a gesture only if speech is off.
+#: Otherwise, the braille display is usually updated before speech has been passed to the synthesizer,
+#: so the trace continues until then.
+SPEECH_OFF_END_HOPS = frozenset((HOP_BRAILLE,))
+
+#: The maximum number of traces to keep.
+MAX_TRACES = 100
+#: The maximum number of hops to record in a single trace.
+MAX_HOPS = 50
+
+#: Whether tracing is enabled.
+#: Use L{enable} and L{disable} to change this.
+#: @type: bool
+isEnabled = False
+#: The most recent traces, oldest first.
+#: @type: collections.deque
+traces = collections.deque(maxlen=MAX_TRACES)
+#: The trace for the most recent gesture, C{None} once its output is complete.
+#: Hops which aren't associated with a specific gesture (such as speech) are recorded in this trace.
+#: @type: L{Trace}
+_activeTrace = None
+_traceIds = itertools.count(1)
+
+# time.clock has a much higher resolution than time.time on Windows.
+_timer = time.clock
+
+class Trace(object):
+	"""The hops taken while handling a single gesture.
+	"""
+
+	def __init__(self, name):
+		"""
+		@param name: The name of the gesture.
+		@type name: basestring
+		"""
+		self.id = next(_traceIds)
+		self.name = name
+		#: The hops as (name, time in seconds) tuples in the order they occurred.
+		#: @type: list
+		self.hops = []
+
+	def mark(self, hop):
+		"""Record a hop.
+		Nothing is recorded once the trace has L{MAX_HOPS} hops.
+		@param hop: The name of the hop; one of the C{HOP_*} constants.
+		@type hop: str
+		"""
+		if len(self.hops) < MAX_HOPS:
+			self.hops.append((hop, _timer()))
+
+	def getDeltas(self):
+		"""Get the time taken for each hop.
+		@return: (hop name, milliseconds since the previous hop, milliseconds since the gesture) tuples.
+		@rtype: list
+		"""
+		if not self.hops:
+			return []
+		start = prev = self.hops[0][1]
+		deltas = []
+		for hop, hopTime in self.hops:
+			deltas.append((hop, (hopTime - prev) * 1000, (hopTime - start) * 1000))
+			prev = hopTime
+		return deltas
+
+	def asDict(self):
+		return {
+			"id": self.id,
+			"name": self.name,
+			"hops": [{"hop": hop, "delta": delta, "elapsed": elapsed} for hop, delta, elapsed in self.getDeltas()],
+		}
+
+	def __repr__(self):
+		return "<Trace {id} {name}: {hops}>".format(id=self.id, name=self.name,
+			hops=", ".join("%s +%.2f ms" % (hop, delta) for hop, delta, elapsed in self.getDeltas()))
+
+def enable():
+	"""Enable tracing.
+	"""
+	global isEnabled
+	isEnabled = True
+
+def disable():
+	"""Disable tracing.
+	Existing traces are kept until L{clear} is called.
+	"""
+	global isEnabled, _activeTrace
+	isEnabled = False
+	_activeTrace = None
+
+def clear():
+	"""Discard all traces.
+	"""
+	global _activeTrace
+	traces.clear()
+	_activeTrace = None
+
+def startTrace(gesture):
+	"""Start a trace for a gesture which has just been received.
+	The trace is stored on the gesture as L{inputCore.InputGesture.latencyTrace}
+	and becomes the active trace, replacing the trace for any previous gesture.
+	This does nothing if tracing is disabled.
+	@param gesture: The gesture.
+	@type gesture: L{inputCore.InputGesture}
+	"""
+	global _activeTrace
+	if not isEnabled:
+		return
+	try:
+		name = gesture.identifiers[0]
+	except (IndexError, NotImplementedError):
+		name = repr(gesture)
+	trace = gesture.latencyTrace = _activeTrace = Trace(name)
+	trace.mark(HOP_GESTURE)
+	traces.append(trace)
+
+def markGesture(gesture, hop):
+	"""Record a hop for a specific gesture.
+	This does nothing if tracing is disabled or the gesture wasn't traced.
+	@param gesture: The gesture.
+	@type gesture: L{inputCore.InputGesture}
+	@param hop: The name of the hop; one of the C{HOP_*} constants.
+	@type hop: str
+	"""
+	trace = getattr(gesture, "latencyTrace", None)
+	if isEnabled and trace:
+		trace.mark(hop)
+
+def mark(hop):
+	"""Record a hop for the active trace; i.e. the trace for the most recent gesture.
+	If the hop is one of L{END_HOPS} (or L{SPEECH_OFF_END_HOPS} if speech is off),
+	the output for the gesture is complete, so the active trace ends.
+	This stops later output (e.g. from say all) from being attributed to the gesture.
+	This does nothing if tracing is disabled or there is no active trace.
+	@param hop: The name of the hop; one of the C{HOP_*} constants.
+	@type hop: str
+	"""
+	global _activeTrace
+	trace = _activeTrace
+	if not isEnabled or not trace:
+		return
+	trace.mark(hop)
+	if hop in END_HOPS or (hop in SPEECH_OFF_END_HOPS and not _isSpeechOn()):
+		_activeTrace = None
+
+def _isSpeechOn():
+	# speech imports this module, so import it here.
+	import speech
+	return speech.speechMode == speech.speechMode_talk
+
+def dumpJson():
+	"""Dump all traces as JSON.
+	@rtype: str
+	"""
+	return json.dumps([trace.asDict() for trace in traces], indent=1)
+
+def dumpChromeTrace():
+	"""Dump all traces in the Chrome trace event format.
+	Each trace is shown as a separate row, with each hop as an event lasting until the next hop.
+	@rtype: str
+	"""
+	events = []
+	for trace in traces:
+		hops = trace.hops
+		for index, (hop, hopTime) in enumerate(hops):
+			endTime = hops[index + 1][1] if index + 1 < len(hops) else hopTime
+			events.append({
+				"name": hop,
+				"cat": "latency",
+				"ph": "X",
+				# Chrome trace times are in microseconds.
+				"ts": hopTime * 1000000,
+				"dur": (endTime - hopTime) * 1000000,
+				"pid": 1,
+				"tid": trace.id,
+				"args": {"gesture": trace.name},
+			})
+	return json.dumps({"traceEvents": events})
+
+def saveChromeTrace(fileName):
+	"""Save all traces in the Chrome trace event format.
+	@param fileName: The name of the file.
+	@type fileName: basestring
+	"""
+	with open(fileName, "w") as f:
+		f.write(dumpChromeTrace())
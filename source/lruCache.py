@@ -0,0 +1,97 @@
+#lruCache.py
+#A part of NonVisual Desktop Access (NVDA)
+#Copyright (C) 2017 NV Access Limited
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+
+"""A simple bounded cache which discards the least recently used entries.
+This is used to avoid repeating expensive processing (such as symbol processing or braille translation)
+for input which recurs frequently.
+See the L{LRUCache} class.
+"""
+
+import collections
+
+class LRUCache(object):
+	"""A mapping of a bounded size which discards the least recently used entry when it is full.
+	Lookups and insertions count as uses.
+	The number of successful (hits) and unsuccessful (misses) lookups is recorded,
+	which can be used to determine whether a cache is effective.
+	Example usage:
+	>>> cache = LRUCache(2)
+	>>> cache["a"] = 1
+	>>> cache["b"] = 2
+	>>> cache["a"]
+	1
+	>>> cache["c"] = 3
+	>>> "b" in cache
+	False
+	"""
+
+	def __init__(self, maxSize):
+		"""
+		@param maxSize: The maximum number of entries to hold.
+		@type maxSize: int
+		"""
+		if maxSize < 1:
+			raise ValueError("maxSize must be at least 1")
+		self.maxSize = maxSize
+		self._entries = collections.OrderedDict()
+		#: The number of lookups which found an entry.
+		#: @type: int
+		self.hits = 0
+		#: The number of lookups which did not find an entry.
+		#: @type: int
+		self.misses = 0
+
+	def __getitem__(self, key):
+		try:
+			value = self._entries.pop(key)
+		except KeyError:
+			self.misses += 1
+			raise
+		# Reinsert so that this entry becomes the most recently used.
+		self._entries[key] = value
+		self.hits += 1
+		return value
+
+	def get(self, key, default=None):
+		try:
+			return self[key]
+		except KeyError:
+			return default
+
+	def __setitem__(self, key, value):
+		entries = self._entries
+		try:
+			del entries[key]
+		except KeyError:
+			if len(entries) >= self.maxSize:
+				# Discard the least recently used entry.
+				entries.popitem(last=False)
+		entries[key] = value
+
+	def __delitem__(self, key):
+		del self._entries[key]
+
+	def __contains__(self, key):
+		# This is not a use, so don't touch the order or the statistics.
+		return key in self._entries
+
+	def __len__(self):
+		return len(self._entries)
+
+	def clear(self):
+		"""Remove all entries from the cache.
+		The statistics are not reset; see L{resetStats}.
+		"""
+		self._entries.clear()
+
+	def resetStats(self):
+		"""Reset the hit and miss counters.
+		"""
+		self.hits = self.misses = 0
+
+	def __repr__(self):
+		return "<LRUCache: {size}/{maxSize} entries, {hits} hits, {misses} misses>".format(
+			size=len(self), maxSize=self.maxSize, hits=self.hits, misses=self.misses)
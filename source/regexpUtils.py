@@ -0,0 +1,128 @@
+#regexpUtils.py
+#A part of NonVisual Desktop Access (NVDA)
+#Copyright (C) 2017 NV Access Limited
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+
+"""Utilities for building regular expressions which match large sets of strings efficiently.
+These are used by the speech dictionaries and speech symbols, where users can add many entries.
+"""
+
+import re
+import sre_parse
+import sre_constants
+
+#: Character set ranges larger than this are treated as unknown by L{getStartCharacters}.
+MAX_START_RANGE = 256
+
+def _getStartCharacters(items):
+	"""Get the characters which can start text matched by a sequence of parsed regular expression items.
+	@return: The characters and whether the items can match empty text, C{None} if this can't be determined.
+	@rtype: tuple of (set, bool)
+	"""
+	chars = set()
+	for op, av in items:
+		if op in (sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+			# Zero width, so the next item starts the match.
+			continue
+		if op == sre_constants.LITERAL:
+			chars.add(unichr(av))
+			return chars, False
+		if op == sre_constants.IN:
+			for setOp, setAv in av:
+				if setOp == sre_constants.LITERAL:
+					chars.add(unichr(setAv))
+				elif setOp == sre_constants.RANGE and setAv[1] - setAv[0] < MAX_START_RANGE:
+					chars.update(unichr(code) for code in xrange(setAv[0], setAv[1] + 1))
+				else:
+					# Negated sets and categories such as \w match too many characters.
+					return None
+			return chars, False
+		if op == sre_constants.SUBPATTERN:
+			result = _getStartCharacters(av[1])
+		elif op == sre_constants.BRANCH:
+			results = [_getStartCharacters(branch) for branch in av[1]]
+			if None in results:
+				return None
+			result = (set().union(*(branchChars for branchChars, canBeEmpty in results)),
+				any(canBeEmpty for branchChars, canBeEmpty in results))
+		elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+			minCount, maxCount, item = av
+			result = _getStartCharacters(item)
+			if result and minCount == 0:
+				result = (result[0], True)
+		else:
+			# For example, any character or a back reference.
+			return None
+		if result is None:
+			return None
+		itemChars, canBeEmpty = result
+		chars |= itemChars
+		if not canBeEmpty:
+			return chars, False
+	return chars, True
+
+def getStartCharacters(pattern):
+	"""Get the characters which can start text matched by a regular expression.
+	If text contains none of these characters, the regular expression can't match it.
+	This is much faster to check than searching the text with the regular expression.
+	@param pattern: The regular expression pattern, which must be compiled without the IGNORECASE flag.
+	@type pattern: basestring
+	@return: The characters or C{None} if they can't be determined;
+		e.g. if the pattern can start with any character, a category such as \w or can match empty text.
+	@rtype: frozenset
+	"""
+	try:
+		parsed = sre_parse.parse(pattern)
+	except (re.error, OverflowError, RuntimeError):
+		return None
+	if parsed.pattern.flags & re.IGNORECASE:
+		return None
+	result = _getStartCharacters(parsed)
+	if not result:
+		return None
+	chars, canBeEmpty = result
+	if canBeEmpty:
+		return None
+	return frozenset(chars)
+
+def makeTriePattern(strings):
+	"""Make a regular expression pattern which matches any of the given strings.
+	The alternatives are arranged as a trie; e.g. "abc", "abd" and "b" result in "(?:ab(?:c|d)|b)".
+	This is much faster to match than a flat alternation of many strings,
+	since Python's regular expression engine otherwise tries every alternative at every position.
+	Where more than one of the strings match at the same position, the longest is matched.
+	To match the strings case insensitively, compile the pattern with the IGNORECASE flag
+	and pass the strings in lower case so that strings differing only in case share a branch.
+	@param strings: The strings to match.
+	@type strings: iterable of basestring
+	@rtype: basestring
+	"""
+	trie = {}
+	for string in strings:
+		node = trie
+		for char in string:
+			node = node.setdefault(char, {})
+		# An empty key marks the end of a string.
+		node[""] = None
+
+	def makePattern(node):
+		alternatives = []
+		for char in sorted(node):
+			if not char:
+				continue
+			alternatives.append(re.escape(char) + makePattern(node[char]))
+		if not alternatives:
+			return ""
+		if len(alternatives) == 1:
+			pattern = alternatives[0]
+			if "" in node:
+				# This is a single character or a group, so it can simply be made optional.
+				pattern = "(?:%s)?" % pattern
+			return pattern
+		pattern = "(?:%s)" % "|".join(alternatives)
+		if "" in node:
+			pattern += "?"
+		return pattern
+
+	return makePattern(trie)
@@ -18,6 +18,7 @@ import inputCore
 import globalPluginHandler
 import braille
 import keyLabels
+import latencyTracing
 
 _numScriptsQueued=0 #Number of scripts that are queued to be executed
 #: Number of scripts that send their gestures on that are queued to be executed or are currently being executed.
@@ -151,6 +152,7 @@ def queueScript(script,gesture):
 	_numScriptsQueued+=1
 	if _isInterceptedCommandScript(script):
 		_numIncompleteInterceptedCommandScripts+=1
+	latencyTracing.markGesture(gesture,latencyTracing.HOP_QUEUE_SCRIPT)
 	queueHandler.queueFunction(queueHandler.eventQueue,_queueScriptCallback,script,gesture)
 
 def willSayAllResume(gesture):
@@ -166,6 +168,7 @@ def executeScript(script,gesture):
 	@type gesture: L{inputCore.InputGesture}
 	"""
 	global _lastScriptTime, _lastScriptCount, _lastScriptRef, _isScriptRunning 
+	latencyTracing.markGesture(gesture,latencyTracing.HOP_EXECUTE_SCRIPT)
 	lastScriptRef=_lastScriptRef() if _lastScriptRef else None
 	#We don't allow the same script to be executed from with in itself, but we still should pass the key through
 	scriptFunc=getattr(script,"__func__",script)
@@ -189,6 +192,7 @@ def executeScript(script,gesture):
 		log.exception("error executing script: %s with gesture %r"%(script,gesture.displayName))
 	finally:
 		_isScriptRunning=False
+		latencyTracing.markGesture(gesture,latencyTracing.HOP_SCRIPT_DONE)
 		if resumeSayAllMode is not None:
 			sayAllHandler.readText(resumeSayAllMode)
 
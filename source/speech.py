@@ -9,6 +9,7 @@
 """ 
 
 import itertools
+import collections
 import weakref
 import unicodedata
 import time
@@ -27,6 +28,8 @@ import queueHandler
 import speechDictHandler
 import characterProcessing
 import languageHandler
+import latencyTracing
+import lruCache
 
 speechMode_off=0
 speechMode_beeps=1
@@ -73,9 +76,22 @@ def isBlank(text):
 
 RE_CONVERT_WHITESPACE = re.compile("[\0\r\n]")
 
+#: Counts how often each path through L{processText} is taken.
+#: "fast" counts text which needed no dictionary or symbol processing, "full" counts all other text.
+#: Text spoken by L{speak} is processed by L{pipeline} rather than L{processText},
+#: so it is counted per stage in L{pipelineStats} instead.
+#: @type: collections.Counter
+processTextPathCounts = collections.Counter()
+
 def processText(locale,text,symbolLevel):
-	text = speechDictHandler.processText(text)
-	text = characterProcessing.processSpeechSymbols(locale, text, symbolLevel)
+	# Text such as typed characters and single words often contains no symbols and matches no dictionary entries.
+	# Checking for symbols is much cheaper than processing them.
+	text, dictionaryReplacements = speechDictHandler.processTextn(text)
+	if characterProcessing.hasSpeechSymbols(locale, text):
+		processTextPathCounts["full"] += 1
+		text = characterProcessing.processSpeechSymbols(locale, text, symbolLevel)
+	else:
+		processTextPathCounts["full" if dictionaryReplacements else "fast"] += 1
 	text = RE_CONVERT_WHITESPACE.sub(u" ", text)
 	return text.strip()
 
@@ -183,24 +199,32 @@ def getCharDescListFromText(text,locale):
 	"""This method prepares a list, which contains character and its description for all characters the text is made up of, by checking the presence of character descriptions in characterDescriptions.dic of that locale for all possible combination of consecutive characters in the text.
 	This is done to take care of conjunct characters present in several languages such as Hindi, Urdu, etc.
 	"""
-	charDescList = []
-	charDesc=None
-	i = len(text)
-	while i:
-		subText = text[:i]
-		charDesc = characterProcessing.getCharacterDescription(locale,subText)
-		if charDesc or i==1:
-			if not charDesc:
-				# #5375: We're down to a single character (i == 1) and we don't have a description.
-				# Try converting to lower case.
-				# This provides for upper case English characters (which only have lower case descriptions).
-				charDesc = characterProcessing.getCharacterDescription(locale,subText.lower())
-			charDescList.append((subText,charDesc))
-			text = text[i:]
-			i = len(text)
-		else:
-			i = i - 1
-	return charDescList
+	return list(_iterCharDescsFromText(text,locale))
+
+def _iterCharDescsFromText(text,locale):
+	"""Generates the (characters, description) pairs returned by L{getCharDescListFromText}.
+	As this is a generator, the first characters can be spoken without waiting for the rest of the text to be processed.
+	"""
+	# No sequence of characters longer than this has a description,
+	# so only look up that many characters from each position rather than the entire rest of the text.
+	maxLength=max(characterProcessing.getMaxDescribedCharacterLength(locale),1)
+	textLength=len(text)
+	start=0
+	while start<textLength:
+		end=min(start+maxLength,textLength)
+		while True:
+			subText=text[start:end]
+			charDesc=characterProcessing.getCharacterDescription(locale,subText)
+			if charDesc or end==start+1:
+				break
+			end-=1
+		if not charDesc:
+			# #5375: We're down to a single character and we don't have a description.
+			# Try converting to lower case.
+			# This provides for upper case English characters (which only have lower case descriptions).
+			charDesc = characterProcessing.getCharacterDescription(locale,subText.lower())
+		yield subText,charDesc
+		start=end
 
 def _speakSpellingGen(text,locale,useCharacterDescriptions):
 	synth=getSynth()
@@ -210,7 +234,7 @@ def _speakSpellingGen(text,locale,useCharacterDescriptions):
 		textLength=len(text)
 		count = 0
 		localeHasConjuncts = True if locale.split('_',1)[0] in LANGS_WITH_CONJUNCT_CHARS else False
-		charDescList = getCharDescListFromText(text,locale) if localeHasConjuncts else text
+		charDescList = _iterCharDescsFromText(text,locale) if localeHasConjuncts else text
 		for item in charDescList:
 			if localeHasConjuncts:
 				# item is a tuple containing character and its description
@@ -479,11 +503,280 @@ def getIndentationSpeech(indentation, formatConfig):
 			speak = True
 	return (" ".join(res) if speak else "")
 
+#: The names of the stages of the speech pipeline.
+STAGE_LANGUAGE="language"
+STAGE_DICTIONARY="dictionary"
+STAGE_SYMBOLS="symbols"
+STAGE_CHUNKS="chunks"
+#: Not stages of L{pipeline}, but also recorded in L{pipelineStats}:
+#: conversion to SSML by L{speechXml} and the call to the synthesizer's speak method.
+STAGE_SSML="ssml"
+STAGE_SYNTH="synth"
+
+class SpeechStageStats(object):
+	"""Cumulative statistics for a single stage of the speech pipeline.
+	"""
+	__slots__=("name","time","runs","items","skipped")
+
+	def __init__(self,name):
+		self.name=name
+		#: The total time spent in this stage in seconds, excluding the time spent in previous stages.
+		self.time=0.0
+		#: The number of times this stage was run.
+		self.runs=0
+		#: The total number of items (text and commands) produced by this stage.
+		self.items=0
+		#: The number of text items this stage passed through without processing, if applicable.
+		self.skipped=0
+
+	def __repr__(self):
+		return "{name}: {time:.3f} ms in {runs} runs, {items} items, {skipped} skipped".format(
+			name=self.name,time=self.time*1000,runs=self.runs,items=self.items,skipped=self.skipped)
+
+class SpeechPipelineStats(object):
+	"""Cumulative statistics for the stages of the speech pipeline.
+	This can be used to find out which stage dominates the time taken to speak;
+	e.g. from the Python console:
+	>>> speech.pipelineStats.isEnabled = True
+	>>> # Do some things which speak...
+	>>> speech.pipelineStats
+	>>> speech.pipelineStats.reset()
+	"""
+
+	def __init__(self):
+		#: Whether statistics should be recorded.
+		#: Timing each stage has a cost, so this is disabled by default.
+		#: @type: bool
+		self.isEnabled=False
+		self.reset()
+
+	def reset(self):
+		#: Maps stage names to L{SpeechStageStats} in the order they were first recorded.
+		#: @type: collections.OrderedDict
+		self.stages=collections.OrderedDict()
+
+	def record(self,stage,seconds,items=0,skipped=0):
+		"""Record a run of a stage.
+		@param stage: The name of the stage.
+		@type stage: str
+		@param seconds: The time taken by the stage.
+		@type seconds: float
+		@param items: The number of items produced by the stage.
+		@type items: int
+		@param skipped: The number of items the stage passed through without processing.
+		@type skipped: int
+		"""
+		try:
+			stats=self.stages[stage]
+		except KeyError:
+			stats=self.stages[stage]=SpeechStageStats(stage)
+		stats.time+=seconds
+		stats.runs+=1
+		stats.items+=items
+		stats.skipped+=skipped
+
+	def __getitem__(self,stage):
+		return self.stages[stage]
+
+	def __repr__(self):
+		return "\n".join(repr(stats) for stats in self.stages.itervalues())
+
+#: Statistics for the stages of L{pipeline}.
+#: @type: L{SpeechPipelineStats}
+pipelineStats=SpeechPipelineStats()
+
+class SpeechPipelineContext(object):
+	"""Information shared by the stages of the speech pipeline while processing a single speech sequence.
+	"""
+
+	def __init__(self,symbolLevel,skipStages=frozenset()):
+		"""
+		@param symbolLevel: The symbol verbosity level.
+		@type symbolLevel: int
+		@param skipStages: The names of stages which should not be applied;
+			e.g. because the text has already been processed by those stages.
+		@type skipStages: frozenset
+		"""
+		self.symbolLevel=symbolLevel
+		self.skipStages=skipStages
+		self.autoLanguageSwitching=config.conf['speech']['autoLanguageSwitching']
+		self.autoDialectSwitching=config.conf['speech']['autoDialectSwitching']
+		self.defaultLanguage=getCurrentLanguage()
+		#: The number of items passed through without processing by each stage.
+		#: @type: collections.Counter
+		self.skipped=collections.Counter()
+
+def _languageStage(speechSequence,context):
+	"""Filter out redundant LangChangeCommand objects and empty text.
+	If auto language switching is enabled, each text item is preceded by a LangChangeCommand for its language where this changes.
+	"""
+	autoLanguageSwitching=context.autoLanguageSwitching
+	curLanguage=defaultLanguage=context.defaultLanguage
+	prevLanguage=None
+	defaultLanguageRoot=defaultLanguage.split('_')[0]
+	for item in speechSequence:
+		if isinstance(item,LangChangeCommand):
+			if not autoLanguageSwitching: continue
+			curLanguage=item.lang
+			if not curLanguage or (not context.autoDialectSwitching and curLanguage.split('_')[0]==defaultLanguageRoot):
+				curLanguage=defaultLanguage
+		elif isinstance(item,basestring):
+			if not item: continue
+			if autoLanguageSwitching and curLanguage!=prevLanguage:
+				yield LangChangeCommand(curLanguage)
+				prevLanguage=curLanguage
+			yield item
+		else:
+			yield item
+
+def _dictionaryStage(speechSequence,context):
+	"""Apply the speech dictionaries to text.
+	"""
+	for item in speechSequence:
+		if isinstance(item,basestring):
+			item,replacements=speechDictHandler.processTextn(item)
+			if not replacements:
+				context.skipped[STAGE_DICTIONARY]+=1
+		yield item
+
+def _symbolsStage(speechSequence,context):
+	"""Convert symbols in text according to the symbol level and the language of the text.
+	"""
+	curLanguage=context.defaultLanguage
+	for item in speechSequence:
+		if context.autoLanguageSwitching and isinstance(item,LangChangeCommand):
+			curLanguage=item.lang
+		elif isinstance(item,basestring):
+			if characterProcessing.hasSpeechSymbols(curLanguage,item):
+				item=characterProcessing.processSpeechSymbols(curLanguage,item,context.symbolLevel)
+			else:
+				context.skipped[STAGE_SYMBOLS]+=1
+		yield item
+
+def _chunksStage(speechSequence,context):
+	"""Normalise whitespace in text and separate chunks of text outside of character mode.
+	"""
+	inCharacterMode=False
+	for item in speechSequence:
+		if isinstance(item,CharacterModeCommand):
+			inCharacterMode=item.state
+		elif isinstance(item,basestring):
+			item=RE_CONVERT_WHITESPACE.sub(u" ",item).strip()
+			if not inCharacterMode:
+				item+=CHUNK_SEPARATOR
+		yield item
+
+class SpeechPipeline(object):
+	"""Processes speech sequences through a chain of stages before they are passed to the synthesizer.
+	Each stage is a function which takes a speech sequence (an iterable) and a L{SpeechPipelineContext}
+	and returns an iterable of the processed sequence, usually by being a generator.
+	Stages are chained so that items stream through all stages without intermediate lists.
+	If enabled, the time taken and the number of items produced by each stage are recorded in L{pipelineStats}.
+	"""
+
+	def __init__(self,stages):
+		"""
+		@param stages: The (name, stage function) pairs in the order in which they should be applied.
+		@type stages: iterable
+		"""
+		self.stages=list(stages)
+
+	def addStage(self,name,stage,before=None):
+		"""Add a stage to the pipeline.
+		@param name: The name of the stage, used for statistics.
+		@type name: str
+		@param stage: The stage function.
+		@type stage: callable
+		@param before: The name of the stage before which this stage should be added,
+			C{None} to add it at the end.
+		@type before: str
+		@raise LookupError: If C{before} is not the name of a stage.
+		"""
+		if before is None:
+			self.stages.append((name,stage))
+			return
+		for index,(existing,existingStage) in enumerate(self.stages):
+			if existing==before:
+				self.stages.insert(index,(name,stage))
+				return
+		raise LookupError(before)
+
+	def removeStage(self,name):
+		"""Remove a stage from the pipeline.
+		@param name: The name of the stage.
+		@type name: str
+		@raise LookupError: If there is no such stage.
+		"""
+		for index,(existing,stage) in enumerate(self.stages):
+			if existing==name:
+				del self.stages[index]
+				return
+		raise LookupError(name)
+
+	def process(self,speechSequence,context):
+		"""Process a speech sequence through all stages.
+		@param speechSequence: The sequence to process.
+		@type speechSequence: iterable
+		@param context: Information about this sequence shared by all stages.
+		@type context: L{SpeechPipelineContext}
+		@return: The processed sequence.
+		@rtype: list
+		"""
+		stages=self.stages
+		if context.skipStages:
+			stages=[(name,stage) for name,stage in stages if name not in context.skipStages]
+		items=speechSequence
+		if not pipelineStats.isEnabled:
+			for name,stage in stages:
+				items=stage(items,context)
+			return list(items)
+		# The time spent producing items in each stage, including the time spent in previous stages.
+		cumulativeTimes=[0.0]*len(stages)
+		itemCounts=[0]*len(stages)
+		timer=time.clock
+		def measure(index,items):
+			items=iter(items)
+			while True:
+				startTime=timer()
+				try:
+					item=next(items)
+				except StopIteration:
+					cumulativeTimes[index]+=timer()-startTime
+					return
+				cumulativeTimes[index]+=timer()-startTime
+				itemCounts[index]+=1
+				yield item
+		for index,(name,stage) in enumerate(stages):
+			items=measure(index,stage(items,context))
+		processed=list(items)
+		prevTime=0.0
+		for index,(name,stage) in enumerate(stages):
+			pipelineStats.record(name,cumulativeTimes[index]-prevTime,items=itemCounts[index],skipped=context.skipped[name])
+			prevTime=cumulativeTimes[index]
+		return processed
+
+#: The pipeline through which L{speak} processes speech sequences.
+#: Add-ons may add stages using L{SpeechPipeline.addStage}.
+#: @type: L{SpeechPipeline}
+pipeline=SpeechPipeline((
+	(STAGE_LANGUAGE,_languageStage),
+	(STAGE_DICTIONARY,_dictionaryStage),
+	(STAGE_SYMBOLS,_symbolsStage),
+	(STAGE_CHUNKS,_chunksStage),
+))
+
 def speak(speechSequence,symbolLevel=None):
 	"""Speaks a sequence of text and speech commands
 	@param speechSequence: the sequence of text and L{SpeechCommand} objects to speak
 	@param symbolLevel: The symbol verbosity level; C{None} (default) to use the user's configuration.
 	"""
+	_speak(speechSequence,symbolLevel=symbolLevel)
+
+def _speak(speechSequence,symbolLevel=None,skipStages=frozenset()):
+	"""Implementation of L{speak}.
+	@param skipStages: The names of the stages of L{pipeline} which should not be applied.
+	@type skipStages: frozenset
+	"""
 	if not speechSequence: #Pointless - nothing to speak 
 		return
 	import speechViewer
@@ -501,49 +794,23 @@ def speak(speechSequence,symbolLevel=None):
 	if isPaused:
 		cancelSpeech()
 	beenCanceled=False
-	#Filter out redundant LangChangeCommand objects 
-	#And also fill in default values
-	autoLanguageSwitching=config.conf['speech']['autoLanguageSwitching']
-	autoDialectSwitching=config.conf['speech']['autoDialectSwitching']
-	curLanguage=defaultLanguage=getCurrentLanguage()
-	prevLanguage=None
-	defaultLanguageRoot=defaultLanguage.split('_')[0]
-	oldSpeechSequence=speechSequence
-	speechSequence=[]
-	for item in oldSpeechSequence:
-		if isinstance(item,LangChangeCommand):
-			if not autoLanguageSwitching: continue
-			curLanguage=item.lang
-			if not curLanguage or (not autoDialectSwitching and curLanguage.split('_')[0]==defaultLanguageRoot):
-				curLanguage=defaultLanguage
-		elif isinstance(item,basestring):
-			if not item: continue
-			if autoLanguageSwitching and curLanguage!=prevLanguage:
-				speechSequence.append(LangChangeCommand(curLanguage))
-				prevLanguage=curLanguage
-			speechSequence.append(item)
-		else:
-			speechSequence.append(item)
+	latencyTracing.mark(latencyTracing.HOP_SPEAK)
+	if symbolLevel is None:
+		symbolLevel=config.conf.getValue("speech.symbolLevel")
+	speechSequence=pipeline.process(speechSequence,SpeechPipelineContext(symbolLevel,skipStages=skipStages))
 	if not speechSequence:
 		# After normalisation, the sequence is empty.
 		# There's nothing to speak.
 		return
 	log.io("Speaking %r" % speechSequence)
-	if symbolLevel is None:
-		symbolLevel=config.conf["speech"]["symbolLevel"]
-	curLanguage=defaultLanguage
-	inCharacterMode=False
-	for index in xrange(len(speechSequence)):
-		item=speechSequence[index]
-		if isinstance(item,CharacterModeCommand):
-			inCharacterMode=item.state
-		if autoLanguageSwitching and isinstance(item,LangChangeCommand):
-			curLanguage=item.lang
-		if isinstance(item,basestring):
-			speechSequence[index]=processText(curLanguage,item,symbolLevel)
-			if not inCharacterMode:
-				speechSequence[index]+=CHUNK_SEPARATOR
-	getSynth().speak(speechSequence)
+	latencyTracing.mark(latencyTracing.HOP_SYNTH_SPEAK)
+	if pipelineStats.isEnabled:
+		startTime=time.clock()
+		getSynth().speak(speechSequence)
+		pipelineStats.record(STAGE_SYNTH,time.clock()-startTime,items=len(speechSequence))
+	else:
+		getSynth().speak(speechSequence)
+	latencyTracing.mark(latencyTracing.HOP_SYNTH_SPEAK_DONE)
 
 def speakSelectionMessage(message,text):
 	if len(text) < 512:
@@ -649,6 +916,53 @@ PROTECTED_CHAR = "*"
 #: This is used to test whether a character should be spoken as a typed character;
 #: i.e. it should have a visual or spatial representation.
 FIRST_NONCONTROL_CHAR = u" "
+#: The maximum number of words kept in L{typedWordCache}.
+TYPED_WORD_CACHE_SIZE=500
+#: Typed words which have already been processed by the dictionary and symbols stages of L{pipeline},
+#: keyed by (locale, symbol level, word).
+#: Users tend to type the same words repeatedly, so this avoids processing them again.
+#: @type: L{lruCache.LRUCache}
+typedWordCache=lruCache.LRUCache(TYPED_WORD_CACHE_SIZE)
+#: The state of the speech dictionaries and symbols when L{typedWordCache} was last validated.
+_typedWordCacheState=None
+#: The stages of L{pipeline} which have already been applied to words in L{typedWordCache}.
+_TYPED_WORD_CACHED_STAGES=frozenset((STAGE_DICTIONARY,STAGE_SYMBOLS))
+
+def getTypedWordSpeech(locale,word,symbolLevel):
+	"""Get the processed text to speak for a typed word, using L{typedWordCache} where possible.
+	@param locale: The language of the word.
+	@type locale: str
+	@param word: The typed word.
+	@type word: basestring
+	@param symbolLevel: The symbol verbosity level.
+	@type symbolLevel: int
+	@return: The word after processing by the speech dictionaries and symbols.
+	@rtype: basestring
+	"""
+	global _typedWordCacheState
+	# Any change to the dictionaries or symbols might change the result, so the cache must be discarded.
+	state=(speechDictHandler.changeCount,characterProcessing.symbolsChangeCount,globalVars.speechDictionaryProcessing)
+	if state!=_typedWordCacheState:
+		typedWordCache.clear()
+		_typedWordCacheState=state
+	key=(locale,symbolLevel,word)
+	try:
+		return typedWordCache[key]
+	except KeyError:
+		pass
+	processed=typedWordCache[key]=processText(locale,word,symbolLevel)
+	return processed
+
+def speakTypedWord(word):
+	"""Speak a word which the user has just typed.
+	The word is processed using L{getTypedWordSpeech}.
+	@param word: The typed word.
+	@type word: basestring
+	"""
+	symbolLevel=config.conf["speech"]["symbolLevel"]
+	text=getTypedWordSpeech(getCurrentLanguage(),word,symbolLevel)
+	_speak([text],symbolLevel=symbolLevel,skipStages=_TYPED_WORD_CACHED_STAGES)
+
 def speakTypedCharacters(ch):
 	global curWordChars
 	typingIsProtected=api.isTypingProtected()
@@ -669,8 +983,8 @@ def speakTypedCharacters(ch):
 		curWordChars=[]
 		if log.isEnabledFor(log.IO):
 			log.io("typed word: %s"%typedWord)
-		if config.conf["keyboard"]["speakTypedWords"] and not typingIsProtected:
-			speakText(typedWord)
+		if config.conf.getValue("keyboard.speakTypedWords") and not typingIsProtected:
+			speakTypedWord(typedWord)
 	global _suppressSpeakTypedCharactersNumber, _suppressSpeakTypedCharactersTime
 	if _suppressSpeakTypedCharactersNumber > 0:
 		# We primarily suppress based on character count and still have characters to suppress.
@@ -683,7 +997,7 @@ def speakTypedCharacters(ch):
 			_suppressSpeakTypedCharactersTime = None
 	else:
 		suppress = False
-	if not suppress and config.conf["keyboard"]["speakTypedCharacters"] and ch >= FIRST_NONCONTROL_CHAR:
+	if not suppress and config.conf.getValue("keyboard.speakTypedCharacters") and ch >= FIRST_NONCONTROL_CHAR:
 		speakSpelling(realChar)
 
 class SpeakTextInfoState(object):
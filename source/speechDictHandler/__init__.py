@@ -5,16 +5,22 @@
 #See the file COPYING for more details.
 
 import re
+import collections
 import globalVars
 from logHandler import log
 import os
 import codecs
 import api
 import config
+from regexpUtils import makeTriePattern
 from . import dictFormatUpgrade
 from .speechDictVars import speechDictsPath
 
 dictionaries = {}
+#: The number of times the speech dictionaries have changed.
+#: Code which caches the result of L{processText} can compare this to detect when its cache is stale.
+#: @type: int
+changeCount = 0
 dictTypes = ("temp", "voice", "default", "builtin") # ordered by their priority E.G. voice specific speech dictionary is processed before the default
 
 # Types of speech dictionary entries:
@@ -45,7 +51,197 @@ class SpeechDictEntry:
 		replacement=self.replacement
 		return self.compiled.sub(replacement, text)
 
+	def subn(self, text):
+		return self.compiled.subn(self.replacement, text)
+
+#: Matches a single character which is considered part of a word by regular expressions;
+#: i.e. a character for which \b can occur between it and a non-word character.
+RE_WORD_CHAR = re.compile(r"\w", re.U)
+
+def _isWordChar(char):
+	return bool(RE_WORD_CHAR.match(char))
+
+class _MergedEntries(object):
+	"""A run of consecutive anywhere and whole word entries which are applied in a single pass.
+	Entries in a speech dictionary are applied one after the other;
+	i.e. each entry is applied to the text resulting from the previous entries.
+	Applying several entries in a single pass only gives the same result
+	if the entries can't interact with each other.
+	For example, an entry can't be merged if it could match text produced by the replacement of an earlier entry
+	or if it could match text overlapping an earlier entry which would otherwise have been replaced first.
+	L{add} checks for this using indexes of the patterns and replacements already in the run,
+	taking word boundaries into account for whole word entries.
+	Patterns and replacements are compared in lower case,
+	since a case insensitive pattern could match text differing only in case.
+	All entries in a run have the same case sensitivity,
+	so a case insensitive run can be compiled with the IGNORECASE flag.
+	"""
+
+	def __init__(self):
+		self.entries = []
+		#: Whether the entries in this run are case sensitive, C{None} if there are no entries yet.
+		self.caseSensitive = None
+		# Maps patterns in lower case to replacements.
+		# No two patterns in a run can be the same in lower case, since they would conflict.
+		self._replacements = {}
+		# Maps whether a whole word pattern to lists of patterns.
+		self._patterns = collections.defaultdict(list)
+		# Whether a replacement was empty.
+		# This joins the text on either side, so no entries can be added after this.
+		self._sealed = False
+		# Whether the word boundaries at the edges of a replacement differ from those of its pattern.
+		# This changes where later whole word entries can match.
+		self._boundariesChanged = False
+		# Indexes of the patterns and replacements of the entries in this run.
+		# Maps whole strings to a set indicating whether each is a whole word pattern.
+		self._strings = collections.defaultdict(set)
+		self._stringLengths = set()
+		# Maps (substring, whether the previous char is a word char, whether the next char is a word char)
+		# to None for substrings of replacements and prefixes of patterns.
+		# Previous/next is None if the substring is at the start/end.
+		self._substrings = set()
+		# (suffix, whether the previous char is a word char) for proper suffixes of replacements.
+		self._suffixes = set()
+		# (prefix, whether a whole word pattern, whether the next char is a word char)
+		# for proper prefixes of patterns and replacements.
+		self._prefixes = set()
+
+	@staticmethod
+	def canMerge(entry):
+		# Regular expressions can match arbitrary text, so we can't tell whether they interact.
+		# Backslashes in the replacement have special meaning which differs when several entries are merged.
+		return entry.type != ENTRY_TYPE_REGEXP and entry.pattern and "\\" not in entry.replacement
+
+	def _conflicts(self, pattern, isWord):
+		"""Determine whether a new pattern could interact with the entries already in this run.
+		"""
+		if self._sealed or (isWord and self._boundariesChanged):
+			return True
+		patLen = len(pattern)
+		# Whether a word boundary is possible at each position in the pattern.
+		# The edges are adjacent to unknown text, so a boundary is always possible there.
+		wordChars = [_isWordChar(char) for char in pattern]
+		boundaries = [True] + [wordChars[i - 1] != wordChars[i] for i in xrange(1, patLen)] + [True]
+		startOptions = (not wordChars[0], None) if isWord else (True, False, None)
+		endOptions = (not wordChars[-1], None) if isWord else (True, False, None)
+		# An earlier pattern or replacement occurs within this pattern,
+		# so this pattern could match first or match text produced by an earlier replacement.
+		for length in self._stringLengths:
+			for start in xrange(patLen - length + 1):
+				end = start + length
+				found = self._strings.get(pattern[start:end])
+				if not found:
+					continue
+				if False in found:
+					return True
+				if boundaries[start] and boundaries[end]:
+					# An earlier whole word pattern could match here.
+					return True
+		# This pattern occurs within an earlier replacement or at the start of an earlier pattern.
+		for prev in startOptions:
+			for next in endOptions:
+				if (pattern, prev, next) in self._substrings:
+					return True
+		for length in xrange(1, patLen):
+			# The start of this pattern overlaps the end of an earlier replacement.
+			prefix = pattern[:length]
+			for prev in startOptions:
+				if prev is not None and (prefix, prev) in self._suffixes:
+					return True
+			# The end of this pattern overlaps the start of an earlier pattern or replacement,
+			# so this pattern could match before the earlier one.
+			suffix = pattern[-length:]
+			for next in endOptions:
+				if next is None:
+					continue
+				if (suffix, False, next) in self._prefixes:
+					return True
+				if boundaries[patLen - length] and (suffix, True, next) in self._prefixes:
+					return True
+		return False
+
+	def _index(self, text, isPattern, isWord):
+		textLen = len(text)
+		wordChars = [_isWordChar(char) for char in text]
+		self._strings[text].add(isWord)
+		self._stringLengths.add(textLen)
+		for start in xrange(textLen if not isPattern else 1):
+			prev = wordChars[start - 1] if start > 0 else None
+			for end in xrange(start + 1, textLen + 1):
+				next = wordChars[end] if end < textLen else None
+				self._substrings.add((text[start:end], prev, next))
+		for length in xrange(1, textLen):
+			self._prefixes.add((text[:length], isWord, wordChars[length]))
+			if not isPattern:
+				self._suffixes.add((text[-length:], wordChars[-length - 1]))
+
+	def add(self, entry):
+		"""Add an entry to this run if it can be merged.
+		@param entry: The entry to add.
+		@type entry: L{SpeechDictEntry}
+		@return: C{True} if the entry was added, C{False} if it can't be merged.
+		@rtype: bool
+		"""
+		if not self.canMerge(entry):
+			return False
+		pattern = entry.pattern.lower()
+		replacement = entry.replacement.lower()
+		isWord = entry.type == ENTRY_TYPE_WORD
+		if self.entries and (entry.caseSensitive != self.caseSensitive or self._conflicts(pattern, isWord)):
+			return False
+		self.entries.append(entry)
+		self.caseSensitive = entry.caseSensitive
+		self._replacements[pattern] = entry.replacement
+		self._patterns[isWord].append(entry.pattern if entry.caseSensitive else pattern)
+		self._index(pattern, True, isWord)
+		if not replacement:
+			self._sealed = True
+			return True
+		self._index(replacement, False, False)
+		if (_isWordChar(replacement[0]) != _isWordChar(pattern[0])
+			or _isWordChar(replacement[-1]) != _isWordChar(pattern[-1])
+		):
+			self._boundariesChanged = True
+		return True
+
+	def compile(self):
+		"""Compile the entries in this run into a single regular expression.
+		This should be called once all entries have been added.
+		@raise re.error: If the regular expression could not be compiled.
+		"""
+		# The entries don't interact, so the order of the alternatives doesn't matter.
+		patterns = []
+		for isWord, strings in self._patterns.iteritems():
+			pattern = makeTriePattern(strings)
+			if isWord:
+				pattern = r"\b(?:%s)\b" % pattern
+			patterns.append(pattern)
+		flags = re.U
+		if not self.caseSensitive:
+			flags |= re.IGNORECASE
+		self.compiled = re.compile("|".join(patterns), flags)
+		# The indexes are only needed while adding entries.
+		del self._strings, self._substrings, self._suffixes, self._prefixes
+
+	def _repl(self, m):
+		return self._replacements[m.group().lower()]
+
+	def sub(self, text):
+		return self.compiled.sub(self._repl, text)
+
+	def subn(self, text):
+		return self.compiled.subn(self._repl, text)
+
 class SpeechDict(list):
+	"""A speech dictionary; i.e. a list of L{SpeechDictEntry} objects which are applied to text in order.
+	For efficiency, consecutive entries which don't interact are applied in a single pass.
+	Compiling these passes can take a while for large dictionaries,
+	so this is done when the dictionary is loaded or saved rather than when text is next spoken.
+	If the entries are changed otherwise, the dictionary is compiled when it is next used.
+	"""
+
+	#: The passes applied to text by L{sub}, C{None} if the dictionary needs to be compiled.
+	_passes = None
 
 	def load(self, fileName):
 		self.fileName=fileName
@@ -80,9 +276,12 @@ class SpeechDict(list):
 					log.warning("can't parse line '%s'" % line)
 		log.debug("%d loaded records." % len(self))
 		file.close()
+		self._getPasses()
 		return
 
 	def save(self,fileName=None):
+		# The entries have probably just been changed, so compile them now.
+		self._getPasses()
 		if not fileName:
 			fileName=getattr(self,'fileName',None)
 		if not fileName:
@@ -97,11 +296,81 @@ class SpeechDict(list):
 			file.write("%s\t%s\t%s\t%s\r\n"%(entry.pattern.replace('#',r'\#'),entry.replacement.replace('#',r'\#'),int(entry.caseSensitive),entry.type))
 		file.close()
 
-	def sub(self, text):
+	def _compile(self):
+		"""Compile the entries in this dictionary into passes to be applied by L{sub}.
+		Each pass is either a single entry or a run of merged entries.
+		"""
+		passes = []
+		run = None
 		for entry in self:
-			text = entry.sub(text)
+			if run and run.add(entry):
+				continue
+			if run:
+				passes.extend(self._finishRun(run))
+				run = None
+			if _MergedEntries.canMerge(entry):
+				run = _MergedEntries()
+				run.add(entry)
+			else:
+				passes.append(entry)
+		if run:
+			passes.extend(self._finishRun(run))
+		log.debug("Compiled %d entries into %d passes" % (len(self), len(passes)))
+		return passes
+
+	def _finishRun(self, run):
+		if len(run.entries) == 1:
+			# There's no point merging a single entry.
+			return run.entries
+		try:
+			run.compile()
+		except (re.error, OverflowError, RuntimeError):
+			log.debugWarning("Couldn't merge %d entries" % len(run.entries), exc_info=True)
+			return run.entries
+		return (run,)
+
+	def _getPasses(self):
+		passes = self._passes
+		if passes is None:
+			passes = self._passes = self._compile()
+		return passes
+
+	def sub(self, text):
+		for p in self._getPasses():
+			text = p.sub(text)
 		return text
 
+	def subn(self, text):
+		"""Apply the entries in this dictionary to text and report how many replacements were made.
+		If there were none, the text is unchanged.
+		@param text: The text to process.
+		@type text: basestring
+		@return: The processed text and the number of replacements.
+		@rtype: tuple of (basestring, int)
+		"""
+		total = 0
+		for p in self._getPasses():
+			text, count = p.subn(text)
+			total += count
+		return text, total
+
+def _makeInvalidatingMethod(name):
+	method = getattr(list, name)
+	def invalidatingMethod(self, *args, **kwargs):
+		global changeCount
+		# The entries are changing, so the dictionary must be recompiled when next used.
+		self._passes = None
+		changeCount += 1
+		return method(self, *args, **kwargs)
+	invalidatingMethod.__name__ = name
+	return invalidatingMethod
+
+for _name in ("append", "extend", "insert", "remove", "pop", "reverse", "sort",
+	"__setitem__", "__delitem__", "__setslice__", "__delslice__", "__iadd__", "__imul__"
+):
+	setattr(SpeechDict, _name, _makeInvalidatingMethod(_name))
+del _name
+
 def processText(text):
 	if not globalVars.speechDictionaryProcessing:
 		return text
@@ -109,7 +378,26 @@ def processText(text):
 		text=dictionaries[type].sub(text)
 	return text
 
+def processTextn(text):
+	"""Apply the speech dictionaries to text and report how many replacements were made.
+	This is like L{processText}, but also allows callers to tell whether the text needed any processing
+	without searching it a second time.
+	@param text: The text to process.
+	@type text: basestring
+	@return: The processed text and the number of replacements.
+	@rtype: tuple of (basestring, int)
+	"""
+	if not globalVars.speechDictionaryProcessing:
+		return text, 0
+	total = 0
+	for type in dictTypes:
+		text, count = dictionaries[type].subn(text)
+		total += count
+	return text, total
+
 def initialize():
+	global changeCount
+	changeCount += 1
 	for type in dictTypes:
 		dictionaries[type]=SpeechDict()
 	dictionaries["default"].load(os.path.join(speechDictsPath, "default.dic"))
@@ -12,6 +12,7 @@ L{SsmlConverter} is an implementation for conversion to SSML.
 
 from collections import namedtuple, OrderedDict
 import re
+import time
 import speech
 from logHandler import log
 
@@ -223,10 +224,17 @@ class SpeechXmlConverter(object):
 
 	def convertToXml(self, speechSequence):
 		"""Convenience method to convert a speech sequence to XML using L{XmlBalancer}.
+		If enabled, the time taken is recorded in L{speech.pipelineStats}.
 		"""
+		stats = speech.pipelineStats if speech.pipelineStats.isEnabled else None
+		if stats:
+			startTime = time.clock()
 		bal = XmlBalancer()
 		balCommands = self.generateBalancerCommands(speechSequence)
-		return bal.generateXml(balCommands)
+		xml = bal.generateXml(balCommands)
+		if stats:
+			stats.record(speech.STAGE_SSML, time.clock() - startTime)
+		return xml
 
 class SsmlConverter(SpeechXmlConverter):
 	"""Converts an NVDA speech sequence to SSML.
@@ -113,11 +113,16 @@ def setSynth(name,isFallback=False):
 			setSynth('silence',isFallback=True)
 		return False
 
-def handleConfigProfileSwitch():
+def handleConfigProfileSwitch(changedKeys=None):
 	conf = config.conf["speech"]
+	# This is checked even if these settings didn't change,
+	# since the configured synth might not have loaded previously and a fallback might be in use.
 	if conf["synth"] != _curSynth.name or conf["outputDevice"] != _audioOutputDevice:
 		setSynth(conf["synth"])
 		return
+	if changedKeys is not None and not any(key.startswith("speech.") for key in changedKeys):
+		# No speech settings changed.
+		return
 	_curSynth.loadSettings(onlyChanged=True)
 
 class SynthSetting(object):
@@ -88,5 +88,7 @@ api.setDesktopObject(phObj)
 # Stub speech functions to make them no-ops.
 # Eventually, these should keep track of calls so we can make assertions.
 import speech
+# Keep the real speak function for tests which need it; e.g. with a fake synthesizer.
+realSpeak = speech.speak
 speech.speak = lambda speechSequence, symbolLevel=None: None
 speech.speakSpelling = lambda text, locale=None, useCharacterDescriptions=False: None
@@ -0,0 +1,72 @@
+#tests/unit/benchmark.py
+#A part of NonVisual Desktop Access (NVDA)
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+#Copyright (C) 2017 NV Access Limited
+
+"""Helpers for micro-benchmarks of performance sensitive code.
+Benchmarks are ordinary unit tests which also report how long the benchmarked code took.
+They should still assert that the code did the right thing,
+but shouldn't assert anything about timing, since this varies greatly between machines.
+"""
+
+import sys
+import gc
+import timeit
+
+def timeCall(func, number=1, repeat=3):
+	"""Time a function call.
+	@param func: The function to call with no arguments.
+	@type func: callable
+	@param number: The number of times to call the function for each measurement.
+	@type number: int
+	@param repeat: The number of measurements to take.
+	@type repeat: int
+	@return: The fastest time taken for a single call in seconds.
+	@rtype: float
+	"""
+	return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+def report(name, **timings):
+	"""Report the results of a benchmark.
+	@param name: The name of the benchmark.
+	@type name: str
+	@param timings: The time taken for each variant in seconds.
+	"""
+	sys.stderr.write("\nBenchmark %s: %s\n" % (name, ", ".join(
+		"%s %.3f ms" % (variant, seconds * 1000) for variant, seconds in sorted(timings.iteritems()))))
+
+def countAllocations(func):
+	"""Approximately count the objects allocated by a function call which are still allocated when it returns.
+	This is the garbage collector's count of allocations minus deallocations during the call, so it is only approximate:
+	only objects tracked by the garbage collector (e.g. lists, dicts and class instances) are counted,
+	not strings or numbers,
+	and objects which are allocated and freed again during the call aren't counted at all.
+	Garbage which would only be freed by the garbage collector (e.g. reference cycles) is included.
+	This is enough to notice when a change allocates many more long lived objects,
+	but not to measure total allocation.
+	@param func: The function to call with no arguments.
+	@type func: callable
+	@return: The number of objects.
+	@rtype: int
+	"""
+	wasEnabled = gc.isenabled()
+	# Collecting resets the allocation count.
+	gc.collect()
+	gc.disable()
+	try:
+		before = gc.get_count()[0]
+		func()
+		return gc.get_count()[0] - before
+	finally:
+		if wasEnabled:
+			gc.enable()
+
+def reportAllocations(name, **counts):
+	"""Report the allocation counts for a benchmark.
+	@param name: The name of the benchmark.
+	@type name: str
+	@param counts: The number of objects allocated for each variant, as returned by L{countAllocations}.
+	"""
+	sys.stderr.write("\nBenchmark %s: %s\n" % (name, ", ".join(
+		"%s about %d objects" % (variant, count) for variant, count in sorted(counts.iteritems()))))
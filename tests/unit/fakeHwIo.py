@@ -0,0 +1,108 @@
+#tests/unit/fakeHwIo.py
+#A part of NonVisual Desktop Access (NVDA)
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+#Copyright (C) 2017 NV Access Limited
+
+"""In-memory fake serial port for testing braille display drivers
+which use L{hwIo} or pyserial.
+See the L{FakeSerial} class.
+"""
+
+import hwIo
+
+class FakeSerial(object):
+	"""An in-memory replacement for L{hwIo.Serial} or pyserial's C{serial.Serial}.
+	Data written by the driver is recorded in L{writes}.
+	Data from the device is passed to the driver as it would be by L{hwIo.Serial};
+	i.e. onReceive is called with a single byte and the driver reads any further bytes it expects.
+	If there is no onReceive callback (as for pyserial),
+	the data is buffered until the driver reads it.
+	Example usage:
+	>>> with FakeSerial.patch(respond) as ports:
+	...     driver = BrailleDisplayDriver(port="COM1")
+	>>> ports[0].writes
+	"""
+
+	def __init__(self, port, onReceive=None, respond=None, **kwargs):
+		"""
+		@param respond: A callable which is passed data written by the driver
+			and returns the data the device sends in response, if any.
+		@type respond: callable
+		"""
+		self.port = port
+		self._onReceive = onReceive
+		self._respond = respond
+		self._received = ""
+		#: The data written by the driver, one item per write.
+		#: @type: [str, ...]
+		self.writes = []
+		self.closed = False
+
+	def write(self, data):
+		if self.closed:
+			raise EnvironmentError("Port closed")
+		self.writes.append(data)
+		if self._respond:
+			response = self._respond(data)
+			if response:
+				self.receive(response)
+
+	def receive(self, data):
+		"""Simulate data being sent by the device.
+		@type data: str
+		"""
+		self._received += data
+		if not self._onReceive:
+			return
+		while self._received:
+			byte = self.read(1)
+			self._onReceive(byte)
+
+	def read(self, size=1):
+		data = self._received[:size]
+		self._received = self._received[size:]
+		return data
+
+	def inWaiting(self):
+		return len(self._received)
+
+	def waitForRead(self, timeout):
+		# Responses are received as soon as they are written.
+		return False
+
+	def close(self):
+		self.closed = True
+
+	@classmethod
+	def patch(cls, respond=None, module=hwIo):
+		"""Replace the Serial class of a module with this class until the returned context manager exits.
+		The context manager returns a list of the ports which have been opened.
+		@param respond: Passed to each port; see L{__init__}.
+		@type respond: callable
+		@param module: The module whose Serial class should be replaced;
+			e.g. pyserial's C{serial} module for drivers which don't use L{hwIo}.
+		@type module: module
+		"""
+		return _SerialPatch(cls, respond, module)
+
+class _SerialPatch(object):
+
+	def __init__(self, fakeCls, respond, module):
+		self._fakeCls = fakeCls
+		self._respond = respond
+		self._module = module
+		self.ports = []
+
+	def _open(self, port, **kwargs):
+		fake = self._fakeCls(port, respond=self._respond, **kwargs)
+		self.ports.append(fake)
+		return fake
+
+	def __enter__(self):
+		self._orig = self._module.Serial
+		self._module.Serial = self._open
+		return self.ports
+
+	def __exit__(self, *exc):
+		self._module.Serial = self._orig
@@ -0,0 +1,52 @@
+#tests/unit/fakeLouis.py
+#A part of NonVisual Desktop Access (NVDA)
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+#Copyright (C) 2017 NV Access Limited
+
+"""A pure-Python stand-in for the louis module, which wraps liblouis.
+Each character is translated to exactly one cell, so positions in the text and the braille are the same.
+This is useful for benchmarks which measure NVDA's own braille rendering
+without the cost of liblouis, and it doesn't need liblouis to be available.
+To use it, replace the louis module imported by the module under test; e.g. C{braille.louis = fakeLouis}.
+"""
+
+# Typeforms, as in liblouis.
+plain_text = 0
+italic = 1
+underline = 2
+bold = 4
+
+# Translation modes, as in liblouis.
+noContractions = 1
+compbrlAtCursor = 2
+dotsIO = 4
+comp8Dots = 8
+pass1Only = 16
+compbrlLeftCursor = 32
+otherTrans = 64
+ucBrl = 128
+noUndefinedDots = 256
+partialTrans = 512
+
+def version():
+	return "fakeLouis"
+
+def checkTable(tableList):
+	pass
+
+def _getPositions(text):
+	return range(len(text))
+
+def translate(tableList, inbuf, typeform=None, cursorPos=0, mode=0):
+	"""Translate text to braille.
+	The arguments and return value are the same as for C{louis.translate}.
+	With C{dotsIO}, each cell is the lower 8 bits of the character with the highest bit set, as liblouis does,
+	except that spaces are blank cells so that the display window can be word wrapped;
+	otherwise, the text is returned unchanged.
+	"""
+	if mode & dotsIO:
+		outbuf = u"".join(unichr(0x8000 | (0 if char == u" " else ord(char) & 0xff)) for char in inbuf)
+	else:
+		outbuf = unicode(inbuf)
+	return outbuf, _getPositions(inbuf), _getPositions(inbuf), cursorPos
@@ -8,9 +8,13 @@
 """
 
 import unittest
+from array import array
 import braille
+import brailleInput
 from objectProvider import PlaceholderNVDAObject, NVDAObjectWithRole
+from textProvider import BasicTextProvider
 import controlTypes
+import textInfos
 from config import conf
 import api
 import globalVars
@@ -124,3 +128,319 @@ class TestDisplayTextForGestureIdentifier(unittest.TestCase):
 			(u'No braille', 'noKey1+noKey2')
 		)
 
+class TestTranslationCache(unittest.TestCase):
+	"""Tests the cache of translations used by L{braille.Region.update}."""
+
+	def setUp(self):
+		braille.translationCache.clear()
+		braille.translationCache.resetStats()
+		self.origExpandAtCursor = conf["braille"]["expandAtCursor"]
+
+	def tearDown(self):
+		conf["braille"]["expandAtCursor"] = self.origExpandAtCursor
+
+	def test_unchangedText(self):
+		region = braille.TextRegion(u"hello world")
+		region.update()
+		cells = region.brailleCells
+		region.update()
+		self.assertEqual(braille.translationCache.misses, 1)
+		self.assertEqual(braille.translationCache.hits, 1)
+		self.assertEqual(region.brailleCells, cells)
+		# The cells are modified when rendering, so they must not be shared.
+		self.assertIsNot(region.brailleCells, cells)
+
+	def test_cursorMove(self):
+		conf["braille"]["expandAtCursor"] = False
+		region = braille.TextRegion(u"hello world")
+		region.cursorPos = 0
+		region.update()
+		region.cursorPos = 6
+		region.update()
+		self.assertEqual(braille.translationCache.hits, 1)
+		self.assertEqual(region.brailleCursorPos, region.rawToBraillePos[6])
+
+	def test_positionMapsShared(self):
+		region1 = braille.TextRegion(u"hello world")
+		region1.update()
+		region2 = braille.TextRegion(u"hello world")
+		region2.update()
+		self.assertIsInstance(region1.rawToBraillePos, array)
+		self.assertIsInstance(region1.brailleToRawPos, array)
+		self.assertIs(region2.rawToBraillePos, region1.rawToBraillePos)
+
+	def test_cursorMoveExpandAtCursor(self):
+		# When expanding the word at the cursor, the translation depends on the cursor position.
+		conf["braille"]["expandAtCursor"] = True
+		region = braille.TextRegion(u"hello world")
+		region.cursorPos = 0
+		region.update()
+		region.cursorPos = 6
+		region.update()
+		self.assertEqual(braille.translationCache.hits, 0)
+
+	def test_changedText(self):
+		region = braille.TextRegion(u"hello")
+		region.update()
+		cells = region.brailleCells
+		region.rawText = u"world"
+		region.update()
+		self.assertEqual(braille.translationCache.hits, 0)
+		self.assertNotEqual(region.brailleCells, cells)
+
+	def test_profileSwitch(self):
+		braille.TextRegion(u"hello").update()
+		braille.handler.handleConfigProfileSwitch()
+		self.assertEqual(len(braille.translationCache), 0)
+
+class UpperCaseTextInfoRegion(braille.TextInfoRegion):
+	"""A region which renders its text differently to L{braille.TextInfoRegion}."""
+
+	def _addTextWithFields(self, info, formatConfig, isSelection=False):
+		super(UpperCaseTextInfoRegion, self)._addTextWithFields(info, formatConfig, isSelection=isSelection)
+		self.rawText = self.rawText.upper()
+
+class TestPrefetch(unittest.TestCase):
+	"""Tests prefetching of the reading units adjacent to the cursor in a L{braille.TextInfoRegion}."""
+
+	def setUp(self):
+		braille.translationCache.clear()
+		braille.translationCache.resetStats()
+		self.obj = BasicTextProvider(text=u"first\nsecond\nthird\n", selection=(8, 8))
+		self.region = braille.TextInfoRegion(self.obj)
+		self.region.update()
+		self.region.prefetch()
+		self.misses = braille.translationCache.misses
+
+	def test_cursorUnchanged(self):
+		self.assertEqual(self.obj.selectionOffsets, (8, 8))
+
+	def test_nextLine(self):
+		self.region.nextLine()
+		self.region.update()
+		self.assertEqual(self.region.rawText, u"third ")
+		self.assertEqual(braille.translationCache.misses, self.misses)
+
+	def test_previousLine(self):
+		self.region.previousLine()
+		self.region.update()
+		self.assertEqual(self.region.rawText, u"first ")
+		self.assertEqual(braille.translationCache.misses, self.misses)
+
+	def test_formatFieldAttributesCache(self):
+		cache = dict(self.obj._brailleFormatFieldAttributesCache)
+		self.region.prefetch()
+		self.assertEqual(self.obj._brailleFormatFieldAttributesCache, cache)
+
+	def test_subclass(self):
+		region = UpperCaseTextInfoRegion(self.obj)
+		region.update()
+		region.prefetch()
+		misses = braille.translationCache.misses
+		region.nextLine()
+		region.update()
+		self.assertEqual(region.rawText, u"THIRD ")
+		self.assertEqual(braille.translationCache.misses, misses)
+
+	def test_matchesUpdate(self):
+		region = UpperCaseTextInfoRegion(self.obj)
+		region.update()
+		dest = region._readingInfo.copy()
+		dest.move(textInfos.UNIT_LINE, 1)
+		dest.collapse()
+		prefetched = braille._getPrefetchRegionClass(UpperCaseTextInfoRegion)(self.obj, dest)
+		prefetched.update()
+		region.nextLine()
+		region.update()
+		self.assertEqual(prefetched.rawText, region.rawText)
+		self.assertEqual(prefetched.brailleCells, region.brailleCells)
+
+	def test_untranslatedBraille(self):
+		braille.translationCache.clear()
+		braille.translationCache.resetStats()
+		brailleInput.handler.untranslatedBraille = u"\u2801"
+		try:
+			self.region.prefetch()
+		finally:
+			brailleInput.handler.untranslatedBraille = ""
+		self.assertEqual(braille.translationCache.misses, 0)
+
+class TestFieldBrailleCache(unittest.TestCase):
+	"""Tests the cache of braille text for fields."""
+
+	def setUp(self):
+		braille.fieldBrailleCache.clear()
+		braille.fieldBrailleCache.resetStats()
+
+	def test_matchesUncached(self):
+		for props in (
+			{"role": controlTypes.ROLE_LINK, "states": {controlTypes.STATE_VISITED}},
+			{"role": controlTypes.ROLE_HEADING, "positionInfo": {"level": 2}},
+			{"role": controlTypes.ROLE_LIST, "states": set(), "value": None},
+			{"states": {controlTypes.STATE_CLICKABLE}},
+		):
+			self.assertEqual(braille.getCachedBrailleTextForProperties(**props),
+				braille.getBrailleTextForProperties(**props))
+
+	def test_cached(self):
+		props = {"role": controlTypes.ROLE_HEADING, "positionInfo": {"level": 2}}
+		text = braille.getCachedBrailleTextForProperties(**props)
+		self.assertEqual(braille.getCachedBrailleTextForProperties(**props), text)
+		self.assertEqual(braille.fieldBrailleCache.hits, 1)
+		self.assertEqual(braille.fieldBrailleCache.misses, 1)
+
+	def test_differentStates(self):
+		states = {controlTypes.STATE_CHECKED}
+		checked = braille.getCachedBrailleTextForProperties(role=controlTypes.ROLE_CHECKBOX, states=states)
+		states.discard(controlTypes.STATE_CHECKED)
+		self.assertNotEqual(braille.getCachedBrailleTextForProperties(role=controlTypes.ROLE_CHECKBOX, states=states), checked)
+		self.assertEqual(braille.fieldBrailleCache.hits, 0)
+
+	def test_controlField(self):
+		field = textInfos.ControlField({"role": controlTypes.ROLE_LIST, "states": {controlTypes.STATE_READONLY},
+			"_startOfNode": True, "_endOfNode": True})
+		info = BasicTextProvider(text=u"").makeTextInfo(textInfos.POSITION_FIRST)
+		start = braille.getControlFieldBraille(info, field, [], True, conf["documentFormatting"])
+		end = braille.getControlFieldBraille(info, field, [], False, conf["documentFormatting"])
+		self.assertEqual(braille.getControlFieldBraille(info, field, [], True, conf["documentFormatting"]), start)
+		self.assertEqual(end, braille.getBrailleTextForProperties(role=controlTypes.ROLE_LIST) + " end")
+		self.assertEqual(braille.fieldBrailleCache.hits, 1)
+
+class FakeRegion(braille.Region):
+	"""A region with one braille cell for each character, so no translation is needed."""
+
+	def __init__(self, text):
+		super(FakeRegion, self).__init__()
+		self.rawText = text
+
+	def update(self):
+		self.brailleCells = [ord(char) & 0xff for char in self.rawText]
+		self.rawToBraillePos = self.brailleToRawPos = range(len(self.rawText))
+		self.brailleCursorPos = self.cursorPos
+
+class TestBrailleBuffer(unittest.TestCase):
+	"""Tests positions in a L{braille.BrailleBuffer} as its regions change."""
+
+	def setUp(self):
+		self.buffer = braille.BrailleBuffer(braille.handler)
+		self.regions = [FakeRegion(text) for text in (u"dialog ", u"list ", u"item")]
+		for region in self.regions:
+			region.update()
+			self.buffer.regions.append(region)
+		self.buffer.update()
+
+	def assertBufferMatchesRegions(self):
+		text = u"".join(region.rawText for region in self.regions)
+		self.assertEqual(self.buffer.rawText, text)
+		self.assertEqual(self.buffer.brailleCells, [ord(char) for char in text])
+		start = 0
+		for region, regionStart, regionEnd in self.buffer.regionsWithPositions:
+			self.assertEqual((regionStart, regionEnd), (start, start + len(region.rawText)))
+			for pos in xrange(len(region.rawText)):
+				self.assertEqual(self.buffer.bufferPosToRegionPos(start + pos), (region, pos))
+				self.assertEqual(self.buffer.regionPosToBufferPos(region, pos), start + pos)
+			start = regionEnd
+		self.assertEqual(self.buffer.bufferPositionsToRawText(0, len(text)), text)
+		self.assertEqual(list(self.buffer.brailleToRawPos), range(len(text)))
+		self.assertEqual(list(self.buffer.rawToBraillePos), range(len(text)))
+
+	def test_initial(self):
+		self.assertBufferMatchesRegions()
+		self.assertIsInstance(self.buffer.brailleCells, list)
+		self.assertIsInstance(self.buffer.brailleToRawPos, array)
+		self.assertIsInstance(self.buffer.rawToBraillePos, array)
+		self.assertRaises(LookupError, self.buffer.bufferPosToRegionPos, len(self.buffer.brailleCells))
+
+	def test_updateLastRegion(self):
+		region = self.regions[-1]
+		region.rawText = u"item 2"
+		region.cursorPos = 5
+		region.update()
+		self.buffer.update()
+		self.assertBufferMatchesRegions()
+		self.assertEqual(self.buffer.cursorPos, len(u"dialog list item "))
+
+	def test_updateMiddleRegion(self):
+		region = self.regions[1]
+		region.rawText = u"tree view "
+		region.update()
+		self.buffer.update()
+		self.assertBufferMatchesRegions()
+
+	def test_modifyCellsInPlace(self):
+		"""Test that a region which modifies its cells in place without changing their length is updated.
+		"""
+		region = self.regions[1]
+		region.brailleCells[0] = ord(u"L")
+		self.buffer.update()
+		self.assertEqual(self.buffer.brailleCells[len(u"dialog ")], ord(u"L"))
+		self.assertEqual(self.buffer.rawText, u"dialog list item")
+
+	def test_largeCellValues(self):
+		"""Test that cells which don't fit in a byte are kept; e.g. from add-ons.
+		"""
+		region = self.regions[-1]
+		region.brailleCells[0] = 0x100
+		self.buffer.update()
+		self.assertEqual(self.buffer.brailleCells[len(u"dialog list ")], 0x100)
+		self.assertIn(0x100, self.buffer.windowBrailleCells)
+
+	def test_removeRegion(self):
+		del self.buffer.regions[-1]
+		del self.regions[-1]
+		self.buffer.update()
+		self.assertBufferMatchesRegions()
+
+	def test_emptyRegion(self):
+		region = self.regions[1]
+		region.rawText = u""
+		region.update()
+		self.buffer.update()
+		self.assertBufferMatchesRegions()
+		self.assertEqual(self.buffer.bufferPosToRegionPos(len(u"dialog ")), (self.regions[2], 0))
+
+class FakeWriteScheduler(object):
+	"""Records the cells written and queued by the braille handler."""
+
+	def __init__(self):
+		self.written = []
+		self.queued = []
+
+	def write(self, cells):
+		self.written.append(cells)
+
+	def queue(self, cells):
+		self.queued.append(cells)
+
+class TestDisplayWithCursor(unittest.TestCase):
+	"""Tests when L{braille.BrailleHandler} copies cells before writing them."""
+
+	def setUp(self):
+		self.handler = braille.handler
+		self.origWriteScheduler = self.handler._writeScheduler
+		self.scheduler = self.handler._writeScheduler = FakeWriteScheduler()
+		self.handler._cells = [1, 2, 3]
+		self.handler._cursorPos = None
+		self.handler._cursorBlinkUp = True
+
+	def tearDown(self):
+		self.handler._writeScheduler = self.origWriteScheduler
+		self.handler.display.__dict__.pop("isThreadSafe", None)
+
+	def test_write(self):
+		self.handler._displayWithCursor()
+		# The cells are written immediately, so they needn't be copied.
+		self.assertIs(self.scheduler.written[0], self.handler._cells)
+
+	def test_queue(self):
+		self.handler.display.isThreadSafe = True
+		self.handler._displayWithCursor()
+		# The cells are written in the background, so a copy must be queued.
+		self.assertEqual(self.scheduler.queued[0], self.handler._cells)
+		self.assertIsNot(self.scheduler.queued[0], self.handler._cells)
+
+	def test_cursor(self):
+		self.handler._cursorPos = 1
+		self.handler._displayWithCursor()
+		self.assertNotEqual(self.scheduler.written[0][1], 2)
+		self.assertEqual(self.handler._cells, [1, 2, 3])
@@ -0,0 +1,249 @@
+#tests/unit/test_brailleBenchmark.py
+#A part of NonVisual Desktop Access (NVDA)
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+#Copyright (C) 2017 NV Access Limited
+
+"""Benchmarks for braille rendering.
+These render synthetic documents and objects without a real braille display,
+reporting the time taken and the approximate number of objects allocated for each operation.
+They only make assertions about the rendered output, not about performance.
+Text is translated with L{fakeLouis} unless stated otherwise,
+so that the timings measure NVDA's rendering rather than liblouis.
+Like the other unit tests, these only run on Windows,
+since the braille module and the objects rendered depend on Windows modules other than louis.
+"""
+
+import re
+import unittest
+import braille
+import brailleWriteScheduler
+import controlTypes
+import textInfos
+import api
+import globalVars
+from objectProvider import NVDAObjectWithRole
+from textProvider import BasicTextInfo, BasicTextProvider
+import benchmark
+import fakeLouis
+
+class FakeDisplay(braille.BrailleDisplayDriver):
+	"""A display of a configurable size which just counts the cells written to it.
+	"""
+	name = "benchmarkFake"
+	description = "Benchmark fake display"
+	isThreadSafe = True
+
+	def __init__(self, numCells):
+		super(FakeDisplay, self).__init__()
+		self.numCells = numCells
+		self.cellsWritten = 0
+
+	def display(self, cells):
+		self.cellsWritten += len(cells)
+
+	def displayRange(self, start, cells):
+		self.cellsWritten += len(cells)
+
+class FieldsTextInfo(BasicTextInfo):
+	"""Wraps each word in a link control field and toggles bold for alternate words.
+	"""
+
+	def getTextWithFields(self, formatConfig=None):
+		fields = []
+		bold = False
+		for word in re.split(r"( +)", self.text):
+			if not word:
+				continue
+			if word.isspace():
+				fields.append(word)
+				continue
+			bold = not bold
+			fields.append(textInfos.FieldCommand("formatChange", textInfos.FormatField({"bold": bold})))
+			fields.append(textInfos.FieldCommand("controlStart",
+				textInfos.ControlField({"role": controlTypes.ROLE_LINK, "states": set()})))
+			fields.append(word)
+			fields.append(textInfos.FieldCommand("controlEnd", None))
+		return fields
+
+class FieldsTextProvider(BasicTextProvider):
+	"""Provides text where every word is a link; see L{FieldsTextInfo}.
+	"""
+	TextInfo = FieldsTextInfo
+
+class BrailleBenchmark(unittest.TestCase):
+	"""Base class for braille benchmarks.
+	Regions are rendered in a separate buffer so that the handler doesn't start any timers.
+	"""
+	DISPLAY_SIZE = 40
+	#: Whether to translate with L{fakeLouis} rather than liblouis.
+	FAKE_LOUIS = True
+
+	def setUp(self):
+		self.origLouis = braille.louis
+		if self.FAKE_LOUIS:
+			braille.louis = fakeLouis
+		braille.translationCache.clear()
+		braille.fieldBrailleCache.clear()
+		brailleWriteScheduler.stats.pop(FakeDisplay.name, None)
+		self.origDisplaySize = braille.handler.displaySize
+		self.setDisplaySize(self.DISPLAY_SIZE)
+		self.buffer = braille.BrailleBuffer(braille.handler)
+
+	def tearDown(self):
+		braille.handler.displaySize = self.origDisplaySize
+		braille.louis = self.origLouis
+		# Other tests must not get translations from the stand-in.
+		braille.translationCache.clear()
+
+	def setDisplaySize(self, numCells):
+		braille.handler.displaySize = numCells
+		self.display = FakeDisplay(numCells)
+		self.scheduler = brailleWriteScheduler.WriteScheduler(self.display.name, self.display.display,
+			writeRange=self.display.displayRange)
+
+	def writeWindow(self):
+		"""Write the current window to the fake display as the handler would.
+		"""
+		cells = self.buffer.windowBrailleCells
+		self.scheduler.write(cells + [0] * (self.display.numCells - len(cells)))
+
+	def setRegions(self, regions):
+		del self.buffer.regions[:]
+		for region in regions:
+			region.update()
+			self.buffer.regions.append(region)
+		self.buffer.update()
+		self.writeWindow()
+
+class TestTextInfoRegionBenchmark(BrailleBenchmark):
+	"""Benchmarks rendering text in a L{braille.TextInfoRegion}.
+	"""
+	LINE_LENGTH = 2000
+	WORD_COUNT = 200
+
+	def benchmarkUpdate(self, name, obj, uncached=False):
+		if not self.FAKE_LOUIS:
+			name += " liblouis"
+		region = braille.TextInfoRegion(obj)
+		self.setRegions([region])
+		def update():
+			if uncached:
+				braille.translationCache.clear()
+				braille.fieldBrailleCache.clear()
+			region.update()
+			self.buffer.update()
+			self.writeWindow()
+		timings = {"update": benchmark.timeCall(update, number=10)}
+		allocations = {"update": benchmark.countAllocations(update)}
+		benchmark.report(name, **timings)
+		benchmark.reportAllocations(name, **allocations)
+		return region
+
+	def test_longLine(self):
+		text = u" ".join(u"word%d" % i for i in xrange(self.LINE_LENGTH // 8))
+		obj = BasicTextProvider(text=text)
+		region = self.benchmarkUpdate("TextInfoRegion.update long line %d characters" % len(text), obj)
+		self.assertEqual(region.rawText, text + u" ")
+		self.assertEqual(len(self.buffer.brailleCells), len(region.brailleCells))
+
+	def test_longLineUncached(self):
+		text = u" ".join(u"word%d" % i for i in xrange(self.LINE_LENGTH // 8))
+		obj = BasicTextProvider(text=text)
+		region = self.benchmarkUpdate("TextInfoRegion.update long line %d characters uncached" % len(text), obj,
+			uncached=True)
+		self.assertEqual(region.rawText, text + u" ")
+
+	def test_manyFields(self):
+		text = u" ".join(u"link%d" % i for i in xrange(self.WORD_COUNT))
+		obj = FieldsTextProvider(text=text)
+		region = self.benchmarkUpdate("TextInfoRegion.update %d fields" % self.WORD_COUNT, obj)
+		# Each word is preceded by its role.
+		linkText = braille.getBrailleTextForProperties(role=controlTypes.ROLE_LINK)
+		self.assertEqual(region.rawText.count(linkText), self.WORD_COUNT)
+
+class TestTextInfoRegionLiblouisBenchmark(TestTextInfoRegionBenchmark):
+	"""Benchmarks rendering text in a L{braille.TextInfoRegion} with liblouis,
+	so that the cost of translation is included.
+	"""
+	FAKE_LOUIS = False
+
+class TestFocusAncestryBenchmark(BrailleBenchmark):
+	"""Benchmarks rendering the focus with deep ancestry.
+	"""
+	DEPTH = 50
+
+	def setUp(self):
+		super(TestFocusAncestryBenchmark, self).setUp()
+		self.origFocusAncestors = globalVars.focusAncestors
+		self.origCachedFocusAncestorsEnd = braille._cachedFocusAncestorsEnd
+		# Layout lists and list items are excluded from the focus context, so use dialogs and lists.
+		globalVars.focusAncestors = [api.getDesktopObject()] + [
+			NVDAObjectWithRole(role=controlTypes.ROLE_DIALOG if i % 2 else controlTypes.ROLE_LIST)
+			for i in xrange(self.DEPTH)]
+		self.obj = NVDAObjectWithRole(role=controlTypes.ROLE_LISTITEM)
+
+	def tearDown(self):
+		globalVars.focusAncestors = self.origFocusAncestors
+		braille._cachedFocusAncestorsEnd = self.origCachedFocusAncestorsEnd
+		super(TestFocusAncestryBenchmark, self).tearDown()
+
+	def test_focus(self):
+		def render():
+			regions = list(braille.getFocusContextRegions(self.obj))
+			regions.extend(braille.getFocusRegions(self.obj))
+			self.setRegions(regions)
+		name = "focus with %d ancestors" % self.DEPTH
+		benchmark.report(name, render=benchmark.timeCall(render, number=10))
+		benchmark.reportAllocations(name, render=benchmark.countAllocations(render))
+		self.assertEqual(len(self.buffer.regions), self.DEPTH + 1)
+
+class TestScrollBenchmark(BrailleBenchmark):
+	"""Benchmarks scrolling through a long line on displays of several sizes.
+	"""
+	LINE_LENGTH = 2000
+
+	def setUp(self):
+		super(TestScrollBenchmark, self).setUp()
+		self.text = u" ".join(u"word%d" % i for i in xrange(self.LINE_LENGTH // 8))
+		self.region = braille.TextInfoRegion(BasicTextProvider(text=self.text))
+
+	def test_scroll(self):
+		timings = {}
+		for numCells in (20, 40, 80):
+			self.setDisplaySize(numCells)
+			self.setRegions([self.region])
+			windows = [0]
+			def scroll():
+				windows[0] = 0
+				while self.buffer._nextWindow():
+					self.writeWindow()
+					windows[0] += 1
+				while self.buffer._previousWindow():
+					self.writeWindow()
+					windows[0] += 1
+			timings["%dCells" % numCells] = benchmark.timeCall(scroll) / windows[0]
+			self.assertEqual(self.buffer.windowStartPos, 0)
+			# Every cell in the buffer must have been displayed.
+			self.assertGreaterEqual(windows[0] * numCells, len(self.buffer.brailleCells))
+			self.assertGreater(self.scheduler.stats.writes, 1)
+		benchmark.report("scroll per window %d characters" % len(self.text), **timings)
+
+class TestRoutingBenchmark(BrailleBenchmark):
+	"""Benchmarks routing the cursor within a L{braille.TextInfoRegion}.
+	"""
+
+	def test_route(self):
+		obj = BasicTextProvider(text=u" ".join(u"word%d" % i for i in xrange(100)))
+		region = braille.TextInfoRegion(obj)
+		self.setRegions([region])
+		def route():
+			for windowPos in (5, 10):
+				self.buffer.routeTo(windowPos)
+				region.update()
+				self.buffer.update()
+				self.writeWindow()
+		name = "route"
+		benchmark.report(name, route=benchmark.timeCall(route, number=10))
+		benchmark.reportAllocations(name, route=benchmark.countAllocations(route))
+		self.assertEqual(obj.selectionOffsets, (region.brailleToRawPos[10],) * 2)
@@ -8,7 +8,13 @@
 """
 
 import unittest
+import serial
+import wx
 import braille
+import brailleWriteScheduler
+import hwPortUtils
+from brailleDisplayDrivers import baum, handyTech, papenmeier, papenmeier_serial, alvaBC6, freedomScientific
+from fakeHwIo import FakeSerial
 
 class TestGestureMap(unittest.TestCase):
 	"""Tests the integrity of braille display driver gesture maps."""
@@ -23,3 +29,290 @@ class TestGestureMap(unittest.TestCase):
 			for cls, gesture, scriptName in gmap.getScriptsForAllGestures():
 				if gesture.startswith("br"):
 					self.assertRegexpMatches(gesture, braille.BrailleDisplayGesture.ID_PARTS_REGEX)
+
+def respondAsBaum(data):
+	"""Respond to requests as a 40 cell Baum VarioConnect connected via serial would.
+	"""
+	if data == baum.ESCAPE + baum.BAUM_PROTOCOL_ONOFF + "\x01":
+		return (baum.ESCAPE + baum.BAUM_DEVICE_ID + "VarioConnect 40 "
+			+ baum.ESCAPE + baum.BAUM_CELL_COUNT + chr(40))
+
+class TestBaum(unittest.TestCase):
+	"""Tests the baum driver against a fake serial port."""
+
+	def setUp(self):
+		with FakeSerial.patch(respondAsBaum) as ports:
+			self.driver = baum.BrailleDisplayDriver(port="COM1")
+		self.port = ports[0]
+
+	def tearDown(self):
+		self.driver.terminate()
+
+	def test_init(self):
+		self.assertEqual(self.driver.numCells, 40)
+		self.assertEqual(self.driver._deviceID, "VarioConnect 40")
+
+	def test_display(self):
+		self.driver.display([1, 0x1b] + [0] * 38)
+		# The escape byte must be doubled.
+		self.assertEqual(self.port.writes[-1],
+			baum.ESCAPE + baum.BAUM_DISPLAY_DATA + "\x01\x1b\x1b" + "\0" * 38)
+
+	def test_writeScheduler(self):
+		brailleWriteScheduler.stats.clear()
+		scheduler = brailleWriteScheduler.WriteScheduler(self.driver.name, self.driver.display)
+		writeCount = len(self.port.writes)
+		try:
+			for cell in xrange(10):
+				scheduler.queue([cell] * 40)
+				# An unchanged write.
+				scheduler.queue([cell] * 40)
+			self.assertTrue(scheduler.flush(5))
+		finally:
+			scheduler.stop()
+		writes = self.port.writes[writeCount:]
+		self.assertEqual(writes[-1], baum.ESCAPE + baum.BAUM_DISPLAY_DATA + chr(9) * 40)
+		stats = brailleWriteScheduler.stats["baum"]
+		self.assertEqual(stats.writes, len(writes))
+		self.assertEqual(stats.cellsWritten, 40 * len(writes))
+		self.assertEqual(stats.writes + stats.coalesced + stats.unchangedSkipped, 20)
+
+def respondAsHandyTech(data):
+	"""Respond to requests as a Handy Tech Basic Braille 40 connected via serial would.
+	"""
+	if data == handyTech.HT_PKT_RESET:
+		return handyTech.HT_PKT_OK + handyTech.MODEL_BASIC_BRAILLE_40
+
+def makeHandyTechBraillePacket(cells):
+	return (handyTech.HT_PKT_EXTENDED + handyTech.MODEL_BASIC_BRAILLE_40
+		+ chr(len(cells) + 1) + handyTech.HT_EXTPKT_BRAILLE + cells + "\x16")
+
+class TestHandyTech(unittest.TestCase):
+	"""Tests the handyTech driver against a fake serial port."""
+
+	def setUp(self):
+		with FakeSerial.patch(respondAsHandyTech) as ports:
+			self.driver = handyTech.BrailleDisplayDriver(port="COM1")
+		self.port = ports[0]
+
+	def tearDown(self):
+		self.driver.terminate()
+
+	def test_init(self):
+		self.assertEqual(self.driver.numCells, 40)
+		self.assertEqual(self.driver._model.name, "Basic Braille 40")
+
+	def test_display(self):
+		self.driver.display([1] * 40)
+		self.assertEqual(self.port.writes[-1], makeHandyTechBraillePacket("\x01" * 40))
+
+	def test_displayAwaitsAck(self):
+		self.driver.display([1] * 40)
+		writeCount = len(self.port.writes)
+		# Cells written before the display acknowledges the last write are held until it does.
+		self.driver.display([2] * 40)
+		self.driver.display([3] * 40)
+		self.assertEqual(len(self.port.writes), writeCount)
+		self.port.receive(handyTech.HT_PKT_EXTENDED + handyTech.MODEL_BASIC_BRAILLE_40
+			+ "\x02" + handyTech.HT_EXTPKT_CONFIRMATION + handyTech.HT_PKT_ACK + "\x16")
+		self.assertEqual(self.port.writes[writeCount:], [makeHandyTechBraillePacket("\x03" * 40)])
+
+def respondAsPapenmeier(data):
+	"""Respond to requests as a BRAILLEX Trio connected via bluetooth would.
+	"""
+	if data == papenmeier.brl_auto_id():
+		return "\x02IPP\x35\x39PPP\x03"
+
+def listPapenmeierPorts(onlyAvailable=False):
+	return [{"port": "COM1", "hardwareID": "BTHENUM", "bluetoothName": "braillex trio 123"}]
+
+class FakeTimer(object):
+	"""Replaces C{wx.PyTimer} so that drivers don't poll for keys during tests.
+	"""
+
+	def __init__(self, notify):
+		pass
+
+	def Start(self, milliseconds):
+		pass
+
+	def Stop(self):
+		pass
+
+class TestPapenmeier(unittest.TestCase):
+	"""Tests the papenmeier driver against a fake bluetooth serial port.
+	Displays connected via USB use the FTDI library rather than a serial port,
+	so they aren't covered.
+	"""
+
+	def setUp(self):
+		self._origTimer = wx.PyTimer
+		wx.PyTimer = FakeTimer
+		self._origFtdi = papenmeier.ftdi2
+		papenmeier.ftdi2 = None
+		self._origListComPorts = hwPortUtils.listComPorts
+		hwPortUtils.listComPorts = listPapenmeierPorts
+		with FakeSerial.patch(respondAsPapenmeier, module=serial) as ports:
+			self.driver = papenmeier.BrailleDisplayDriver()
+		self.port = ports[0]
+
+	def tearDown(self):
+		self.driver.terminate()
+		wx.PyTimer = self._origTimer
+		papenmeier.ftdi2 = self._origFtdi
+		hwPortUtils.listComPorts = self._origListComPorts
+
+	def test_init(self):
+		self.assertEqual(self.driver.numCells, 40)
+		self.assertEqual(self.driver._proto, "B")
+
+	def test_display(self):
+		cells = [1, 2] + [0] * 38
+		self.driver.display(cells)
+		self.assertEqual(self.port.writes[-1], papenmeier.brl_out(cells, 0, 0, 0))
+
+def respondAsPapenmeierSerial(data):
+	"""Respond to requests as a 40 cell BRAILLEX EL 40s would.
+	"""
+	if data == papenmeier_serial.brl_auto_id():
+		return "\x02I\x02" + "\0" * 6 + "\x03"
+
+class TestPapenmeierSerial(unittest.TestCase):
+	"""Tests the papenmeier_serial driver against a fake serial port."""
+
+	def setUp(self):
+		self._origTimer = wx.PyTimer
+		wx.PyTimer = FakeTimer
+		with FakeSerial.patch(respondAsPapenmeierSerial, module=serial) as ports:
+			self.driver = papenmeier_serial.BrailleDisplayDriver(port="COM1")
+		self.port = ports[0]
+
+	def tearDown(self):
+		self.driver.terminate()
+		wx.PyTimer = self._origTimer
+
+	def test_init(self):
+		self.assertEqual(self.driver.numCells, 40)
+		self.assertEqual(self.port.writes[-1], papenmeier_serial.brl_out(512, [1] * 40))
+
+	def test_displayRange(self):
+		self.driver.displayRange(3, [1, 2])
+		self.assertEqual(self.port.writes[-1], papenmeier_serial.brl_out(3, [1, 2]))
+
+	def test_displayRangeError(self):
+		self.port.close()
+		self.assertRaises(EnvironmentError, self.driver.displayRange, 3, [1, 2])
+
+class FakeAlvaLib(object):
+	"""Emulates alvaw32.dll with a single 40 cell display connected.
+	"""
+
+	def __init__(self):
+		#: The (start, cells) passed to each AlvaSendBraille call.
+		self.sent = []
+
+	def AlvaScanDevices(self, numDevices):
+		numDevices._obj.value = 1
+
+	def AlvaOpen(self, device):
+		pass
+
+	def AlvaClose(self, device):
+		pass
+
+	def AlvaSetKeyCallback(self, device, callback, userData):
+		pass
+
+	def AlvaGetCells(self, device, numCells):
+		numCells._obj.value = 40
+
+	def AlvaSendBraille(self, device, cells, start, length):
+		self.sent.append((start, cells[:length]))
+
+class TestAlvaBC6(unittest.TestCase):
+	"""Tests the alvaBC6 driver against a fake ALVA library.
+	This driver has no serial port, so L{FakeSerial} can't be used.
+	"""
+
+	def setUp(self):
+		self._origLib = alvaBC6.AlvaLib
+		self.lib = alvaBC6.AlvaLib = FakeAlvaLib()
+		self.driver = alvaBC6.BrailleDisplayDriver()
+
+	def tearDown(self):
+		self.driver.terminate()
+		alvaBC6.AlvaLib = self._origLib
+
+	def test_display(self):
+		self.driver.display([1] * 40)
+		self.assertEqual(self.lib.sent[-1], (0, "\x01" * 40))
+
+	def test_displayRange(self):
+		self.driver.displayRange(3, [1, 2])
+		self.assertEqual(self.lib.sent[-1], (3, "\x01\x02"))
+
+class FakeFsbLib(object):
+	"""Emulates the functions used from fsbrldspapi.dll with a 40 cell display connected via USB.
+	"""
+	FUNCTIONS = ("fbOpen", "fbGetCellCount", "fbWrite", "fbClose",
+		"fbConfigure", "fbGetDisplayName", "fbGetFirmwareVersion", "fbBeep")
+	HANDLE = 1
+
+	def __init__(self):
+		#: The (start, cells) passed to each fbWrite call.
+		self.written = []
+
+	def fbOpen(self, port, window, message):
+		return self.HANDLE if port == "USB" else -1
+
+	def fbGetCellCount(self, handle):
+		return 40
+
+	def fbWrite(self, handle, start, length, cells):
+		assert handle == self.HANDLE
+		self.written.append((start, cells[:length]))
+
+	def fbClose(self, handle):
+		pass
+
+	def fbConfigure(self, handle, flags):
+		pass
+
+	def fbGetDisplayName(self, handle, buf, size):
+		return 0
+
+	def fbGetFirmwareVersion(self, handle, buf, size):
+		return 0
+
+	def fbBeep(self, handle):
+		pass
+
+class TestFreedomScientific(unittest.TestCase):
+	"""Tests the freedomScientific driver against fake functions from the Freedom Scientific library.
+	This driver has no serial port, so L{FakeSerial} can't be used.
+	"""
+
+	def setUp(self):
+		self.lib = FakeFsbLib()
+		self._origFuncs = {}
+		for name in FakeFsbLib.FUNCTIONS:
+			# These don't exist if the library isn't installed.
+			self._origFuncs[name] = getattr(freedomScientific, name, None)
+			setattr(freedomScientific, name, getattr(self.lib, name))
+		self.driver = freedomScientific.BrailleDisplayDriver(port="USB")
+
+	def tearDown(self):
+		self.driver.terminate()
+		for name, func in self._origFuncs.iteritems():
+			if func:
+				setattr(freedomScientific, name, func)
+			else:
+				delattr(freedomScientific, name)
+
+	def test_display(self):
+		self.driver.display([1] * 40)
+		self.assertEqual(self.lib.written[-1], (0, "\x01" * 40))
+
+	def test_displayRange(self):
+		self.driver.displayRange(3, [1, 2])
+		self.assertEqual(self.lib.written[-1], (3, "\x01\x02"))
@@ -0,0 +1,42 @@
+#tests/unit/test_brailleInput.py
+#A part of NonVisual Desktop Access (NVDA)
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+#Copyright (C) 2017 NV Access Limited
+
+"""Unit tests for the brailleInput module.
+"""
+
+import unittest
+import louis
+import brailleInput
+
+TABLE = "en-us-comp8.ctb"
+MODE = louis.dotsIO | louis.noUndefinedDots
+# Dots 1, 1-2, 1-4: "abc".
+CELLS = [0x01, 0x03, 0x09]
+
+class TestBackTranslationCache(unittest.TestCase):
+
+	def setUp(self):
+		brailleInput.backTranslationCache.clear()
+		brailleInput.backTranslationCache.resetStats()
+
+	def test_backTranslate(self):
+		self.assertEqual(brailleInput._backTranslate(TABLE, CELLS, MODE), u"abc")
+
+	def test_cached(self):
+		text = brailleInput._backTranslate(TABLE, CELLS, MODE)
+		self.assertEqual(brailleInput._backTranslate(TABLE, list(CELLS), MODE), text)
+		self.assertEqual(brailleInput.backTranslationCache.hits, 1)
+		self.assertEqual(brailleInput.backTranslationCache.misses, 1)
+
+	def test_prefix(self):
+		brailleInput._backTranslate(TABLE, CELLS, MODE)
+		self.assertEqual(brailleInput._backTranslate(TABLE, CELLS[:2], MODE), u"ab")
+		self.assertEqual(brailleInput.backTranslationCache.hits, 0)
+
+	def test_mode(self):
+		brailleInput._backTranslate(TABLE, CELLS, MODE)
+		brailleInput._backTranslate(TABLE, CELLS, MODE | louis.partialTrans)
+		self.assertEqual(brailleInput.backTranslationCache.hits, 0)
@@ -0,0 +1,96 @@
+#tests/unit/test_brailleTables.py
+#A part of NonVisual Desktop Access (NVDA)
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+#Copyright (C) 2017 NV Access Limited
+
+"""Unit tests for the brailleTables module.
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+import time
+import brailleTables
+
+class TestTableMetadata(unittest.TestCase):
+	"""Tests metadata for tables in a temporary tables directory."""
+
+	TABLES = {
+		"main.ctb": "# A comment\ninclude first.cti\n  include second.cti\n",
+		"first.cti": "include second.cti\nsign \\x0020 0\n",
+		"second.cti": "include main.ctb\n",
+	}
+
+	def setUp(self):
+		self.origTablesDir = brailleTables.TABLES_DIR
+		self.origMetadata = dict(brailleTables._metadata)
+		brailleTables._metadata.clear()
+		brailleTables.TABLES_DIR = tempfile.mkdtemp()
+		for fileName, text in self.TABLES.iteritems():
+			with open(os.path.join(brailleTables.TABLES_DIR, fileName), "wb") as f:
+				f.write(text)
+
+	def tearDown(self):
+		shutil.rmtree(brailleTables.TABLES_DIR)
+		brailleTables.TABLES_DIR = self.origTablesDir
+		brailleTables._metadata.clear()
+		brailleTables._metadata.update(self.origMetadata)
+
+	def test_includes(self):
+		metadata = brailleTables.getTableMetadata("main.ctb")
+		self.assertEqual(metadata.includes, ("first.cti", "second.cti", "main.ctb"))
+		self.assertEqual(len(metadata.includeMtimes), 3)
+		self.assertEqual(metadata.size, sum(len(text) for text in self.TABLES.itervalues()) + len(self.TABLES["main.ctb"]))
+		self.assertIsNone(metadata.compileTime)
+
+	def test_unchanged(self):
+		metadata = brailleTables.getTableMetadata("main.ctb")
+		self.assertIs(brailleTables.getTableMetadata("main.ctb"), metadata)
+
+	def test_includeChanged(self):
+		metadata = brailleTables.getTableMetadata("main.ctb")
+		path = os.path.join(brailleTables.TABLES_DIR, "second.cti")
+		with open(path, "ab") as f:
+			f.write("sign \\x0021 0\n")
+		# The included table changed, but the main table didn't.
+		mtime = int(os.path.getmtime(path)) + 10
+		os.utime(path, (mtime, mtime))
+		newMetadata = brailleTables.getTableMetadata("main.ctb")
+		self.assertEqual(newMetadata.size, metadata.size + len("sign \\x0021 0\n"))
+		self.assertEqual(newMetadata.includeMtimes[1], mtime)
+
+	def test_missingInclude(self):
+		with open(os.path.join(brailleTables.TABLES_DIR, "missing.ctb"), "wb") as f:
+			f.write("include nonexistent.cti\n")
+		metadata = brailleTables.getTableMetadata("missing.ctb")
+		self.assertEqual(metadata.includes, ("nonexistent.cti",))
+		self.assertEqual(metadata.includeMtimes, (None,))
+
+	def test_missingTable(self):
+		self.assertRaises(EnvironmentError, brailleTables.getTableMetadata, "nonexistent.ctb")
+
+class TestWarmUp(unittest.TestCase):
+
+	def test_warmUp(self):
+		fileName = "en-us-g2.ctb"
+		brailleTables._compiledTables.discard(fileName)
+		brailleTables.warmUp([fileName]).join()
+		self.assertIn(fileName, brailleTables._compiledTables)
+		self.assertIsNotNone(brailleTables.getTableMetadata(fileName).compileTime)
+
+	def test_lockWaitNotCounted(self):
+		fileName = "en-us-g2.ctb"
+		brailleTables._compiledTables.discard(fileName)
+		# For example, a translation on the main thread.
+		with brailleTables.louisLock:
+			thread = brailleTables.warmUp([fileName])
+			time.sleep(0.5)
+		thread.join()
+		self.assertLess(brailleTables.getTableMetadata(fileName).compileTime, 0.5)
+
+	def test_nothingToCompile(self):
+		fileName = "en-us-g2.ctb"
+		brailleTables.compileTable(fileName)
+		self.assertIsNone(brailleTables.warmUp([fileName]))
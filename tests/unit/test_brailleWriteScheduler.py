@@ -0,0 +1,187 @@
+#tests/unit/test_brailleWriteScheduler.py
+#A part of NonVisual Desktop Access (NVDA)
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+#Copyright (C) 2017 NV Access Limited
+
+"""Unit tests for the brailleWriteScheduler module.
+"""
+
+import unittest
+import threading
+import time
+import brailleWriteScheduler
+from brailleWriteScheduler import WriteScheduler, getChangedRange
+
+class FakeDisplay(object):
+	"""Records writes, optionally blocking each write until it is released.
+	"""
+
+	def __init__(self, block=False):
+		self.writes = []
+		self.block = block
+		self.writing = threading.Event()
+		self.release = threading.Event()
+
+	def display(self, cells):
+		self.writing.set()
+		if self.block:
+			self.release.wait()
+		self.writes.append(cells)
+
+	def displayRange(self, start, cells):
+		self.writes.append((start, cells))
+
+class TestGetChangedRange(unittest.TestCase):
+
+	def test_unchanged(self):
+		self.assertIsNone(getChangedRange([1, 2, 3], [1, 2, 3]))
+
+	def test_single(self):
+		self.assertEqual(getChangedRange([1, 2, 3], [1, 4, 3]), (1, 2))
+
+	def test_ends(self):
+		self.assertEqual(getChangedRange([1, 2, 3, 4], [0, 2, 3, 0]), (0, 4))
+
+class TestWriteScheduler(unittest.TestCase):
+
+	def setUp(self):
+		brailleWriteScheduler.stats.clear()
+		self.display = FakeDisplay()
+		self.scheduler = WriteScheduler("fake", self.display.display)
+
+	def tearDown(self):
+		self.display.release.set()
+		self.scheduler.stop()
+
+	def test_write(self):
+		self.scheduler.write([1, 2])
+		self.scheduler.write([3, 4])
+		self.assertEqual(self.display.writes, [[1, 2], [3, 4]])
+		stats = brailleWriteScheduler.stats["fake"]
+		self.assertEqual(stats.writes, 2)
+		self.assertEqual(stats.cellsWritten, 4)
+
+	def test_unchangedSkipped(self):
+		self.scheduler.write([1, 2])
+		self.scheduler.write([1, 2])
+		self.assertEqual(self.display.writes, [[1, 2]])
+		self.assertEqual(self.scheduler.stats.unchangedSkipped, 1)
+
+	def test_failedWriteNotSkipped(self):
+		def fail(cells):
+			raise EnvironmentError
+		self.scheduler._write = fail
+		self.assertRaises(EnvironmentError, self.scheduler.write, [1])
+		self.scheduler._write = self.display.display
+		self.scheduler.write([1])
+		self.assertEqual(self.display.writes, [[1]])
+
+	def test_queue(self):
+		self.scheduler.queue([1])
+		self.assertTrue(self.scheduler.flush(5))
+		self.assertEqual(self.display.writes, [[1]])
+
+	def test_coalesce(self):
+		self.display.block = True
+		self.scheduler.queue([1])
+		self.assertTrue(self.display.writing.wait(5))
+		# The first write is in progress, so only the last of these should be written.
+		for cells in ([2], [3], [4]):
+			self.scheduler.queue(cells)
+		self.display.release.set()
+		self.assertTrue(self.scheduler.flush(5))
+		self.assertEqual(self.display.writes, [[1], [4]])
+		self.assertEqual(self.scheduler.stats.coalesced, 2)
+
+	def test_minInterval(self):
+		self.scheduler.minInterval = 0.2
+		self.scheduler.queue([1])
+		self.assertTrue(self.scheduler.flush(5))
+		start = time.time()
+		self.scheduler.queue([2])
+		self.scheduler.queue([3])
+		self.assertTrue(self.scheduler.flush(5))
+		self.assertGreaterEqual(time.time() - start, 0.1)
+		self.assertEqual(self.display.writes, [[1], [3]])
+
+	def test_flushTimeout(self):
+		self.display.block = True
+		self.scheduler.queue([1])
+		self.assertFalse(self.scheduler.flush(0.05))
+
+	def test_onError(self):
+		errors = []
+		def fail(cells):
+			raise EnvironmentError
+		scheduler = WriteScheduler("failing", fail, onError=lambda: errors.append(True))
+		try:
+			scheduler.queue([1])
+			self.assertTrue(scheduler.flush(5))
+		finally:
+			scheduler.stop()
+		self.assertEqual(errors, [True])
+		self.assertEqual(scheduler.stats.writes, 0)
+
+	def test_stopDiscardsQueued(self):
+		self.display.block = True
+		self.scheduler.queue([1])
+		self.assertTrue(self.display.writing.wait(5))
+		self.scheduler.queue([2])
+		# stop waits for the write in progress, so release it once stop has been called.
+		stopper = threading.Thread(target=self.scheduler.stop)
+		stopper.start()
+		while not self.scheduler._exit:
+			time.sleep(0.01)
+		self.display.release.set()
+		stopper.join()
+		self.scheduler.queue([3])
+		self.assertEqual(self.display.writes, [[1]])
+
+	def test_statsPersist(self):
+		self.scheduler.write([1])
+		self.scheduler.stop()
+		self.scheduler = WriteScheduler("fake", self.display.display)
+		self.scheduler.write([2])
+		self.assertEqual(brailleWriteScheduler.stats["fake"].writes, 2)
+
+class TestWriteRange(unittest.TestCase):
+
+	def setUp(self):
+		brailleWriteScheduler.stats.clear()
+		self.display = FakeDisplay()
+		self.scheduler = WriteScheduler("fake", self.display.display, writeRange=self.display.displayRange)
+
+	def test_changedRange(self):
+		self.scheduler.write([0, 0, 0, 0])
+		# For example, the cursor blinking.
+		self.scheduler.write([0, 0xc0, 0, 0])
+		self.scheduler.write([1, 2, 3, 4])
+		self.assertEqual(self.display.writes, [[0, 0, 0, 0], (1, [0xc0]), [1, 2, 3, 4]])
+		self.assertEqual(self.scheduler.stats.rangeWrites, 1)
+		self.assertEqual(self.scheduler.stats.cellsWritten, 9)
+
+	def test_lengthChanged(self):
+		self.scheduler.write([0, 0])
+		self.scheduler.write([0, 1, 0])
+		self.assertEqual(self.display.writes, [[0, 0], [0, 1, 0]])
+
+	def test_notImplemented(self):
+		def writeRange(start, cells):
+			raise NotImplementedError
+		self.scheduler._writeRange = writeRange
+		self.scheduler.write([0, 0])
+		self.scheduler.write([0, 1])
+		self.assertEqual(self.display.writes, [[0, 0], [0, 1]])
+		self.assertIsNone(self.scheduler._writeRange)
+		self.assertEqual(self.scheduler.stats.rangeWrites, 0)
+
+	def test_failedWrite(self):
+		self.scheduler.write([0, 0])
+		def fail(start, cells):
+			raise EnvironmentError
+		self.scheduler._writeRange = fail
+		self.assertRaises(EnvironmentError, self.scheduler.write, [0, 1])
+		# The display state is unknown, so all cells must be written.
+		self.scheduler.write([0, 2])
+		self.assertEqual(self.display.writes, [[0, 0], [0, 2]])
@@ -0,0 +1,333 @@
+#tests/unit/test_characterProcessing.py
+#A part of NonVisual Desktop Access (NVDA)
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+#Copyright (C) 2017 NV Access Limited
+
+"""Unit tests for the characterProcessing module.
+"""
+
+import unittest
+import random
+import copy
+import os
+import tempfile
+import marshal
+import re
+import shutil
+import globalVars
+import characterProcessing
+from characterProcessing import SpeechSymbol, SpeechSymbols, SpeechSymbolProcessor
+from characterProcessing import SYMLVL_NONE, SYMLVL_SOME, SYMLVL_MOST, SYMLVL_ALL, SYMLVL_CHAR, SYMPRES_NEVER
+from regexpUtils import makeTriePattern, getStartCharacters
+import benchmark
+
+def makeProcessor(symbols):
+	"""Make an English symbol processor with additional simple symbols.
+	@param symbols: (identifier, replacement, level) tuples.
+	"""
+	processor = SpeechSymbolProcessor("en")
+	extra = SpeechSymbols()
+	for identifier, replacement, level in symbols:
+		extra.symbols[identifier] = SpeechSymbol(identifier, None, replacement, level, SYMPRES_NEVER)
+	processor.sources.insert(0, extra)
+	processor._build()
+	return processor
+
+def makeComplexProcessor(symbols):
+	"""Make an English symbol processor with additional complex symbols.
+	@param symbols: (identifier, pattern, replacement) tuples.
+	"""
+	processor = SpeechSymbolProcessor("en")
+	extra = SpeechSymbols()
+	for identifier, pattern, replacement in symbols:
+		extra.complexSymbols[identifier] = pattern
+		extra.symbols[identifier] = SpeechSymbol(identifier, None, replacement, SYMLVL_SOME, SYMPRES_NEVER)
+	processor.sources.insert(0, extra)
+	processor._build()
+	return processor
+
+def makeUserProcessor(userSymbols):
+	"""Make an English symbol processor which uses the given user symbols
+	instead of those from the user's configuration.
+	@type userSymbols: L{SpeechSymbols}
+	"""
+	processor = SpeechSymbolProcessor("en")
+	processor.userSymbols = processor.sources[0] = userSymbols
+	processor._build()
+	return processor
+
+class TestParseFileCached(unittest.TestCase):
+
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp()
+		self.origConfigPath = globalVars.appArgs.configPath
+		globalVars.appArgs.configPath = os.path.join(self.tempDir, u"config")
+		self.fileName = os.path.join(self.tempDir, "test.dic")
+		self.writeFile("a\tb\n")
+		self.parsed = []
+
+	def tearDown(self):
+		globalVars.appArgs.configPath = self.origConfigPath
+		shutil.rmtree(self.tempDir)
+
+	def writeFile(self, text):
+		with open(self.fileName, "wb") as f:
+			f.write(text)
+
+	def parse(self, fileName, suffix=""):
+		with open(fileName, "rb") as f:
+			data = f.read() + suffix
+		self.parsed.append(data)
+		return data
+
+	def parseCached(self, parseVersion=1, *args):
+		return characterProcessing._parseFileCached(self.fileName, self.parse, parseVersion, *args)
+
+	def corruptCache(self, data):
+		cacheDir = os.path.join(globalVars.appArgs.configPath, u"cache")
+		cacheFiles = os.listdir(cacheDir)
+		self.assertEqual(len(cacheFiles), 1)
+		with open(os.path.join(cacheDir, cacheFiles[0]), "wb") as f:
+			f.write(data)
+
+	def test_hit(self):
+		self.assertEqual(self.parseCached(), "a\tb\n")
+		self.assertEqual(self.parseCached(), "a\tb\n")
+		self.assertEqual(len(self.parsed), 1)
+
+	def test_changedSameSizeAndTime(self):
+		"""Test that an edit which changes neither the size nor the modification time of a file invalidates the cache.
+		"""
+		self.parseCached()
+		stat = os.stat(self.fileName)
+		self.writeFile("c\td\n")
+		os.utime(self.fileName, (stat.st_atime, stat.st_mtime))
+		self.assertEqual(self.parseCached(), "c\td\n")
+		self.assertEqual(len(self.parsed), 2)
+
+	def test_changedParseVersion(self):
+		self.parseCached(parseVersion=1)
+		self.parseCached(parseVersion=2)
+		self.assertEqual(len(self.parsed), 2)
+
+	def test_changedArgs(self):
+		self.parseCached(1, "x")
+		self.assertEqual(self.parseCached(1, "y"), "a\tb\ny")
+		self.assertEqual(len(self.parsed), 2)
+
+	def test_corrupt(self):
+		self.parseCached()
+		# Truncated data, invalid data and valid data of the wrong type.
+		for data in ("(\x02\x00", "\xff\xfe", marshal.dumps(42)):
+			self.corruptCache(data)
+			self.assertEqual(self.parseCached(), "a\tb\n")
+		self.assertEqual(len(self.parsed), 4)
+		# The cache was rewritten.
+		self.parseCached()
+		self.assertEqual(len(self.parsed), 4)
+
+	def test_missingFile(self):
+		os.remove(self.fileName)
+		self.assertRaises(IOError, self.parseCached)
+
+class TestSimpleSymbols(unittest.TestCase):
+
+	def setUp(self):
+		self.processor = makeProcessor([
+			(u"=>", u"becomes", SYMLVL_SOME),
+			(u"=>>", u"really becomes", SYMLVL_SOME),
+			(u"<=>", u"equivalent", SYMLVL_ALL),
+		])
+
+	def test_longestMatches(self):
+		self.assertEqual(self.processor.processText(u"a =>> b", SYMLVL_SOME), u"a  really becomes  b")
+		self.assertEqual(self.processor.processText(u"a => b", SYMLVL_SOME), u"a  becomes  b")
+
+	def test_prefixOfSymbol(self):
+		# "<=" is only the start of a symbol, so this is "<" followed by "=".
+		self.assertEqual(self.processor.processText(u"<=x", SYMLVL_ALL),
+			self.processor.processText(u"<", SYMLVL_ALL) + self.processor.processText(u"=", SYMLVL_ALL) + u"x")
+
+	def test_level(self):
+		self.assertEqual(self.processor.processText(u"<=>", SYMLVL_ALL), u" equivalent ")
+		self.assertNotIn(u"equivalent", self.processor.processText(u"<=>", SYMLVL_NONE))
+
+class TestHasSymbols(unittest.TestCase):
+
+	def test_noSymbols(self):
+		processor = SpeechSymbolProcessor("en")
+		self.assertFalse(processor.hasSymbols(u"hello"))
+		self.assertTrue(processor.hasSymbols(u"hello,"))
+
+	def test_trailingSpaces(self):
+		processor = SpeechSymbolProcessor("en")
+		for text in (u"hello  ", u"hello  \n"):
+			self.assertTrue(processor.hasSymbols(text))
+			self.assertNotEqual(processor.processText(text, SYMLVL_ALL), text)
+
+	def test_complexSymbol(self):
+		processor = makeComplexProcessor([(u"times", ur"(?<=\d)x(?=\d)", u"times")])
+		self.assertTrue(processor.hasSymbols(u"3x4"))
+		self.assertEqual(processor.processText(u"3x4", SYMLVL_SOME), u"3 times 4")
+		self.assertFalse(processor.hasSymbols(u"34"))
+
+	def test_unknownStart(self):
+		"""Test that text is always processed if it can't be determined where a complex symbol could start.
+		"""
+		processor = makeComplexProcessor([(u"word end", ur"\w\b", u"end")])
+		self.assertIsNone(processor.symbolStartCharacters)
+		self.assertTrue(processor.hasSymbols(u"hello"))
+
+	def test_random(self):
+		"""Test that text without symbols according to L{SpeechSymbolProcessor.hasSymbols} isn't changed by processing.
+		"""
+		processor = makeComplexProcessor([(u"times", ur"(?<=\d)x(?=\d)", u"times")])
+		rand = random.Random(0)
+		alphabet = u"ab1x.-,"
+		for i in xrange(1000):
+			text = u"".join(rand.choice(alphabet) for j in xrange(rand.randint(0, 8)))
+			if not processor.hasSymbols(text):
+				self.assertEqual(processor.processText(text, SYMLVL_CHAR), text)
+
+	def test_getStartCharacters(self):
+		self.assertEqual(getStartCharacters(ur"(?<=[^\s.])\.(?=\s|$)"), frozenset(u"."))
+		self.assertEqual(getStartCharacters(ur"(?:ab|c)?[d-f]"), frozenset(u"acdef"))
+		for pattern in (ur"a*", ur"\w+", ur"(?i)a", ur"[^a]", ur"."):
+			self.assertIsNone(getStartCharacters(pattern))
+
+class TestIncrementalUpdates(unittest.TestCase):
+	"""Test that symbols changed as the symbols dialog changes them
+	give the same results as a new processor which loads the saved user symbols.
+	"""
+
+	def setUp(self):
+		self.processor = makeUserProcessor(SpeechSymbols())
+		self.tempDir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.tempDir)
+
+	def assertMatchesFresh(self):
+		fileName = os.path.join(self.tempDir, "symbols-en.dic")
+		self.processor.userSymbols.save(fileName)
+		userSymbols = SpeechSymbols()
+		userSymbols.load(fileName, allowComplexSymbols=False)
+		fresh = makeUserProcessor(userSymbols)
+		# The order of the symbols doesn't matter.
+		self.assertEqual(set(self.processor.computedSymbols), set(fresh.computedSymbols))
+		for identifier, symbol in fresh.computedSymbols.iteritems():
+			self.assertEqual(repr(self.processor.computedSymbols[identifier]), repr(symbol))
+		text = u" x ".join(fresh.computedSymbols)
+		for level in characterProcessing.SPEECH_SYMBOL_LEVELS:
+			self.assertEqual(self.processor.processText(text, level), fresh.processText(text, level))
+
+	def editSymbol(self, identifier, **changes):
+		# The dialog edits copies of the computed symbols.
+		symbol = copy.copy(self.processor.computedSymbols[identifier])
+		for attr, value in changes.iteritems():
+			setattr(symbol, attr, value)
+		self.assertTrue(self.processor.updateSymbol(symbol))
+		return symbol
+
+	def addSymbol(self, identifier, replacement):
+		symbol = SpeechSymbol(identifier, None, replacement, SYMLVL_ALL, SYMPRES_NEVER, identifier)
+		self.assertTrue(self.processor.updateSymbol(symbol))
+		return symbol
+
+	def test_changeReplacement(self):
+		self.editSymbol(u",", replacement=u"KOMMA")
+		self.assertIn(u"KOMMA", self.processor.processText(u"a, b", SYMLVL_ALL))
+		self.assertMatchesFresh()
+
+	def test_changeLevel(self):
+		self.editSymbol(u",", level=SYMLVL_NONE)
+		self.assertIn(u"comma", self.processor.processText(u"a, b", SYMLVL_NONE))
+		self.assertMatchesFresh()
+
+	def test_unchanged(self):
+		symbol = copy.copy(self.processor.computedSymbols[u","])
+		self.assertFalse(self.processor.updateSymbol(symbol))
+		self.assertMatchesFresh()
+
+	def test_add(self):
+		self.addSymbol(u"xx", u"double ex")
+		self.addSymbol(u"\u00a4", u"currency")
+		self.assertIn(u"double ex", self.processor.processText(u"axxb", SYMLVL_ALL))
+		self.assertMatchesFresh()
+
+	def test_deleteAdded(self):
+		symbol = self.addSymbol(u"xx", u"double ex")
+		self.processor.processText(u"axxb", SYMLVL_ALL)
+		self.processor.deleteSymbol(symbol)
+		self.assertNotIn(u"double ex", self.processor.processText(u"axxb", SYMLVL_ALL))
+		self.assertMatchesFresh()
+
+	def test_deleteChanged(self):
+		"""Test that deleting a changed builtin symbol reverts to the builtin symbol.
+		"""
+		symbol = self.editSymbol(u",", replacement=u"KOMMA")
+		self.processor.deleteSymbol(symbol)
+		self.assertNotIn(u"KOMMA", self.processor.processText(u"a, b", SYMLVL_ALL))
+		self.assertMatchesFresh()
+
+class TestSymbolsBenchmark(unittest.TestCase):
+	"""Benchmarks processing of long text with many user defined symbols.
+	"""
+	SYMBOL_COUNT = 1000
+	TEXT_LENGTH = 20000
+
+	@classmethod
+	def setUpClass(cls):
+		rand = random.Random(0)
+		alphabet = u"ab.-!?=<> "
+		symbols = {}
+		while len(symbols) < cls.SYMBOL_COUNT:
+			identifier = u"".join(rand.choice(alphabet) for i in xrange(rand.randint(2, 6)))
+			symbols[identifier] = (identifier, u"symbol%d" % len(symbols),
+				rand.choice((SYMLVL_NONE, SYMLVL_SOME, SYMLVL_MOST, SYMLVL_ALL)))
+		cls.symbols = symbols.values()
+		cls.processor = makeProcessor(cls.symbols)
+		cls.text = u"".join(rand.choice(alphabet + u"xyz") for i in xrange(cls.TEXT_LENGTH))
+
+	def test_levels(self):
+		timings = {}
+		for level in characterProcessing.SPEECH_SYMBOL_LEVELS:
+			results = []
+			def process():
+				self.processor.clearCache()
+				results.append(self.processor.processText(self.text, level))
+			timings["level%d" % level] = benchmark.timeCall(process, repeat=1)
+			processed = results[-1]
+			# This only checks that symbols are replaced at all.
+			# test_matchesAlternation checks the full output.
+			for identifier, replacement, symbolLevel in self.symbols:
+				if symbolLevel <= level and replacement in processed:
+					break
+			else:
+				self.fail("No symbols replaced at level %d" % level)
+		benchmark.report("symbols %d symbols %d characters" % (self.SYMBOL_COUNT, self.TEXT_LENGTH), **timings)
+
+	def test_matchesAlternation(self):
+		"""Test that matching multiple character symbols using a trie gives the same output
+		as the flat alternation of these symbols (longest first) which it replaced.
+		This uses all of the English symbols and the additional symbols at every level.
+		"""
+		processor = makeProcessor(self.symbols)
+		multiChars = [identifier for identifier, symbol in processor.computedSymbols.iteritems()
+			if symbol.pattern is None and len(identifier) > 1]
+		trie = makeTriePattern(multiChars)
+		pattern = processor._regexp.pattern
+		self.assertEqual(pattern.count(trie), 1)
+		multiChars.sort(key=len, reverse=True)
+		reference = makeProcessor(self.symbols)
+		reference._regexp = re.compile(pattern.replace(trie,
+			u"|".join(re.escape(identifier) for identifier in multiChars)), re.UNICODE)
+		text = self.text + u" ".join(processor.computedSymbols)
+		for level in characterProcessing.SPEECH_SYMBOL_LEVELS:
+			self.assertEqual(processor.processText(text, level), reference.processText(text, level))
+
+	def test_hasSymbols(self):
+		self.assertTrue(self.processor.hasSymbols(self.text))
+		benchmark.report("hasSymbols %d symbols %d characters" % (self.SYMBOL_COUNT, self.TEXT_LENGTH),
+			hasSymbols=benchmark.timeCall(lambda: self.processor.hasSymbols(self.text)))
@@ -0,0 +1,332 @@
+#tests/unit/test_config.py
+#A part of NonVisual Desktop Access (NVDA)
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+#Copyright (C) 2017 NV Access Limited
+
+"""Unit tests for the config module.
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+import config
+import globalVars
+from configobj import ConfigObj
+import benchmark
+
+def makeProfile(name, lines):
+	"""Make an in-memory profile as would be loaded by L{config.ConfigManager}.
+	"""
+	profile = ConfigObj(lines, indent_type="\t", encoding="UTF-8")
+	profile.name = name
+	profile.manual = True
+	profile.triggered = False
+	return profile
+
+class TestSnapshot(unittest.TestCase):
+	"""Tests the flattened snapshot provided by L{config.ConfigManager.getSnapshot}."""
+
+	def setUp(self):
+		self.conf = config.conf
+		self.origExpandAtCursor = self.conf["braille"]["expandAtCursor"]
+		self.origProfiles = list(self.conf.profiles)
+
+	def tearDown(self):
+		if self.conf.profiles != self.origProfiles:
+			self.conf.profiles[:] = self.origProfiles
+			self.conf._handleProfileSwitch()
+		self.conf["braille"]["expandAtCursor"] = self.origExpandAtCursor
+
+	def test_matchesSections(self):
+		snapshot = self.conf.getSnapshot()
+		self.assertIn("braille.expandAtCursor", snapshot)
+		for path, val in snapshot.iteritems():
+			section = self.conf
+			for key in path.split("."):
+				section = section[key]
+			self.assertEqual(val, section, msg=path)
+
+	def test_lazy(self):
+		self.conf._handleProfileSwitch()
+		self.conf.getValue("braille.expandAtCursor")
+		self.assertIn("braille.expandAtCursor", self.conf._snapshot)
+		self.assertFalse(self.conf._snapshot.isComplete)
+
+	def test_readOnly(self):
+		snapshot = self.conf.getSnapshot()
+		self.assertRaises(TypeError, snapshot.__setitem__, "braille.expandAtCursor", False)
+		self.assertRaises(TypeError, snapshot.update, {})
+
+	def test_set(self):
+		self.conf["braille"]["expandAtCursor"] = not self.origExpandAtCursor
+		self.assertEqual(self.conf.getValue("braille.expandAtCursor"), not self.origExpandAtCursor)
+
+	def test_setDuringRead(self):
+		self.conf._invalidateSnapshot()
+		snapshot = self.conf._snapshot
+		self.conf["braille"]["expandAtCursor"] = not self.origExpandAtCursor
+		# Simulate getValue on another thread adding the value it looked up before the change.
+		snapshot._set("braille.expandAtCursor", self.origExpandAtCursor)
+		self.assertEqual(self.conf.getValue("braille.expandAtCursor"), not self.origExpandAtCursor)
+
+	def test_unchangedSetKeepsSnapshot(self):
+		snapshot = self.conf.getSnapshot()
+		self.conf["braille"]["expandAtCursor"] = self.origExpandAtCursor
+		self.assertIs(self.conf.getSnapshot(), snapshot)
+
+	def test_profileSwitch(self):
+		self.conf.getSnapshot()
+		self.conf.profiles.append(makeProfile("test", ["[braille]", "expandAtCursor = %s" % (not self.origExpandAtCursor)]))
+		self.conf._handleProfileSwitch()
+		self.assertEqual(self.conf.getValue("braille.expandAtCursor"), not self.origExpandAtCursor)
+
+	def test_baseOnly(self):
+		self.assertNotIn("general.language", self.conf.getSnapshot())
+		self.assertEqual(self.conf.getValue("general.language"), self.conf["general"]["language"])
+
+	def test_missing(self):
+		self.assertRaises(KeyError, self.conf.getValue, "braille.noSuchSetting")
+
+class TestIncrementalProfileSwitch(unittest.TestCase):
+	"""Tests that a profile switch only affects the settings in the profiles which were activated or deactivated."""
+
+	def setUp(self):
+		self.conf = config.conf
+		self.origProfiles = list(self.conf.profiles)
+		self.origExpandAtCursor = self.conf["braille"]["expandAtCursor"]
+		self.changedKeys = []
+		config.configProfileSwitched.register(self.handleConfigProfileSwitch)
+
+	def tearDown(self):
+		config.configProfileSwitched.unregister(self.handleConfigProfileSwitch)
+		self.conf.profiles[:] = self.origProfiles
+		self.conf._handleProfileSwitch()
+		self.conf._dirtyProfiles.discard("test")
+
+	def handleConfigProfileSwitch(self, changedKeys=None):
+		self.changedKeys.append(changedKeys)
+
+	def activate(self, *lines):
+		profile = makeProfile("test", lines)
+		self.conf.profiles.append(profile)
+		self.conf._handleProfileSwitch()
+		return profile
+
+	def test_unaffectedCacheKept(self):
+		braille = self.conf["braille"]
+		self.activate("[keyboard]", "speakTypedCharacters = False")
+		self.assertIs(self.conf["braille"], braille)
+		self.assertIn("expandAtCursor", braille._cache)
+		self.assertEqual(self.conf["keyboard"]["speakTypedCharacters"], False)
+
+	def test_overriddenSetting(self):
+		self.activate("[braille]", "expandAtCursor = %s" % (not self.origExpandAtCursor))
+		self.assertEqual(self.conf["braille"]["expandAtCursor"], not self.origExpandAtCursor)
+		self.conf.profiles[:] = self.origProfiles
+		self.conf._handleProfileSwitch()
+		self.assertEqual(self.conf["braille"]["expandAtCursor"], self.origExpandAtCursor)
+
+	def test_changedKeys(self):
+		wordWrap = self.conf["braille"]["wordWrap"]
+		self.activate("[braille]", "expandAtCursor = %s" % (not self.origExpandAtCursor),
+			# This doesn't change the value.
+			"wordWrap = %s" % wordWrap)
+		self.assertEqual(self.changedKeys, [frozenset(["braille.expandAtCursor"])])
+
+	def test_reorderedProfiles(self):
+		first = self.activate("[braille]", "expandAtCursor = True")
+		self.activate("[braille]", "expandAtCursor = False")
+		self.conf.profiles[-2:] = reversed(self.conf.profiles[-2:])
+		self.conf._handleProfileSwitch()
+		self.assertIsNone(self.changedKeys[-1])
+		self.assertEqual(self.conf["braille"]["expandAtCursor"], True)
+
+	def test_setAfterSwitch(self):
+		self.conf["keyboard"]["speakTypedWords"]
+		profile = self.activate("[braille]", "expandAtCursor = True")
+		self.conf["keyboard"]["speakTypedWords"] = not self.conf["keyboard"]["speakTypedWords"]
+		# The setting must be written to the most recently activated profile.
+		self.assertIn("speakTypedWords", profile["keyboard"])
+
+class TestProfileLoading(unittest.TestCase):
+	"""Tests caching and preloading of profiles."""
+
+	def setUp(self):
+		self.conf = config.conf
+		self.origConfigPath = globalVars.appArgs.configPath
+		globalVars.appArgs.configPath = unicode(tempfile.mkdtemp())
+		os.mkdir(os.path.join(globalVars.appArgs.configPath, "profiles"))
+		self.fn = self.conf._getProfileFn("test")
+		self.writeProfile("[braille]", "expandAtCursor = False")
+
+	def tearDown(self):
+		self.conf._profileCache.pop("test", None)
+		self.conf._dirtyProfiles.discard("test")
+		self.conf._parsedProfiles.pop(self.fn, None)
+		shutil.rmtree(globalVars.appArgs.configPath)
+		globalVars.appArgs.configPath = self.origConfigPath
+
+	def writeProfile(self, *lines):
+		with open(self.fn, "w") as f:
+			f.write("\n".join(lines))
+
+	def reload(self):
+		"""Load the profile again as is done after the configuration is reset.
+		"""
+		self.conf._profileCache.pop("test")
+		return self.conf._getProfile("test")
+
+	def test_unchangedFileReused(self):
+		profile = self.conf._getProfile("test")
+		self.assertIs(self.reload(), profile)
+
+	def test_changedFile(self):
+		profile = self.conf._getProfile("test")
+		self.writeProfile("[braille]", "expandAtCursor = True", "wordWrap = False")
+		reloaded = self.reload()
+		self.assertIsNot(reloaded, profile)
+		self.assertEqual(reloaded["braille"]["wordWrap"], "False")
+
+	def test_modifiedProfile(self):
+		profile = self.conf._getProfile("test")
+		profile["braille"]["expandAtCursor"] = True
+		self.conf._dirtyProfiles.add("test")
+		reloaded = self.reload()
+		self.assertIsNot(reloaded, profile)
+		self.assertEqual(reloaded["braille"]["expandAtCursor"], "False")
+		self.assertNotIn("test", self.conf._dirtyProfiles)
+
+	def test_preload(self):
+		thread = self.conf._preloadProfiles(["test"])
+		thread.join()
+		cachedKey, profile = self.conf._parsedProfiles[self.fn]
+		self.assertIs(self.conf._getProfile("test"), profile)
+
+	def test_preloadMissing(self):
+		os.remove(self.fn)
+		self.conf._preloadProfiles(["test"]).join()
+		self.assertNotIn(self.fn, self.conf._parsedProfiles)
+		self.assertRaises(EnvironmentError, self.conf._getProfile, "test")
+
+class TestSave(unittest.TestCase):
+	"""Tests saving the configuration in the background."""
+
+	def setUp(self):
+		self.conf = config.conf
+		self.origConfigPath = globalVars.appArgs.configPath
+		globalVars.appArgs.configPath = unicode(tempfile.mkdtemp())
+		os.mkdir(os.path.join(globalVars.appArgs.configPath, "profiles"))
+		# Don't overwrite the base configuration used by the tests.
+		self.base = self.conf.profiles[0]
+		self.origBaseFileName = self.base.filename
+		self.base.filename = os.path.join(globalVars.appArgs.configPath, u"nvda.ini")
+		self.fn = self.conf._getProfileFn("test")
+		with open(self.fn, "w") as f:
+			f.write("[braille]\nexpandAtCursor = False\n")
+		self.profile = self.conf._getProfile("test")
+		self.profile["braille"]["expandAtCursor"] = True
+		self.conf._dirtyProfiles.add("test")
+
+	def tearDown(self):
+		self.conf.waitForSave()
+		self.base.filename = self.origBaseFileName
+		self.conf._profileCache.pop("test", None)
+		self.conf._dirtyProfiles.discard("test")
+		self.conf._parsedProfiles.pop(self.fn, None)
+		shutil.rmtree(globalVars.appArgs.configPath)
+		globalVars.appArgs.configPath = self.origConfigPath
+
+	def readProfile(self):
+		with open(self.fn) as f:
+			return f.read()
+
+	def test_wait(self):
+		self.conf.save()
+		self.assertIn("expandAtCursor = True", self.readProfile())
+		self.assertTrue(os.path.isfile(self.base.filename))
+		self.assertNotIn("test", self.conf._dirtyProfiles)
+
+	def test_background(self):
+		results = []
+		self.conf.save(wait=False, onComplete=results.append)
+		# Later changes must not be saved.
+		self.profile["braille"]["expandAtCursor"] = False
+		self.assertTrue(self.conf.waitForSave(5))
+		self.assertEqual(results, [None])
+		self.assertIn("expandAtCursor = True", self.readProfile())
+
+	def test_error(self):
+		self.profile.filename = os.path.join(globalVars.appArgs.configPath, u"missing", u"test.ini")
+		self.assertRaises(EnvironmentError, self.conf.save)
+		# The profile must be saved again next time.
+		self.assertIn("test", self.conf._dirtyProfiles)
+
+	def test_resetAfterBackground(self):
+		origProfiles = self.conf.profiles
+		origRootSection = self.conf.rootSection
+		self.conf.save(wait=False)
+		try:
+			self.conf.reset()
+			# The pending save must have been written before the configuration was read again.
+			self.assertIn("expandAtCursor = True", self.readProfile())
+			self.assertTrue(os.path.isfile(self.base.filename))
+			self.assertIs(self.conf._getProfile("test")["braille"]["expandAtCursor"], True)
+		finally:
+			self.conf.profiles = origProfiles
+			self.conf._profileCache[None] = self.base
+			self.conf.rootSection = origRootSection
+			self.conf._handleProfileSwitch()
+
+	def test_deleteAfterBackground(self):
+		self.conf.save(wait=False)
+		self.conf.deleteProfile("test")
+		# The pending save must not recreate the deleted profile.
+		self.assertTrue(self.conf.waitForSave(5))
+		self.assertFalse(os.path.isfile(self.fn))
+
+class TestSnapshotBenchmark(unittest.TestCase):
+	"""Benchmarks reading settings after each of many profile switches."""
+	SWITCHES = 50
+	READS = 100
+	PATHS = (("braille", "expandAtCursor"), ("braille", "translationTable"), ("speech", "symbolLevel"),
+		("keyboard", "speakTypedCharacters"))
+
+	def setUp(self):
+		self.origProfiles = list(config.conf.profiles)
+		# For example, a profile triggered by an application.
+		self.profile = makeProfile("test", ["[keyboard]", "speakTypedCharacters = False"])
+
+	def tearDown(self):
+		config.conf.profiles[:] = self.origProfiles
+		config.conf._handleProfileSwitch()
+
+	def switch(self):
+		conf = config.conf
+		if conf.profiles[-1] is self.profile:
+			del conf.profiles[-1]
+		else:
+			conf.profiles.append(self.profile)
+		conf._handleProfileSwitch()
+
+	def test_readAfterSwitch(self):
+		conf = config.conf
+		dottedPaths = [".".join(path) for path in self.PATHS]
+		def readSections():
+			for switch in xrange(self.SWITCHES):
+				self.switch()
+				for read in xrange(self.READS):
+					for section, key in self.PATHS:
+						conf[section][key]
+		def readSnapshot():
+			for switch in xrange(self.SWITCHES):
+				self.switch()
+				for read in xrange(self.READS):
+					for path in dottedPaths:
+						conf.getValue(path)
+		for (section, key), path in zip(self.PATHS, dottedPaths):
+			self.assertEqual(conf.getValue(path), conf[section][key])
+		benchmark.report("config reads %d switches %d reads" % (self.SWITCHES, self.READS),
+			sections=benchmark.timeCall(readSections, repeat=1),
+			snapshot=benchmark.timeCall(readSnapshot, repeat=1))
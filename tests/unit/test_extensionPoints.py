@@ -8,7 +8,9 @@
 """
 
 import unittest
+import inspect
 import extensionPoints
+import benchmark
 
 class ExampleClass(object):
 	def method(self):
@@ -17,6 +19,19 @@ class ExampleClass(object):
 def exampleFunc():
 	return 3.14
 
+class ExampleHandlers(object):
+	"""Handlers which count how many times they were called.
+	"""
+
+	def __init__(self, called):
+		self.called = called
+
+	def onNoKwargs(self):
+		self.called[0] += 1
+
+	def onSomeKwargs(self, a=None, b=None):
+		self.called[0] += 1
+
 class TestBoundMethodWeakref(unittest.TestCase):
 
 	def onDelete(self, weak):
@@ -176,6 +191,49 @@ class TestHandlerRegistrar(unittest.TestCase):
 		actual = list(self.reg.handlers)
 		self.assertEqual(actual, [inst1.method, inst3.method])
 
+	def test_supportedKwargsCached(self):
+		"""Test that handlers are only inspected when they are registered, not each time they are called.
+		"""
+		def handler(a, b=None):
+			pass
+		inst = ExampleClass()
+		origGetargspec = inspect.getargspec
+		inspected = []
+		def getargspec(func):
+			inspected.append(func)
+			return origGetargspec(func)
+		inspect.getargspec = getargspec
+		try:
+			self.reg.register(handler)
+			self.reg.register(inst.method)
+			self.assertEqual(len(inspected), 2)
+			list(self.reg.handlers)
+			self.assertEqual(self.reg._getCalls(), self.reg._getCalls())
+			self.assertEqual(len(inspected), 2)
+		finally:
+			inspect.getargspec = origGetargspec
+		self.assertEqual([supportedKwargs for weak, supportedKwargs in self.reg._getCalls()],
+			[frozenset(["b"]), frozenset()])
+
+	def test_callsInvalidated(self):
+		"""Test that the cached calls are rebuilt when handlers are registered, unregistered or die.
+		"""
+		def tempFunc():
+			return 42
+		inst = ExampleClass()
+		self.reg.register(exampleFunc)
+		calls = self.reg._getCalls()
+		self.assertIs(self.reg._getCalls(), calls)
+		self.reg.register(tempFunc)
+		self.reg.register(inst.method)
+		self.assertEqual(len(self.reg._getCalls()), 3)
+		self.reg.unregister(exampleFunc)
+		self.assertEqual(len(self.reg._getCalls()), 2)
+		del tempFunc
+		self.assertEqual(len(self.reg._getCalls()), 1)
+		del inst
+		self.assertEqual(self.reg._getCalls(), ())
+
 class TestAction(unittest.TestCase):
 
 	def setUp(self):
@@ -227,6 +285,31 @@ class TestAction(unittest.TestCase):
 		self.action.notify()
 		self.assertEqual(called, [handler2])
 
+	def test_supportedKwargs(self):
+		"""Test that only the keyword arguments a handler supports get passed to it.
+		"""
+		calledKwargs = {}
+		def handler(a=None):
+			calledKwargs["a"] = a
+		self.action.register(handler)
+		self.action.notify(a=1, b=2)
+		self.assertEqual(calledKwargs, {"a": 1})
+
+	def test_uninspectableHandler(self):
+		"""Test that a handler which can't be inspected doesn't affect later handlers.
+		"""
+		called = []
+		class Uninspectable(object):
+			def __call__(self):
+				called.append(self)
+		uninspectable = Uninspectable()
+		def handler():
+			called.append(handler)
+		self.action.register(uninspectable)
+		self.action.register(handler)
+		self.action.notify()
+		self.assertEqual(called, [handler])
+
 class TestFilter(unittest.TestCase):
 
 	def setUp(self):
@@ -340,3 +423,30 @@ class TestDecider(unittest.TestCase):
 		self.decider.register(handler2)
 		decision = self.decider.decide()
 		self.assertEqual(decision, False)
+
+class TestDispatchBenchmark(unittest.TestCase):
+	"""Benchmarks calling handlers with cached signatures compared to inspecting them for each call.
+	"""
+	HANDLER_COUNT = 20
+
+	def setUp(self):
+		self.called = [0]
+		self.instances = [ExampleHandlers(self.called) for i in xrange(self.HANDLER_COUNT // 2)]
+		self.action = extensionPoints.Action()
+		for inst in self.instances:
+			self.action.register(inst.onNoKwargs)
+			self.action.register(inst.onSomeKwargs)
+
+	def test_notify(self):
+		action = self.action
+		def notify():
+			action.notify(a=1, b=2, c=3)
+		def notifyUncached():
+			for handler in action.handlers:
+				extensionPoints.callWithSupportedKwargs(handler, a=1, b=2, c=3)
+		benchmark.report("Action.notify %d handlers" % self.HANDLER_COUNT,
+			cached=benchmark.timeCall(notify, number=100),
+			uncached=benchmark.timeCall(notifyUncached, number=100))
+		self.called[0] = 0
+		notify()
+		self.assertEqual(self.called[0], self.HANDLER_COUNT)
@@ -0,0 +1,166 @@
+#tests/unit/test_latencyTracing.py
+#A part of NonVisual Desktop Access (NVDA)
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+#Copyright (C) 2017 NV Access Limited
+
+"""Unit tests for the latencyTracing module.
+"""
+
+import unittest
+import json
+import latencyTracing
+import inputCore
+import queueHandler
+import speech
+import speechDictHandler
+from synthDrivers.silence import SynthDriver as SilenceSynthDriver
+from . import realSpeak
+
+class FakeGesture(inputCore.InputGesture):
+	"""A gesture which executes a given script.
+	"""
+	speechEffectWhenExecuted = None
+	shouldReportAsCommand = False
+
+	def __init__(self, script):
+		super(FakeGesture, self).__init__()
+		self._script = script
+
+	def _get_identifiers(self):
+		return ("kb:fake",)
+
+	def _get_script(self):
+		return self._script
+
+def speakingScript(gesture):
+	"""Speak something, which is all a script needs to do for its speech to be traced.
+	"""
+	realSpeak([u"test"])
+
+class TestLatencyTracing(unittest.TestCase):
+
+	def setUp(self):
+		latencyTracing.clear()
+		latencyTracing.enable()
+		self.manager = inputCore.InputManager()
+		speechDictHandler.initialize()
+		# Speak using the silence synth driver.
+		self.synth = SilenceSynthDriver()
+		self.origGetSynth = speech.getSynth
+		speech.getSynth = lambda: self.synth
+
+	def tearDown(self):
+		speech.getSynth = self.origGetSynth
+		speech.speechMode = speech.speechMode_talk
+		latencyTracing.disable()
+		latencyTracing.clear()
+
+	def executeGesture(self, gesture):
+		self.manager.executeGesture(gesture)
+		queueHandler.pumpAll()
+
+	def test_hops(self):
+		gesture = FakeGesture(speakingScript)
+		self.executeGesture(gesture)
+		self.assertEqual(list(latencyTracing.traces), [gesture.latencyTrace])
+		hops = [hop for hop, delta, elapsed in gesture.latencyTrace.getDeltas()]
+		self.assertEqual(hops, [
+			latencyTracing.HOP_GESTURE,
+			latencyTracing.HOP_QUEUE_SCRIPT,
+			latencyTracing.HOP_EXECUTE_SCRIPT,
+			latencyTracing.HOP_SPEAK,
+			latencyTracing.HOP_SYNTH_SPEAK,
+			latencyTracing.HOP_SYNTH_SPEAK_DONE,
+			latencyTracing.HOP_SCRIPT_DONE,
+		])
+		for hop, delta, elapsed in gesture.latencyTrace.getDeltas():
+			self.assertGreaterEqual(delta, 0)
+
+	def test_speechAfterScript(self):
+		"""Test that speech after the script has completed (e.g. from an event) is recorded in the active trace.
+		"""
+		gesture = FakeGesture(lambda gesture: None)
+		self.executeGesture(gesture)
+		realSpeak([u"test"])
+		self.assertEqual(gesture.latencyTrace.hops[-1][0], latencyTracing.HOP_SYNTH_SPEAK_DONE)
+
+	def test_endsAfterSpeech(self):
+		"""Test that speech after the gesture's speech is complete (e.g. from say all) isn't recorded.
+		"""
+		gesture = FakeGesture(speakingScript)
+		self.executeGesture(gesture)
+		hops = list(gesture.latencyTrace.hops)
+		realSpeak([u"later"])
+		latencyTracing.mark(latencyTracing.HOP_BRAILLE)
+		self.assertEqual(gesture.latencyTrace.hops, hops)
+
+	def test_brailleBeforeSpeech(self):
+		"""Test that the trace doesn't end when braille is updated before the gesture's speech is complete.
+		"""
+		def script(gesture):
+			latencyTracing.mark(latencyTracing.HOP_BRAILLE)
+			realSpeak([u"test"])
+		gesture = FakeGesture(script)
+		self.executeGesture(gesture)
+		realSpeak([u"later"])
+		hops = [hop for hop, hopTime in gesture.latencyTrace.hops]
+		self.assertEqual(hops, [
+			latencyTracing.HOP_GESTURE,
+			latencyTracing.HOP_QUEUE_SCRIPT,
+			latencyTracing.HOP_EXECUTE_SCRIPT,
+			latencyTracing.HOP_BRAILLE,
+			latencyTracing.HOP_SPEAK,
+			latencyTracing.HOP_SYNTH_SPEAK,
+			latencyTracing.HOP_SYNTH_SPEAK_DONE,
+			latencyTracing.HOP_SCRIPT_DONE,
+		])
+
+	def test_endsAfterBrailleWithSpeechOff(self):
+		speech.speechMode = speech.speechMode_off
+		gesture = FakeGesture(lambda gesture: latencyTracing.mark(latencyTracing.HOP_BRAILLE))
+		self.executeGesture(gesture)
+		latencyTracing.mark(latencyTracing.HOP_BRAILLE)
+		hops = [hop for hop, hopTime in gesture.latencyTrace.hops]
+		self.assertEqual(hops, [
+			latencyTracing.HOP_GESTURE,
+			latencyTracing.HOP_QUEUE_SCRIPT,
+			latencyTracing.HOP_EXECUTE_SCRIPT,
+			latencyTracing.HOP_BRAILLE,
+			latencyTracing.HOP_SCRIPT_DONE,
+		])
+
+	def test_endsOnNextGesture(self):
+		gesture1 = FakeGesture(lambda gesture: None)
+		self.executeGesture(gesture1)
+		gesture2 = FakeGesture(speakingScript)
+		self.executeGesture(gesture2)
+		hops = [hop for hop, hopTime in gesture1.latencyTrace.hops]
+		self.assertNotIn(latencyTracing.HOP_SPEAK, hops)
+		self.assertEqual(gesture2.latencyTrace.hops[-1][0], latencyTracing.HOP_SCRIPT_DONE)
+
+	def test_maxHops(self):
+		trace = latencyTracing.Trace("test")
+		for i in xrange(latencyTracing.MAX_HOPS + 1):
+			trace.mark(latencyTracing.HOP_SPEAK)
+		self.assertEqual(len(trace.hops), latencyTracing.MAX_HOPS)
+
+	def test_disabled(self):
+		latencyTracing.disable()
+		gesture = FakeGesture(speakingScript)
+		self.executeGesture(gesture)
+		self.assertIsNone(gesture.latencyTrace)
+		self.assertEqual(len(latencyTracing.traces), 0)
+
+	def test_ringBuffer(self):
+		for i in xrange(latencyTracing.MAX_TRACES + 1):
+			self.executeGesture(FakeGesture(speakingScript))
+		self.assertEqual(len(latencyTracing.traces), latencyTracing.MAX_TRACES)
+
+	def test_dump(self):
+		self.executeGesture(FakeGesture(speakingScript))
+		traces = json.loads(latencyTracing.dumpJson())
+		self.assertEqual(traces[0]["name"], "kb:fake")
+		self.assertEqual(len(traces[0]["hops"]), 7)
+		events = json.loads(latencyTracing.dumpChromeTrace())["traceEvents"]
+		self.assertEqual(len(events), 7)
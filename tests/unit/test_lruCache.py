@@ -0,0 +1,52 @@
+#tests/unit/test_lruCache.py
+#A part of NonVisual Desktop Access (NVDA)
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+#Copyright (C) 2017 NV Access Limited
+
+"""Unit tests for the lruCache module.
+"""
+
+import unittest
+from lruCache import LRUCache
+
+class TestLRUCache(unittest.TestCase):
+
+	def setUp(self):
+		self.cache = LRUCache(2)
+		self.cache["a"] = 1
+		self.cache["b"] = 2
+
+	def test_get(self):
+		self.assertEqual(self.cache["a"], 1)
+		self.assertEqual(self.cache.get("z", 42), 42)
+
+	def test_discardsLeastRecentlyUsed(self):
+		"""Test that a lookup makes an entry the most recently used,
+		so the other entry is discarded when a new entry is added.
+		"""
+		self.cache["a"]
+		self.cache["c"] = 3
+		self.assertIn("a", self.cache)
+		self.assertNotIn("b", self.cache)
+		self.assertEqual(len(self.cache), 2)
+
+	def test_replaceDoesNotDiscard(self):
+		self.cache["a"] = 10
+		self.assertEqual(len(self.cache), 2)
+		self.assertEqual(self.cache["a"], 10)
+		self.assertEqual(self.cache["b"], 2)
+
+	def test_stats(self):
+		self.cache["a"]
+		self.cache.get("z")
+		with self.assertRaises(KeyError):
+			self.cache["z"]
+		self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+		self.cache.resetStats()
+		self.assertEqual((self.cache.hits, self.cache.misses), (0, 0))
+
+	def test_clear(self):
+		self.cache.clear()
+		self.assertEqual(len(self.cache), 0)
+		self.assertNotIn("a", self.cache)
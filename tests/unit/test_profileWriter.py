@@ -0,0 +1,89 @@
+#tests/unit/test_profileWriter.py
+#A part of NonVisual Desktop Access (NVDA)
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+#Copyright (C) 2017 NV Access Limited
+
+"""Unit tests for the config.profileWriter module.
+"""
+
+import unittest
+import threading
+from config.profileWriter import ProfileWriter
+
+class FakeFiles(object):
+	"""Records writes, optionally blocking each write until it is released.
+	"""
+
+	def __init__(self, block=False):
+		self.writes = []
+		self.block = block
+		self.writing = threading.Event()
+		self.release = threading.Event()
+
+	def write(self, fileName, data):
+		self.writing.set()
+		if self.block:
+			self.release.wait()
+		if data is None:
+			raise EnvironmentError("Write failed")
+		self.writes.append((fileName, data))
+
+class TestProfileWriter(unittest.TestCase):
+
+	def setUp(self):
+		self.files = FakeFiles()
+		self.writer = ProfileWriter(self.files.write)
+
+	def tearDown(self):
+		self.files.release.set()
+		self.writer.flush()
+
+	def test_write(self):
+		results = []
+		self.writer.queue([("a", 1), ("b", 2)], onComplete=results.append)
+		self.assertTrue(self.writer.flush(5))
+		self.assertEqual(self.files.writes, [("a", 1), ("b", 2)])
+		self.assertEqual(results, [None])
+
+	def test_coalesce(self):
+		self.files.block = True
+		self.writer.queue([("a", 1)])
+		self.assertTrue(self.files.writing.wait(5))
+		# The first write is in progress, so only the last of these should be written.
+		for data in (2, 3, 4):
+			self.writer.queue([("a", data)])
+		self.files.release.set()
+		self.assertTrue(self.writer.flush(5))
+		self.assertEqual(self.files.writes, [("a", 1), ("a", 4)])
+		self.assertEqual(self.writer.coalesced, 2)
+
+	def test_delay(self):
+		self.writer.delay = 60
+		self.writer.queue([("a", 1)])
+		self.assertFalse(self.files.writing.wait(0.1))
+		# Flushing writes without waiting for the delay.
+		self.assertTrue(self.writer.flush(5))
+		self.assertEqual(self.files.writes, [("a", 1)])
+
+	def test_immediate(self):
+		self.writer.delay = 60
+		self.writer.queue([("a", 1)])
+		self.writer.queue([("b", 2)], immediate=True)
+		self.assertTrue(self.files.writing.wait(5))
+		self.assertTrue(self.writer.flush(5))
+		self.assertEqual(self.files.writes, [("a", 1), ("b", 2)])
+
+	def test_error(self):
+		results = []
+		self.writer.queue([("a", None), ("b", 2)], onComplete=results.append)
+		self.assertTrue(self.writer.flush(5))
+		# Files after the failed file are still written.
+		self.assertEqual(self.files.writes, [("b", 2)])
+		self.assertEqual(len(results), 1)
+		self.assertIsInstance(results[0], EnvironmentError)
+
+	def test_flushTimeout(self):
+		self.files.block = True
+		self.writer.queue([("a", 1)])
+		self.assertFalse(self.writer.flush(0.05))
@@ -0,0 +1,178 @@
+#tests/unit/test_speech.py
+#A part of NonVisual Desktop Access (NVDA)
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+#Copyright (C) 2017 NV Access Limited
+
+"""Unit tests for the speech module.
+"""
+
+import unittest
+import speech
+import speechDictHandler
+import characterProcessing
+import benchmark
+from characterProcessing import SYMLVL_NONE, SYMLVL_ALL
+from synthDrivers.silence import SynthDriver as SilenceSynthDriver
+
+def makeStage(suffix):
+	"""Make a pipeline stage which appends a suffix to text.
+	"""
+	def stage(speechSequence, context):
+		for item in speechSequence:
+			if isinstance(item, basestring):
+				if item.endswith(suffix):
+					context.skipped[suffix] += 1
+				else:
+					item += suffix
+			yield item
+	return stage
+
+class TestSpeechPipeline(unittest.TestCase):
+
+	def setUp(self):
+		self.origGetSynth = speech.getSynth
+		synth = SilenceSynthDriver()
+		speech.getSynth = lambda: synth
+		self.origStats = speech.pipelineStats
+		speech.pipelineStats = speech.SpeechPipelineStats()
+		self.pipeline = speech.SpeechPipeline((("1", makeStage("1")), ("2", makeStage("2"))))
+
+	def tearDown(self):
+		speech.getSynth = self.origGetSynth
+		speech.pipelineStats = self.origStats
+
+	def process(self, speechSequence, skipStages=frozenset()):
+		context = speech.SpeechPipelineContext(SYMLVL_ALL, skipStages=skipStages)
+		return self.pipeline.process(speechSequence, context)
+
+	def test_order(self):
+		command = speech.PitchCommand()
+		self.assertEqual(self.process([u"a", command, u"b"]), [u"a12", command, u"b12"])
+
+	def test_addStage(self):
+		self.pipeline.addStage("3", makeStage("3"))
+		self.assertEqual(self.process([u"a"]), [u"a123"])
+
+	def test_addStageBefore(self):
+		self.pipeline.addStage("3", makeStage("3"), before="2")
+		self.assertEqual(self.process([u"a"]), [u"a132"])
+		self.pipeline.addStage("4", makeStage("4"), before="1")
+		self.assertEqual(self.process([u"a"]), [u"a4132"])
+
+	def test_addStageBeforeMissing(self):
+		self.assertRaises(LookupError, self.pipeline.addStage, "3", makeStage("3"), before="missing")
+		self.assertEqual(self.process([u"a"]), [u"a12"])
+
+	def test_removeStage(self):
+		self.pipeline.removeStage("1")
+		self.assertEqual(self.process([u"a"]), [u"a2"])
+		self.assertRaises(LookupError, self.pipeline.removeStage, "1")
+
+	def test_skipStages(self):
+		self.assertEqual(self.process([u"a"], skipStages=frozenset(["1"])), [u"a2"])
+		# Skipping only applies to this sequence.
+		self.assertEqual(self.process([u"a"]), [u"a12"])
+
+	def test_statsDisabled(self):
+		self.process([u"a"])
+		self.assertEqual(len(speech.pipelineStats.stages), 0)
+
+	def test_stats(self):
+		speech.pipelineStats.isEnabled = True
+		self.process([u"a", u"b1", speech.PitchCommand()])
+		self.process([u"c"])
+		self.assertEqual(list(speech.pipelineStats.stages), ["1", "2"])
+		stats = speech.pipelineStats["1"]
+		self.assertEqual(stats.runs, 2)
+		self.assertEqual(stats.items, 4)
+		self.assertEqual(stats.skipped, 1)
+		self.assertGreaterEqual(stats.time, 0)
+		self.assertEqual(speech.pipelineStats["2"].skipped, 0)
+		speech.pipelineStats.reset()
+		self.assertEqual(len(speech.pipelineStats.stages), 0)
+
+	def test_defaultPipeline(self):
+		speechDictHandler.initialize()
+		context = speech.SpeechPipelineContext(SYMLVL_ALL)
+		processed = speech.pipeline.process([u"a,\nb", u"", u"c"], context)
+		# Language changes may be added depending on the configuration.
+		processed = [item for item in processed if isinstance(item, basestring)]
+		self.assertEqual(processed, [speech.processText("en", u"a,\nb", SYMLVL_ALL) + speech.CHUNK_SEPARATOR,
+			u"c" + speech.CHUNK_SEPARATOR])
+
+class TestProcessText(unittest.TestCase):
+
+	def setUp(self):
+		speechDictHandler.initialize()
+		speech.processTextPathCounts.clear()
+
+	def test_pathCounts(self):
+		self.assertEqual(speech.processText("en", u"hello", SYMLVL_ALL), u"hello")
+		self.assertEqual(speech.processText("en", u"x_y", SYMLVL_ALL), u"x line y")
+		self.assertEqual(speech.processTextPathCounts, {"fast": 1, "full": 1})
+
+class TestTypedWordCache(unittest.TestCase):
+
+	def setUp(self):
+		speechDictHandler.initialize()
+		speech.typedWordCache.clear()
+		speech.typedWordCache.resetStats()
+
+	def tearDown(self):
+		del speechDictHandler.dictionaries["temp"][:]
+
+	def test_matchesProcessText(self):
+		for word in (u"hello", u"a1", u"x_y"):
+			for level in (SYMLVL_NONE, SYMLVL_ALL):
+				self.assertEqual(speech.getTypedWordSpeech("en", word, level), speech.processText("en", word, level))
+
+	def test_cached(self):
+		speech.getTypedWordSpeech("en", u"hello", SYMLVL_ALL)
+		speech.getTypedWordSpeech("en", u"hello", SYMLVL_ALL)
+		self.assertEqual(speech.typedWordCache.hits, 1)
+		self.assertEqual(speech.typedWordCache.misses, 1)
+
+	def test_perSymbolLevel(self):
+		self.assertEqual(speech.getTypedWordSpeech("en", u"x_y", SYMLVL_ALL), u"x line y")
+		self.assertEqual(speech.getTypedWordSpeech("en", u"x_y", SYMLVL_NONE), u"x y")
+
+	def test_dictionaryChange(self):
+		self.assertEqual(speech.getTypedWordSpeech("en", u"hello", SYMLVL_ALL), u"hello")
+		speechDictHandler.dictionaries["temp"].append(speechDictHandler.SpeechDictEntry(u"hello", u"goodbye", u""))
+		self.assertEqual(speech.getTypedWordSpeech("en", u"hello", SYMLVL_ALL), u"goodbye")
+
+	def test_symbolChange(self):
+		self.assertEqual(speech.getTypedWordSpeech("en", u"x_y", SYMLVL_ALL), u"x line y")
+		# Other code (such as the symbols dialog) clears the cache whenever the symbols change.
+		characterProcessing._localeSpeechSymbolProcessors.fetchLocaleData("en").clearCache()
+		speech.getTypedWordSpeech("en", u"x_y", SYMLVL_ALL)
+		self.assertEqual(speech.typedWordCache.hits, 0)
+
+class TestCharDescList(unittest.TestCase):
+
+	def test_conjunct(self):
+		# Hindi ksha is a conjunct of three characters with its own description.
+		ksha = u"\u0915\u094d\u0937"
+		ka = u"\u0915"
+		charDescs = speech.getCharDescListFromText(ksha + ka, "hi")
+		self.assertEqual([chars for chars, desc in charDescs], [ksha, ka])
+		self.assertEqual(charDescs[0][1], characterProcessing.getCharacterDescription("hi", ksha))
+		self.assertEqual(charDescs[1][1], characterProcessing.getCharacterDescription("hi", ka))
+
+	def test_upperCase(self):
+		self.assertEqual(speech.getCharDescListFromText(u"A", "en"),
+			[(u"A", characterProcessing.getCharacterDescription("en", u"a"))])
+
+	def test_noDescription(self):
+		self.assertEqual(speech.getCharDescListFromText(u"1 ", "en"), [(u"1", None), (u" ", None)])
+
+	def test_longText(self):
+		text = u"\u0915\u094d\u0937\u0905\u0902 ab" * 300
+		charDescs = []
+		def getCharDescs():
+			charDescs[:] = speech.getCharDescListFromText(text, "hi")
+		benchmark.report("getCharDescListFromText %d characters" % len(text),
+			hi=benchmark.timeCall(getCharDescs, repeat=1))
+		self.assertEqual(len(charDescs), 5 * 300)
+		self.assertEqual(u"".join(chars for chars, desc in charDescs), text)
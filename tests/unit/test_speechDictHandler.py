@@ -0,0 +1,180 @@
+#tests/unit/test_speechDictHandler.py
+#A part of NonVisual Desktop Access (NVDA)
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+#Copyright (C) 2017 NV Access Limited
+
+"""Unit tests for the speechDictHandler module.
+"""
+
+import unittest
+import random
+import os
+import shutil
+import tempfile
+import speechDictHandler
+from speechDictHandler import SpeechDict, SpeechDictEntry, ENTRY_TYPE_ANYWHERE, ENTRY_TYPE_WORD, ENTRY_TYPE_REGEXP
+import benchmark
+
+def subSequentially(speechDict, text):
+	"""Apply each entry one after the other; i.e. without merging any entries.
+	"""
+	for entry in speechDict:
+		text = entry.sub(text)
+	return text
+
+def makeDict(*entries):
+	speechDict = SpeechDict()
+	for pattern, replacement, caseSensitive, type in entries:
+		speechDict.append(SpeechDictEntry(pattern, replacement, u"", caseSensitive=caseSensitive, type=type))
+	return speechDict
+
+class TestSpeechDict(unittest.TestCase):
+
+	def assertSameAsSequential(self, speechDict, text):
+		self.assertEqual(speechDict.sub(text), subSequentially(speechDict, text))
+
+	def test_merged(self):
+		"""Test that entries which don't interact are applied in a single pass.
+		"""
+		speechDict = makeDict(
+			(u"NVDA", u"en vee dee ay", True, ENTRY_TYPE_WORD),
+			(u"Dr", u"doctor", True, ENTRY_TYPE_WORD),
+			(u"+", u" plus ", True, ENTRY_TYPE_ANYWHERE),
+		)
+		self.assertEqual(speechDict.sub(u"Dr Who uses NVDA+n"), u"doctor Who uses en vee dee ay plus n")
+		self.assertEqual(len(speechDict._passes), 1)
+
+	def test_replacementMatchedByLaterEntry(self):
+		"""Test that an entry still applies to the replacement of an earlier entry.
+		"""
+		speechDict = makeDict(
+			(u"dr", u"doctor", True, ENTRY_TYPE_WORD),
+			(u"doctor", u"physician", True, ENTRY_TYPE_WORD),
+		)
+		self.assertEqual(speechDict.sub(u"dr no"), u"physician no")
+		self.assertEqual(len(speechDict._passes), 2)
+
+	def test_overlappingPatterns(self):
+		"""Test that an earlier entry still takes priority over a later entry which would match first.
+		"""
+		speechDict = makeDict(
+			(u"bc", u"X", True, ENTRY_TYPE_ANYWHERE),
+			(u"ab", u"Y", True, ENTRY_TYPE_ANYWHERE),
+		)
+		self.assertEqual(speechDict.sub(u"abc"), u"aX")
+
+	def test_changedWordBoundary(self):
+		"""Test that a whole word entry doesn't match where an earlier replacement removed the word boundary.
+		"""
+		speechDict = makeDict(
+			(u"Dr.", u"Doctor", True, ENTRY_TYPE_ANYWHERE),
+			(u"Who", u"who", True, ENTRY_TYPE_WORD),
+		)
+		self.assertEqual(speechDict.sub(u"Dr.Who"), u"DoctorWho")
+
+	def test_caseInsensitive(self):
+		speechDict = makeDict(
+			(u"abc", u"x", False, ENTRY_TYPE_ANYWHERE),
+			(u"Def", u"y", False, ENTRY_TYPE_WORD),
+		)
+		self.assertEqual(speechDict.sub(u"ABC def DEF"), u"x y y")
+		self.assertEqual(len(speechDict._passes), 1)
+
+	def test_mixedCaseSensitivity(self):
+		"""Test that entries with differing case sensitivity are applied in separate passes.
+		"""
+		speechDict = makeDict(
+			(u"abc", u"x", False, ENTRY_TYPE_ANYWHERE),
+			(u"Def", u"y", True, ENTRY_TYPE_ANYWHERE),
+		)
+		self.assertEqual(speechDict.sub(u"ABC def Def"), u"x def y")
+		self.assertEqual(len(speechDict._passes), 2)
+
+	def test_caseInsensitiveNonAscii(self):
+		# The Kelvin sign is k in lower case, the Angstrom sign is a with ring above.
+		speechDict = makeDict(
+			(u"k", u"x", False, ENTRY_TYPE_ANYWHERE),
+			(u"\xe5", u"y", False, ENTRY_TYPE_ANYWHERE),
+		)
+		self.assertSameAsSequential(speechDict, u"\u212a K k \u212b \xc5 \xe5")
+
+	def test_regexp(self):
+		speechDict = makeDict(
+			(u"a", u"b", True, ENTRY_TYPE_ANYWHERE),
+			(r"(\d+)x", r"\1 times", True, ENTRY_TYPE_REGEXP),
+			(u"c", u"d", True, ENTRY_TYPE_ANYWHERE),
+		)
+		self.assertEqual(speechDict.sub(u"ac 3x"), u"bd 3 times")
+
+	def test_recompiledWhenChanged(self):
+		speechDict = makeDict((u"a", u"b", True, ENTRY_TYPE_ANYWHERE))
+		self.assertEqual(speechDict.sub(u"ac"), u"bc")
+		speechDict.append(SpeechDictEntry(u"c", u"d", u""))
+		self.assertEqual(speechDict.sub(u"ac"), u"bd")
+		del speechDict[:]
+		self.assertEqual(speechDict.sub(u"ac"), u"ac")
+
+	def test_compiledWhenLoaded(self):
+		dirName = tempfile.mkdtemp()
+		try:
+			fileName = os.path.join(dirName, "test.dic")
+			makeDict((u"a", u"b", True, ENTRY_TYPE_ANYWHERE)).save(fileName)
+			speechDict = SpeechDict()
+			speechDict.load(fileName)
+			self.assertIsNotNone(speechDict._passes)
+			self.assertEqual(speechDict.sub(u"ac"), u"bc")
+		finally:
+			shutil.rmtree(dirName)
+
+	def test_subn(self):
+		speechDict = makeDict(
+			(u"dr", u"doctor", False, ENTRY_TYPE_WORD),
+			(u"who", u"what", False, ENTRY_TYPE_WORD),
+			(r"\d+x", u"times", True, ENTRY_TYPE_REGEXP),
+		)
+		self.assertEqual(speechDict.subn(u"Dr Who 3x"), (u"doctor what times", 3))
+		self.assertEqual(speechDict.subn(u"drive 3 times"), (u"drive 3 times", 0))
+
+	def test_random(self):
+		"""Test that random entries give the same result as applying them sequentially.
+		A small alphabet is used so that entries frequently interact.
+		"""
+		rand = random.Random(0)
+		alphabet = u"abAB .-"
+		randomText = lambda minLen, maxLen: u"".join(rand.choice(alphabet) for i in xrange(rand.randint(minLen, maxLen)))
+		for i in xrange(1000):
+			speechDict = makeDict(*[
+				(randomText(1, 3), randomText(0, 3), rand.choice((True, False)), rand.choice((ENTRY_TYPE_ANYWHERE, ENTRY_TYPE_WORD)))
+				for j in xrange(rand.randint(2, 6))
+			])
+			for j in xrange(5):
+				self.assertSameAsSequential(speechDict, randomText(0, 12))
+
+class TestSpeechDictBenchmark(unittest.TestCase):
+	"""Compare applying a large dictionary sequentially with applying it in merged passes.
+	"""
+
+	def setUp(self):
+		rand = random.Random(0)
+		letters = u"abcdefghijklmnopqrstuvwxyz"
+		randomWord = lambda: u"".join(rand.choice(letters) for i in xrange(rand.randint(4, 9)))
+		# Entries are case insensitive by default, so only some are case sensitive.
+		self.speechDict = makeDict(*[
+			(randomWord(), u"%s %s" % (randomWord(), randomWord()), i % 50 == 0,
+				ENTRY_TYPE_WORD if i % 5 else ENTRY_TYPE_ANYWHERE)
+			for i in xrange(5000)
+		])
+		words = [entry.pattern for entry in self.speechDict[:200]] + [randomWord() for i in xrange(800)]
+		self.text = u" ".join(rand.choice(words) for i in xrange(60))
+
+	def test_benchmark(self):
+		compileTime = benchmark.timeCall(lambda: self.speechDict._compile(), repeat=1)
+		expected = subSequentially(self.speechDict, self.text)
+		self.assertEqual(self.speechDict.sub(self.text), expected)
+		self.assertLess(len(self.speechDict._passes), len(self.speechDict))
+		benchmark.report("speechDict 5000 entries",
+			compile=compileTime,
+			sequential=benchmark.timeCall(lambda: subSequentially(self.speechDict, self.text)),
+			merged=benchmark.timeCall(lambda: self.speechDict.sub(self.text)),
+		)
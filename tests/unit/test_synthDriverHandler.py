@@ -0,0 +1,59 @@
+#tests/unit/test_synthDriverHandler.py
+#A part of NonVisual Desktop Access (NVDA)
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+#Copyright (C) 2017 NV Access Limited
+
+"""Unit tests for the synthDriverHandler module.
+"""
+
+import unittest
+import config
+import synthDriverHandler
+
+class FakeSynth(object):
+	"""A synthesizer which records when its settings are loaded.
+	"""
+	name = "silence"
+
+	def __init__(self):
+		#: The onlyChanged argument of each call to L{loadSettings}.
+		self.loadSettingsCalls = []
+
+	def loadSettings(self, onlyChanged=False):
+		self.loadSettingsCalls.append(onlyChanged)
+
+class TestHandleConfigProfileSwitch(unittest.TestCase):
+
+	def setUp(self):
+		self.origCurSynth = synthDriverHandler._curSynth
+		self.origAudioOutputDevice = synthDriverHandler._audioOutputDevice
+		self.origSetSynth = synthDriverHandler.setSynth
+		self.origSynthName = config.conf["speech"]["synth"]
+		self.synth = synthDriverHandler._curSynth = FakeSynth()
+		synthDriverHandler._audioOutputDevice = config.conf["speech"]["outputDevice"]
+		self.setSynthCalls = []
+		synthDriverHandler.setSynth = lambda name, isFallback=False: self.setSynthCalls.append(name)
+		config.conf["speech"]["synth"] = FakeSynth.name
+
+	def tearDown(self):
+		synthDriverHandler._curSynth = self.origCurSynth
+		synthDriverHandler._audioOutputDevice = self.origAudioOutputDevice
+		synthDriverHandler.setSynth = self.origSetSynth
+		config.conf["speech"]["synth"] = self.origSynthName
+
+	def test_speechChanged(self):
+		synthDriverHandler.handleConfigProfileSwitch(changedKeys={"speech.rate"})
+		self.assertEqual(self.synth.loadSettingsCalls, [True])
+		self.assertEqual(self.setSynthCalls, [])
+
+	def test_speechUnchanged(self):
+		synthDriverHandler.handleConfigProfileSwitch(changedKeys={"braille.expandAtCursor"})
+		self.assertEqual(self.synth.loadSettingsCalls, [])
+		self.assertEqual(self.setSynthCalls, [])
+
+	def test_fallbackRetried(self):
+		# The configured synth couldn't be loaded previously, so a fallback is in use.
+		config.conf["speech"]["synth"] = "espeak"
+		synthDriverHandler.handleConfigProfileSwitch(changedKeys={"braille.expandAtCursor"})
+		self.assertEqual(self.setSynthCalls, ["espeak"])